@@ -32,6 +32,8 @@ CELERY_TASK_CREATE_MISSING_QUEUES = True
 CELERY_TASK_DEFAULT_EXCHANGE = 'papermerge'
 CELERY_TASK_DEFAULT_EXCHANGE_TYPE = 'direct'
 CELERY_TASK_DEFAULT_ROUTING_KEY = 'papermerge'
+# OCR tasks are routed by page count (see PAPERMERGE_OCR_QUEUES)
+CELERY_TASK_ROUTES = ('papermerge.core.ocr.queues.route_ocr_task',)
 
 if redis_host and redis_port:
     CHANNEL_LAYERS = {
@@ -33,31 +33,267 @@ class AppSettings():
         )
 
     @property
-    def BINARY_FILE(self):  # noqa
+    def BINARY_CONVERT(self):  # noqa
         return self._settings(
-            "BINARY_FILE",
-            "/usr/bin/file"
+            "BINARY_CONVERT",
+            "/usr/bin/convert"
         )
 
     @property
-    def BINARY_CONVERT(self):  # noqa
+    def BINARY_OCR(self):  # noqa
         return self._settings(
-            "BINARY_CONVERT",
-            "/usr/bin/convert"
+            "BINARY_OCR",
+            "/usr/bin/tesseract"
         )
 
     @property
-    def BINARY_IDENTIFY(self):  # noqa
+    def BINARY_PDFTOPPM(self):  # noqa
         return self._settings(
-            "BINARY_IDENTIFY",
-            "/usr/bin/identify"
+            "BINARY_PDFTOPPM",
+            "/usr/bin/pdftoppm"
         )
 
     @property
-    def BINARY_OCR(self):  # noqa
+    def BINARY_JPEGTRAN(self):  # noqa
         return self._settings(
-            "BINARY_OCR",
-            "/usr/bin/tesseract"
+            "BINARY_JPEGTRAN",
+            "/usr/bin/jpegtran"
+        )
+
+    @property
+    def PREVIEW_WORKERS(self):  # noqa
+        """
+        Max number of pdftoppm processes rendering previews of one
+        document version in parallel. None means number of CPUs.
+        """
+        return self._settings(
+            "PREVIEW_WORKERS",
+            None
+        )
+
+    @property
+    def PREVIEW_MAX_MEMORY(self):  # noqa
+        """
+        Approximate memory limit (in bytes) of preview rendering of one
+        document version; limits number of parallel pdftoppm processes
+        (each of them holds one page bitmap at a time).
+        None means no limit.
+        """
+        return self._settings(
+            "PREVIEW_MAX_MEMORY",
+            256 * 1024 * 1024
+        )
+
+    @property
+    def PREVIEW_SIZES(self):  # noqa
+        """
+        Widths (in pixels) in which page previews are available
+        (see ``size`` parameter of page view)
+        """
+        return self._settings(
+            "PREVIEW_SIZES",
+            (150, 300, 900, 1800)
+        )
+
+    @property
+    def PREVIEW_CACHE_MAX_SIZE(self):  # noqa
+        """
+        Max total size (in bytes) of previews of one document version
+        in widths other than default one; least recently used previews
+        are deleted when it is exceeded.
+        """
+        return self._settings(
+            "PREVIEW_CACHE_MAX_SIZE",
+            64 * 1024 * 1024
+        )
+
+    @property
+    def PREVIEW_PREFETCH_PAGES(self):  # noqa
+        """
+        Number of following pages whose previews are generated in
+        background after page preview is served. 0 disables prefetch.
+        """
+        return self._settings(
+            "PREVIEW_PREFETCH_PAGES",
+            2
+        )
+
+    @property
+    def PREVIEW_RENDER_LOCK_TIMEOUT(self):  # noqa
+        """
+        Max number of seconds a request waits for concurrent rendering
+        of the same page preview; afterwards it renders the preview
+        itself. Locks are kept in django cache, which must be shared by
+        all web and celery workers for rendering to be single-flight
+        among them.
+        """
+        return self._settings(
+            "PREVIEW_RENDER_LOCK_TIMEOUT",
+            30
+        )
+
+    @property
+    def LAZY_PDF_VERSIONS(self):  # noqa
+        """
+        If True, page operations (delete, reorder, rotate...) do not write
+        a new PDF file; instead the new document version stores a page
+        manifest and its PDF file is built on first access.
+        """
+        return self._settings(
+            "LAZY_PDF_VERSIONS",
+            False
+        )
+
+    @property
+    def LINEARIZE_PDF_VERSIONS(self):  # noqa
+        """
+        If True, PDF files of new document versions (page operations,
+        OCR) are saved linearized ("fast web view"), so that PDF viewers
+        loading files by byte ranges show first page without waiting
+        for the whole file. Uploaded files are stored as they are.
+        """
+        return self._settings(
+            "LINEARIZE_PDF_VERSIONS",
+            False
+        )
+
+    @property
+    def VERSION_RETENTION_KEEP_LAST(self):  # noqa
+        """
+        Number of last document versions kept by version compaction
+        (see ``papermerge.core.tasks.compact_document_versions_task``).
+        None means that versions are not pruned based on their count.
+        """
+        return self._settings(
+            "VERSION_RETENTION_KEEP_LAST",
+            None
+        )
+
+    @property
+    def VERSION_RETENTION_MAX_AGE(self):  # noqa
+        """
+        Age in days; document versions newer than this are kept by
+        version compaction. None means that versions are not pruned
+        based on their age.
+
+        If both VERSION_RETENTION_KEEP_LAST and VERSION_RETENTION_MAX_AGE
+        are set, document version is kept if either of them says so.
+        Last version of the document is always kept.
+        """
+        return self._settings(
+            "VERSION_RETENTION_MAX_AGE",
+            None
+        )
+
+    @property
+    def VERSION_COMPACTION_BATCH_SIZE(self):  # noqa
+        """
+        Number of document versions pruned in one database transaction
+        """
+        return self._settings(
+            "VERSION_COMPACTION_BATCH_SIZE",
+            100
+        )
+
+    @property
+    def OCR_FAN_OUT_PAGE_COUNT(self):  # noqa
+        """
+        Documents with more pages than this are split into ranges of
+        (at most) this many pages; ranges are OCRed in parallel by
+        celery workers (as a chord, which requires celery result backend).
+        None means that documents are always OCRed by a single worker.
+        """
+        return self._settings(
+            "OCR_FAN_OUT_PAGE_COUNT",
+            None
+        )
+
+    @property
+    def OCR_TEXT_LAYER_MIN_CHARS(self):  # noqa
+        """
+        Pages of PDF documents whose text layer has at least this many
+        characters (and which are not scans) are not OCRed; their text
+        is taken from the text layer. None means that all pages are OCRed.
+        """
+        return self._settings(
+            "OCR_TEXT_LAYER_MIN_CHARS",
+            20
+        )
+
+    @property
+    def OCR_QUEUES(self):  # noqa
+        """
+        List of (queue name, max page count) tuples, e.g.
+        ``[('ocr_small', 5), ('ocr_large', 100), ('ocr_bulk', None)]``.
+        OCR tasks are routed to the first queue whose max page count
+        is not exceeded (None means no limit). Empty value means that
+        OCR tasks go to celery's default queue.
+        """
+        return self._settings(
+            "OCR_QUEUES",
+            None
+        )
+
+    @property
+    def OCR_USER_MAX_CONCURRENCY(self):  # noqa
+        """
+        Max number of OCR tasks running at the same time on behalf of
+        one user; tasks over the limit are retried later. Counters
+        are kept in django cache, which must be shared by all workers
+        (e.g. redis; system check fails with per process caches like
+        the default ``LocMemCache``). None means no limit.
+        """
+        return self._settings(
+            "OCR_USER_MAX_CONCURRENCY",
+            None
+        )
+
+    @property
+    def OCR_INGEST_WORKERS(self):  # noqa
+        """
+        Max number of threads reading pages' OCR text files (sidecars)
+        when OCR results are stored in the database.
+        """
+        return self._settings(
+            "OCR_INGEST_WORKERS",
+            8
+        )
+
+    @property
+    def SENDFILE_BACKEND(self):  # noqa
+        """
+        How files (document versions, page previews) are sent to clients:
+        'x-accel-redirect' (nginx), 'x-sendfile' (Apache) or None,
+        which means that files are streamed by django
+        (see ``papermerge.core.file_response``).
+        """
+        return self._settings(
+            "SENDFILE_BACKEND",
+            None
+        )
+
+    @property
+    def SENDFILE_URL(self):  # noqa
+        """
+        URL prefix of nginx internal location which serves media root
+        (used with 'x-accel-redirect' SENDFILE_BACKEND)
+        """
+        return self._settings(
+            "SENDFILE_URL",
+            "/_protected/"
+        )
+
+    @property
+    def EXPORT_MAX_AGE(self):  # noqa
+        """
+        Age in hours; finished export jobs (see ``/nodes/export/``)
+        older than this are deleted together with their archives by
+        ``papermerge.core.tasks.delete_expired_export_jobs_task``.
+        None means that export jobs are kept until deleted by the user.
+        """
+        return self._settings(
+            "EXPORT_MAX_AGE",
+            24
         )
 
     @property
@@ -79,9 +79,11 @@ class DocumentVersionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = DocumentVersion
-        exclude = ('id', 'document')
+        exclude = ('id', 'document', 'manifest')
 
     def get_file_path(self, obj) -> str:
+        # backup includes the file, thus lazy version's file is built here
+        obj.materialize()
         return obj.document_path.url
 
     def create(self, validated_data):
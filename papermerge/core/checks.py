@@ -1,22 +1,28 @@
 import os
 import subprocess
 
-from django.core.checks import Warning, register
+from django.conf import settings as django_settings
+from django.core.checks import Error, Warning, register
 
 from .app_settings import settings
 
 
+# cache backends which are not shared among processes
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
 USED_BINARIES = {
-    settings.BINARY_FILE: {
+    settings.BINARY_CONVERT: {
         "msg": (
-            "Without it, Papermerge won't be"
-            " "
-            "able to learn file mime type"),
+            "Without it, image resizing is not possible"
+        ),
         "option": "-v"
     },
-    settings.BINARY_CONVERT: {
+    settings.BINARY_PDFTOPPM: {
         "msg": (
-            "Without it, image resizing is not possible"
+            "Without it, page previews can't be generated"
         ),
         "option": "-v"
     },
@@ -26,11 +32,11 @@ USED_BINARIES = {
         ),
         "option": "-v"
     },
-    settings.BINARY_IDENTIFY: {
+    settings.BINARY_JPEGTRAN: {
         "msg": (
-            "Without it, it is not possible to count pages in TIFF"
+            "Without it, rotated page images are re-encoded (lossy)"
         ),
-        "option": "-v"
+        "option": "-version"
     },
 }
 
@@ -69,6 +75,29 @@ def binaries_check(app_configs, **kwargs):
     return check_messages
 
 
+@register()
+def ocr_user_slots_check(app_configs, **kwargs):
+    """
+    OCR tasks of one user running on different workers are counted
+    (see ``OCR_USER_MAX_CONCURRENCY``) in django cache, thus it must be
+    shared by all workers.
+    """
+    if not settings.OCR_USER_MAX_CONCURRENCY:
+        return []
+
+    backend = django_settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PER_PROCESS_CACHES:
+        return []
+
+    return [
+        Error(
+            "OCR_USER_MAX_CONCURRENCY requires django cache shared by all"
+            f" workers, {backend} is local to each process.",
+            "Configure CACHES e.g. with Redis cache backend."
+        )
+    ]
+
+
 """
 @register()
 def imap_login_check(app_configs, **kwargs):
@@ -8,6 +8,24 @@ class APIBadRequest(APIException):
     status_code = 400
 
 
+class VersionConflict(APIException):
+    """
+    Document version changed (concurrently) since client last read it
+    """
+    status_code = 409
+    default_detail = 'Document version was changed by another operation'
+    default_code = 'version_conflict'
+
+
+class ExportNotReady(APIException):
+    """
+    Archive of export job is not (yet) available for download
+    """
+    status_code = 409
+    default_detail = 'Export job has not succeeded'
+    default_code = 'export_not_ready'
+
+
 class SuperuserDoesNotExist(Exception):
     """
     Raised when superuser was not found.
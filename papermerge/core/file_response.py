@@ -0,0 +1,202 @@
+"""
+Responses with content of files from media root (document versions,
+page previews, svg images).
+
+Web workers never read files themselves: transfer is either handed over
+to the web server in front of the application, or file is streamed in
+chunks by ``FileResponse``. Which one is used depends on
+``SENDFILE_BACKEND`` setting:
+
+    * None - ``FileResponse`` (default)
+    * 'x-accel-redirect' - nginx; requires an internal location which
+      serves media root, e.g.::
+
+        location /_protected/ {
+            internal;
+            alias /var/media/papermerge/;
+        }
+
+      with ``SENDFILE_URL = '/_protected/'``
+    * 'x-sendfile' - Apache with mod_xsendfile (or lighttpd); file's
+      absolute path is sent to the web server
+
+Byte range requests (e.g. pdf.js loading first pages of large PDF) are
+answered with 206 (Partial Content); with x-accel-redirect and
+x-sendfile ranges are handled by the web server.
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings as django_settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+from papermerge.core.app_settings import settings
+
+X_ACCEL_REDIRECT = 'x-accel-redirect'
+X_SENDFILE = 'x-sendfile'
+SENDFILE_BACKENDS = (X_ACCEL_REDIRECT, X_SENDFILE)
+# single byte range; multiple ranges are answered with whole file
+BYTE_RANGE_RE = re.compile(r'^\s*bytes=(\d*)-(\d*)\s*$')
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def byte_range(header, size):
+    """
+    Returns (first, last) byte positions (inclusive) requested by
+    ``Range`` header value or None if whole file should be sent.
+
+    Raises ``RangeNotSatisfiable`` if range is outside of the file.
+    """
+    match = BYTE_RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+
+    if size == 0:
+        raise RangeNotSatisfiable
+
+    first, last = match.groups()
+    if first == '':
+        # suffix range, e.g. 'bytes=-500' - last 500 bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+
+    first = int(first)
+    last = size - 1 if last == '' else min(int(last), size - 1)
+    if first >= size:
+        raise RangeNotSatisfiable
+    if first > last:
+        # invalid range is ignored
+        return None
+
+    return first, last
+
+
+def _read_range(file_handle, first, last):
+    with file_handle:
+        file_handle.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = file_handle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _content_disposition(filename):
+    try:
+        filename.encode('ascii')
+        return f'attachment; filename="{filename}"'
+    except UnicodeEncodeError:
+        return f"attachment; filename*=utf-8''{quote(filename)}"
+
+
+def file_response(
+    file_abs_path: str,
+    content_type: str,
+    filename=None,
+    request=None,
+    etag=None
+):
+    """
+    Returns response with content of file ``file_abs_path``.
+
+    If ``filename`` is given, file is sent as attachment with this name.
+    If ``request`` is given, its ``Range`` header is honored (unless its
+    ``If-Range`` header does not match ``etag``).
+    Raises ``OSError`` if file cannot be opened.
+    """
+    backend = settings.SENDFILE_BACKEND
+
+    if backend not in (None, *SENDFILE_BACKENDS):
+        raise ValueError(f"Unsupported SENDFILE_BACKEND {backend}")
+
+    if backend is None:
+        file_handle = open(file_abs_path, 'rb')
+        if request is not None:
+            response = _range_response(
+                request, file_handle, content_type, etag
+            )
+            if response is not None:
+                _set_content_disposition(response, filename)
+                return response
+
+        # FileResponse reads (and sends) file in chunks
+        response = FileResponse(
+            file_handle,
+            content_type=content_type,
+            as_attachment=filename is not None,
+            filename=filename or ''
+        )
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    # fail early, as web server would otherwise respond with 404
+    if not os.path.isfile(file_abs_path):
+        raise FileNotFoundError(file_abs_path)
+
+    response = HttpResponse(content_type=content_type)
+    if backend == X_ACCEL_REDIRECT:
+        relative_path = os.path.relpath(
+            file_abs_path, django_settings.MEDIA_ROOT
+        )
+        response['X-Accel-Redirect'] = quote(
+            f"{settings.SENDFILE_URL.rstrip('/')}/{relative_path}"
+        )
+    else:
+        response['X-Sendfile'] = file_abs_path
+
+    _set_content_disposition(response, filename)
+
+    return response
+
+
+def _set_content_disposition(response, filename):
+    if filename is not None:
+        response['Content-Disposition'] = _content_disposition(filename)
+
+
+def _range_response(request, file_handle, content_type, etag):
+    """
+    Returns 206 or 416 response if ``request`` asks for a byte range
+    of the file; otherwise returns None.
+    """
+    header = request.headers.get('Range')
+    if header is None:
+        return None
+
+    if_range = request.headers.get('If-Range')
+    if if_range is not None and (etag is None or if_range != etag):
+        # file changed since client got its part; send whole file
+        return None
+
+    size = os.fstat(file_handle.fileno()).st_size
+    try:
+        requested_range = byte_range(header, size)
+    except RangeNotSatisfiable:
+        file_handle.close()
+        response = HttpResponse(status=416, content_type=content_type)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if requested_range is None:
+        return None
+
+    first, last = requested_range
+    response = StreamingHttpResponse(
+        _read_range(file_handle, first, last),
+        status=206,
+        content_type=content_type
+    )
+    response['Content-Length'] = str(last - first + 1)
+    response['Content-Range'] = f'bytes {first}-{last}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+
+    return response
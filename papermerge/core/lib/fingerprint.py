@@ -0,0 +1,100 @@
+"""
+Content fingerprints of PDF pages.
+
+Fingerprint is sha256 digest of everything which determines how the page
+looks like: page's content stream(s), resources (images, fonts, forms...)
+and page geometry (media box, rotation). Two pages with same fingerprint
+render identically, regardless of which PDF file they come from.
+"""
+import hashlib
+
+from pikepdf import (
+    Array,
+    Dictionary,
+    Name,
+    Object,
+    Pdf,
+    PdfError,
+    Stream
+)
+
+# stream encoding details and link to page tree do not affect page's look
+IGNORED_KEYS = ('/Length', '/Filter', '/DecodeParms', '/Parent')
+
+
+def _stream_bytes(stream: Stream) -> bytes:
+    """
+    Decoded stream data. PDF writers are free to re-compress streams
+    (e.g. with flate), thus hashing encoded data would make fingerprint
+    depend on the writer. Streams which cannot be decoded (e.g. jpeg images)
+    are returned as is - those are never re-encoded by writers.
+    """
+    try:
+        return stream.read_bytes()
+    except PdfError:
+        return stream.read_raw_bytes()
+
+
+def _update(digest, obj: Object, visited: set) -> None:
+    if isinstance(obj, Stream):
+        objgen = obj.objgen
+        if objgen != (0, 0):
+            if objgen in visited:
+                return
+            visited.add(objgen)
+        digest.update(_stream_bytes(obj))
+        _update_dictionary(digest, obj.stream_dict, visited)
+    elif isinstance(obj, Dictionary):
+        objgen = obj.objgen
+        if objgen != (0, 0):
+            if objgen in visited:
+                return
+            visited.add(objgen)
+        _update_dictionary(digest, obj, visited)
+    elif isinstance(obj, Array):
+        digest.update(b'[')
+        for item in obj:
+            _update(digest, item, visited)
+        digest.update(b']')
+    else:
+        digest.update(repr(obj).encode('utf-8'))
+
+
+def _update_dictionary(digest, obj, visited: set) -> None:
+    digest.update(b'<<')
+    for key in sorted(obj.keys()):
+        if key in IGNORED_KEYS:
+            continue
+        digest.update(key.encode('utf-8'))
+        _update(digest, obj[key], visited)
+    digest.update(b'>>')
+
+
+def page_fingerprint(page) -> str:
+    """Returns hex encoded fingerprint of the pikepdf page"""
+    digest = hashlib.sha256()
+    page_obj = page.obj
+    visited = set()
+
+    for key in ('/MediaBox', '/CropBox', '/Rotate'):
+        if key in page_obj:
+            digest.update(key.encode('utf-8'))
+            _update(digest, page_obj[key], visited)
+
+    contents = page_obj.get(Name.Contents)
+    if isinstance(contents, Array):
+        for stream in contents:
+            digest.update(_stream_bytes(stream))
+    elif contents is not None:
+        digest.update(_stream_bytes(contents))
+
+    resources = page_obj.get(Name.Resources)
+    if resources is not None:
+        _update(digest, resources, visited)
+
+    return digest.hexdigest()
+
+
+def pdf_fingerprints(pdf: Pdf) -> list[str]:
+    """Returns list of fingerprints of all pages of the (opened) ``pdf``"""
+    return [page_fingerprint(page) for page in pdf.pages]
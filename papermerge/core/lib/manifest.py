@@ -0,0 +1,119 @@
+"""
+Page manifests of lazy document versions.
+
+Manifest is a list of entries, n-th entry describes n-th page of the
+document version. Each entry is a dictionary with following keys:
+
+    - version: id (as string) of the document version the page comes from
+    - number: page number in that document version (starts with 1)
+    - angle: rotation (in degrees, multiple of 90) applied to the page
+
+Functions in this module do not touch neither database nor files;
+they return new manifests i.e. input manifests are never modified.
+"""
+
+
+def entry(version_id, number: int, angle: int = 0) -> dict:
+    return {
+        'version': str(version_id),
+        'number': number,
+        'angle': angle % 360
+    }
+
+
+def identity(version_id, page_count: int) -> list[dict]:
+    """Manifest of a version whose pages are stored in its own file"""
+    return [
+        entry(version_id, number)
+        for number in range(1, page_count + 1)
+    ]
+
+
+def remove_pages(manifest: list[dict], page_numbers: list[int]) -> list[dict]:
+    """
+    Returns manifest without pages ``page_numbers``.
+
+    Page numbering starts with 1.
+    """
+    if len(page_numbers) < 1:
+        raise ValueError("Empty page_numbers")
+
+    if len(manifest) < len(page_numbers):
+        raise ValueError("Too many values in page_numbers")
+
+    return [
+        dict(item) for number, item in enumerate(manifest, start=1)
+        if number not in page_numbers
+    ]
+
+
+def reorder_pages(manifest: list[dict], pages_data: list[dict]) -> list[dict]:
+    """
+    Returns manifest with pages reordered.
+
+    ``pages_data`` is a list of dictionaries. Each dictionary is expected
+    to have following keys:
+        - old_number
+        - new_number
+    """
+    ordered = sorted(pages_data, key=lambda item: item['new_number'])
+
+    return [
+        dict(manifest[item['old_number'] - 1]) for item in ordered
+    ]
+
+
+def rotate_pages(manifest: list[dict], pages_data: list[dict]) -> list[dict]:
+    """
+    Returns manifest with pages rotated.
+
+    ``pages_data`` is a list of dictionaries. Each dictionary is expected
+    to have following keys:
+        - number
+        - angle (relative to current page rotation)
+    """
+    result = [dict(item) for item in manifest]
+
+    for page_data in pages_data:
+        item = result[page_data['number'] - 1]
+        item['angle'] = (item['angle'] + page_data['angle']) % 360
+
+    return result
+
+
+def edit_pages(manifest: list[dict], pages: list[tuple]) -> list[dict]:
+    """
+    Returns manifest composed of ``pages``.
+
+    ``pages`` is a list of (page number, angle) tuples in the new page
+    order. Angle is relative to current page rotation.
+    """
+    result = []
+    for number, angle in pages:
+        item = dict(manifest[number - 1])
+        item['angle'] = (item['angle'] + angle) % 360
+        result.append(item)
+
+    return result
+
+
+def insert_pages(
+    src_manifest: list[dict],
+    dst_manifest: list[dict],
+    src_page_numbers: list[int],
+    dst_position: int = 0
+) -> list[dict]:
+    """
+    Returns ``dst_manifest`` with ``src_page_numbers`` pages of
+    ``src_manifest`` inserted at ``dst_position``.
+
+    `dst_position` starts with 0, in `src_page_numbers` page numbering
+    starts with 1.
+    """
+    inserted = [
+        dict(src_manifest[number - 1]) for number in src_page_numbers
+    ]
+    result = [dict(item) for item in dst_manifest]
+    result[dst_position:dst_position] = inserted
+
+    return result
@@ -1,30 +1,85 @@
+"""
+File type (MIME) detection.
+
+File types papermerge works with (pdf, tiff, png, jpeg) are recognized
+by sniffing file header; anything else is detected by libmagic
+(in-process, via python-magic). Results are cached by file's
+(path, size, modification time), thus file is sniffed only once, no
+matter how many times its type is asked for (OCR, page count, download).
+"""
+import functools
 import logging
+import os
 
-from . import wrapper
-from ..app_settings import settings
+import magic
 
 logger = logging.getLogger(__name__)
 
+PDF = 'application/pdf'
+TIFF = 'image/tiff'
+PNG = 'image/png'
+JPEG = 'image/jpeg'
 
-class Mime(wrapper.Wrapper):
-    def __init__(self, filepath):
-        super().__init__(exec_name=settings.BINARY_FILE)
-        self.filepath = filepath
+# (offset, signature, mime type)
+SIGNATURES = (
+    (0, b'II*\x00', TIFF),
+    (0, b'MM\x00*', TIFF),
+    (0, b'\x89PNG\r\n\x1a\n', PNG),
+    (0, b'\xff\xd8\xff', JPEG),
+)
+PDF_SIGNATURE = b'%PDF-'
+# PDF readers accept header anywhere in first 1024 bytes of the file
+HEADER_SIZE = 1024
+CACHE_SIZE = 1024
+
+
+def sniff(header: bytes):
+    """
+    Returns mime type of the file given its first bytes or None
+    if it is not one of the types recognized by signature.
+    """
+    for offset, signature, mime_type in SIGNATURES:
+        if header[offset:offset + len(signature)] == signature:
+            return mime_type
+
+    if PDF_SIGNATURE in header[:HEADER_SIZE]:
+        return PDF
+
+    return None
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _guess(filepath: str, size: int, mtime_ns: int) -> str:
+    # ``size`` and ``mtime_ns`` are part of cache key only
+    with open(filepath, 'rb') as f:
+        header = f.read(HEADER_SIZE)
 
-    def get_cmd(self):
-        cmd = super().get_cmd()
+    mime_type = sniff(header)
+    if mime_type is None:
+        mime_type = magic.from_file(filepath, mime=True)
 
-        cmd.extend(['--mime-type'])
-        cmd.extend(['-b'])
-        cmd.extend([self.filepath])
+    logger.debug(f"guess: {filepath} is {mime_type}")
 
-        return cmd
+    return mime_type
+
+
+def guess(filepath) -> str:
+    """Returns mime type of the file, e.g. 'application/pdf'"""
+    filepath = os.fspath(filepath)
+    stat = os.stat(filepath)
+
+    return _guess(filepath, stat.st_size, stat.st_mtime_ns)
+
+
+class Mime:
+    def __init__(self, filepath):
+        self.filepath = filepath
 
     def is_tiff(self):
-        return self.guess() == 'image/tiff'
+        return self.guess() == TIFF
 
     def is_pdf(self):
-        return self.guess() == 'application/pdf'
+        return self.guess() == PDF
 
     def is_image(self):
         """
@@ -32,13 +87,10 @@ class Mime(wrapper.Wrapper):
             * image/png
             * image/jpg
         """
-        return self.guess() in ('image/png', 'image/jpg', 'image/jpeg')
+        return self.guess() in (PNG, 'image/jpg', JPEG)
 
     def guess(self):
-        cmd = self.get_cmd()
-        complete = self.run(cmd)
-
-        return complete.stdout.strip()
+        return guess(self.filepath)
 
     def __str__(self):
 
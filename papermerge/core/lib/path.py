@@ -8,6 +8,12 @@ logger = logging.getLogger(__name__)
 
 AUX_DIR_DOCS = "docs"
 AUX_DIR_SIDECARS = "sidecars"
+# content addressed store of sidecar files; lives inside AUX_DIR_SIDECARS
+AUX_DIR_BLOBS = "blobs"
+# previews resized to widths other than default one
+PREVIEWS_DIRNAME = "previews"
+# archives built by export jobs
+AUX_DIR_EXPORTS = "exports"
 
 
 def filter_by_extention(
@@ -250,3 +256,11 @@ class PagePath:
     def preview_url(self):
         pages_dirname = self.results_document_ep.pages_dirname()
         return f"{pages_dirname}001-{self.page_num}.jpg"
+
+    @property
+    def previews_dirname(self):
+        pages_dirname = self.results_document_ep.pages_dirname()
+        return f"{pages_dirname}{PREVIEWS_DIRNAME}/"
+
+    def sized_preview_url(self, width):
+        return f"{self.previews_dirname}{width}/001-{self.page_num}.jpg"
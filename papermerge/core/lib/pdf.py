@@ -0,0 +1,16 @@
+"""
+Writing of PDF files of document versions.
+
+With ``LINEARIZE_PDF_VERSIONS`` setting on, PDF files are saved
+linearized ("fast web view"): objects needed to display the first page
+come first in the file, so viewers which load files by byte ranges
+(e.g. pdf.js) show the first page before the rest of the file arrives.
+"""
+from pikepdf import Pdf
+
+from ..app_settings import settings
+
+
+def save_pdf(pdf: Pdf, file_path) -> None:
+    """Saves ``pdf`` to ``file_path``"""
+    pdf.save(file_path, linearize=settings.LINEARIZE_PDF_VERSIONS)
@@ -0,0 +1,248 @@
+"""
+Page previews (jpeg images) of PDF documents.
+
+Previews are rendered by pdftoppm (poppler-utils) directly to files,
+thus page images are never loaded into worker's memory. Pages are split
+into ranges of (at most) ``CHUNK_SIZE`` pages; ranges are rendered in
+parallel by separate pdftoppm processes.
+
+pdftoppm renders one page at a time, so its memory usage is roughly the
+size of one page bitmap. Number of parallel processes is limited by
+``PREVIEW_WORKERS`` and by ``PREVIEW_MAX_MEMORY`` divided by the
+(estimated) bitmap size, thus peak memory usage does not depend
+on number of pages.
+
+Besides default width (``PREVIEW_WIDTH``), previews are available in
+other widths (``PREVIEW_SIZES``). These are created on first request:
+smaller ones are resized from default preview, larger ones are rendered
+by pdftoppm. They are kept in ``PREVIEWS_DIRNAME`` directory of document
+version's sidecars, which is limited to ``PREVIEW_CACHE_MAX_SIZE`` bytes
+by evicting least recently used previews.
+
+Rendering of a preview is single-flight (see ``single_flight``):
+concurrent requests for the same missing preview wait for one render
+instead of running pdftoppm each.
+"""
+import os
+import re
+import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from PIL import Image
+
+from .runcmd import run
+from ..app_settings import settings
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_WIDTH = 900
+CHUNK_SIZE = 20
+# pdftoppm names its output files ``{root}-{page number}.jpg``, with
+# page number zero padded to the number of digits of page count
+OUTPUT_NAME_RE = re.compile(r'^.+-(?P<number>\d+)\.jpg$')
+# seconds between checks whether concurrent render finished
+RENDER_LOCK_POLL_INTERVAL = 0.1
+
+
+def preview_name(page_number: int) -> str:
+    """File name of page preview (see ``PagePath.preview_url``)"""
+    return f"001-{page_number}.jpg"
+
+
+def page_bitmap_size(width: int) -> int:
+    """
+    Estimated size in bytes of rendered page bitmap; assumes pages are
+    at most twice as tall as wide and 4 bytes per pixel.
+    """
+    return width * width * 2 * 4
+
+
+def max_workers(width: int) -> int:
+    workers = settings.PREVIEW_WORKERS or os.cpu_count() or 1
+    max_memory = settings.PREVIEW_MAX_MEMORY
+    if max_memory is not None:
+        workers = min(workers, max_memory // page_bitmap_size(width))
+
+    return max(workers, 1)
+
+
+def page_chunks(pages, chunk_size=CHUNK_SIZE) -> list:
+    """
+    Splits page numbers into ranges of consecutive pages.
+
+    Returns list of (first, last) tuples; each range has at most
+    ``chunk_size`` pages.
+    """
+    chunks = []
+    for number in sorted(set(pages)):
+        if chunks:
+            first, last = chunks[-1]
+            if number == last + 1 and number - first < chunk_size:
+                chunks[-1] = (first, number)
+                continue
+        chunks.append((number, number))
+
+    return chunks
+
+
+def _render_chunk(pdf_path, output_dir, first, last, width):
+    # Chunk is rendered into its own directory and then moved in place.
+    # ``os.replace`` does not write to existing previews, which may be
+    # hardlinks shared with other document versions (see
+    # ``Storage.link_file``).
+    with tempfile.TemporaryDirectory(dir=output_dir) as chunk_dir:
+        run((
+            settings.BINARY_PDFTOPPM,
+            "-jpeg",
+            "-f",
+            str(first),
+            "-l",
+            str(last),
+            "-scale-to-x",
+            str(width),
+            "-scale-to-y",
+            "-1",  # it will adjust height according to img ratio
+            pdf_path,
+            os.path.join(chunk_dir, "page")
+        ))
+        for entry in os.scandir(chunk_dir):
+            match = OUTPUT_NAME_RE.match(entry.name)
+            if not match:
+                continue
+            os.replace(
+                entry.path,
+                os.path.join(
+                    output_dir, preview_name(int(match.group('number')))
+                )
+            )
+
+
+def render_previews(
+    pdf_path: str,
+    output_dir: str,
+    pages,
+    width: int = PREVIEW_WIDTH
+) -> None:
+    """
+    Renders jpeg previews of PDF file's ``pages`` (list of page numbers,
+    starting with 1) into ``output_dir``.
+    """
+    chunks = page_chunks(pages)
+    if not chunks:
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    workers = min(max_workers(width), len(chunks))
+    logger.debug(
+        f"render_previews: {pdf_path} chunks={len(chunks)} workers={workers}"
+    )
+
+    if workers == 1:
+        for first, last in chunks:
+            _render_chunk(pdf_path, output_dir, first, last, width)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _render_chunk, pdf_path, output_dir, first, last, width
+            )
+            for first, last in chunks
+        ]
+        for future in futures:
+            future.result()
+
+
+def resize_preview(src: str, dst: str, width: int) -> None:
+    """Writes ``src`` jpeg image resized to ``width`` to ``dst``"""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    with Image.open(src) as image:
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.convert('RGB').resize(
+            (width, height), Image.LANCZOS
+        )
+
+    # written under temporary name, so that concurrent readers never
+    # see partially written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst), suffix='.jpg')
+    with os.fdopen(fd, 'wb') as f:
+        resized.save(f, quality=80, format='JPEG')
+    os.replace(tmp_path, dst)
+
+
+def touch(path: str) -> None:
+    """Marks preview as recently used"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def evict_previews(previews_dir: str, max_size: int) -> list:
+    """
+    Deletes least recently used (by modification time, see ``touch``)
+    previews in subdirectories of ``previews_dir`` until their total size
+    is at most ``max_size`` bytes. Most recently used preview is never
+    deleted.
+
+    Returns list of deleted paths.
+    """
+    entries = []
+    for tier in os.scandir(previews_dir):
+        if not tier.is_dir():
+            continue
+        for entry in os.scandir(tier.path):
+            if entry.is_file() and entry.name.endswith('.jpg'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+    entries.sort()
+    total_size = sum(size for _, size, _ in entries)
+    deleted = []
+    for _, size, path in entries[:-1]:
+        if total_size <= max_size:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+        deleted.append(path)
+
+    if deleted:
+        logger.debug(f"evict_previews: {previews_dir} deleted={len(deleted)}")
+
+    return deleted
+
+
+@contextmanager
+def single_flight(path: str):
+    """
+    Serializes rendering of preview ``path``: while one caller holds
+    the lock, others wait until it is released (or until
+    ``PREVIEW_RENDER_LOCK_TIMEOUT`` seconds elapse). Callers are
+    expected to check whether preview exists once they get the lock.
+    """
+    key = f"preview-render:{path}"
+    timeout = settings.PREVIEW_RENDER_LOCK_TIMEOUT
+    deadline = time.monotonic() + timeout
+    acquired = cache.add(key, 1, timeout)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(RENDER_LOCK_POLL_INTERVAL)
+        if os.path.exists(path):
+            # rendered by lock holder; no need to wait for the release
+            break
+        acquired = cache.add(key, 1, timeout)
+
+    if not acquired:
+        logger.debug(f"single_flight: {path} not locked")
+
+    try:
+        yield
+    finally:
+        if acquired:
+            cache.delete(key)
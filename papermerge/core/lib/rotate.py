@@ -0,0 +1,178 @@
+"""
+In-process rotation of page images (jpeg previews and svg sidecars).
+
+Rotated image is written to a temporary file which then replaces the
+original one; this way hardlinked sidecars (see
+``papermerge.core.lib.storage.Storage.link_file``) shared with other
+document versions are left untouched.
+"""
+import logging
+import os
+import subprocess
+import tempfile
+
+from lxml import etree
+from PIL import Image, JpegImagePlugin
+
+from papermerge.core.app_settings import settings
+
+logger = logging.getLogger(__name__)
+
+SVG_NS = "http://www.w3.org/2000/svg"
+
+# angle is clockwise (same as PDF's /Rotate), PIL's transpositions are
+# counter clockwise
+TRANSPOSE = {
+    90: Image.Transpose.ROTATE_270,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_90,
+}
+
+
+def normalize_angle(angle: int) -> int:
+    angle = angle % 360
+    if angle not in (0, 90, 180, 270):
+        raise ValueError(f"Angle must be a multiple of 90, got {angle}")
+
+    return angle
+
+
+def _replace(abs_file_path: str, write) -> None:
+    """Calls ``write(temp_path)`` and moves result to ``abs_file_path``"""
+    _, ext = os.path.splitext(abs_file_path)
+    fd, temp_path = tempfile.mkstemp(
+        suffix=ext,
+        dir=os.path.dirname(abs_file_path)
+    )
+    os.close(fd)
+    try:
+        write(temp_path)
+        os.replace(temp_path, abs_file_path)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+
+def _mcu_aligned(image) -> bool:
+    """Whether image dimensions are multiples of its MCU size"""
+    # ``layer`` lists (component id, h sampling, v sampling, qtable)
+    mcu_width = 8 * max(layer[1] for layer in image.layer)
+    mcu_height = 8 * max(layer[2] for layer in image.layer)
+    width, height = image.size
+
+    return width % mcu_width == 0 and height % mcu_height == 0
+
+
+def _jpegtran(abs_file_path: str, angle: int, temp_path: str) -> None:
+    subprocess.run(
+        [
+            settings.BINARY_JPEGTRAN,
+            '-copy', 'all',
+            '-perfect',
+            '-rotate', str(angle),
+            '-outfile', temp_path,
+            abs_file_path
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True
+    )
+
+
+def rotate_jpeg(abs_file_path: str, angle: int) -> None:
+    """Rotates jpeg image clockwise by ``angle`` degrees
+
+    When image dimensions are multiples of its MCU size, image is rotated
+    losslessly in DCT domain with ``jpegtran -perfect``. Otherwise (or if
+    jpegtran is not available) image is decoded, rotated and re-encoded
+    with its original quantization tables and chroma subsampling, which
+    keeps generation loss to a minimum but does not avoid it.
+    """
+    angle = normalize_angle(angle)
+    if not angle:
+        return
+
+    with Image.open(abs_file_path) as image:
+        if image.format != 'JPEG':
+            raise ValueError(f"{abs_file_path} is not a jpeg image")
+
+        if _mcu_aligned(image):
+            try:
+                _replace(
+                    abs_file_path,
+                    lambda path: _jpegtran(abs_file_path, angle, path)
+                )
+                return
+            except (OSError, subprocess.CalledProcessError) as ex:
+                logger.warning(
+                    f"Lossless rotation of {abs_file_path} failed: {ex}"
+                )
+
+        options = {'qtables': image.quantization}
+        subsampling = JpegImagePlugin.get_sampling(image)
+        if subsampling >= 0:
+            options['subsampling'] = subsampling
+
+        rotated = image.transpose(TRANSPOSE[angle])
+
+    _replace(
+        abs_file_path,
+        lambda path: rotated.save(path, format='JPEG', **options)
+    )
+
+
+def _svg_size(root):
+    view_box = root.get('viewBox')
+    if view_box:
+        min_x, min_y, width, height = [
+            float(value) for value in view_box.replace(',', ' ').split()
+        ]
+    else:
+        min_x, min_y = 0, 0
+        width = float(root.get('width'))
+        height = float(root.get('height'))
+
+    return min_x, min_y, width, height
+
+
+def rotate_svg(abs_file_path: str, angle: int) -> None:
+    """Rotates svg image clockwise by ``angle`` degrees
+
+    Content of the svg (embedded raster image and text overlay) is wrapped
+    in a group with rotation transform, viewBox is adjusted accordingly.
+    """
+    angle = normalize_angle(angle)
+    if not angle:
+        return
+
+    parser = etree.XMLParser(huge_tree=True)
+    tree = etree.parse(abs_file_path, parser)
+    root = tree.getroot()
+    min_x, min_y, width, height = _svg_size(root)
+
+    if angle == 90:
+        translate = f"{height:g} 0"
+    elif angle == 180:
+        translate = f"{width:g} {height:g}"
+    else:
+        translate = f"0 {width:g}"
+
+    group = etree.Element(f"{{{SVG_NS}}}g")
+    group.set(
+        'transform',
+        f"translate({translate}) rotate({angle})"
+        f" translate({-min_x:g} {-min_y:g})"
+    )
+    for child in list(root):
+        group.append(child)
+    root.append(group)
+
+    if angle in (90, 270):
+        width, height = height, width
+        if root.get('width') and root.get('height'):
+            attr_width, attr_height = root.get('width'), root.get('height')
+            root.set('width', attr_height)
+            root.set('height', attr_width)
+    root.set('viewBox', f"0 0 {width:g} {height:g}")
+
+    _replace(abs_file_path, lambda path: tree.write(path))
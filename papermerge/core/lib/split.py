@@ -0,0 +1,70 @@
+"""
+Single pass PDF splitter.
+
+Writes many output PDF files, each containing a subset of source PDF pages.
+Outputs are distributed between worker threads; every worker opens
+the source PDF exactly once and writes its share of outputs.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from pikepdf import Pdf
+
+from .pdf import save_pdf
+
+logger = logging.getLogger(__name__)
+
+# upper limit of worker threads used by ``split_pdf``
+MAX_WORKERS = 8
+
+
+def _write_outputs(src_path: str, outputs: list[tuple]) -> None:
+    with Pdf.open(src_path) as src:
+        for page_numbers, dst_path in outputs:
+            with Pdf.new() as dst:
+                for page_number in page_numbers:
+                    dst.pages.append(src.pages.p(page_number))
+
+                os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+                save_pdf(dst, dst_path)
+
+
+def split_pdf(
+    src_path: str,
+    outputs: list[tuple],
+    workers: int = None
+) -> None:
+    """Splits ``src_path`` PDF file
+
+    ``outputs`` is a list of (page numbers, destination path) tuples;
+    page numbering starts with 1.
+    ``workers`` - number of worker threads, by default number of CPUs
+    (but not more than ``MAX_WORKERS``).
+    """
+    if not outputs:
+        return
+
+    if workers is None:
+        workers = min(os.cpu_count() or 1, MAX_WORKERS)
+    workers = max(1, min(workers, len(outputs)))
+
+    logger.debug(
+        f'split_pdf: src_path={src_path} outputs={len(outputs)}'
+        f' workers={workers}'
+    )
+
+    chunks = [outputs[index::workers] for index in range(workers)]
+
+    if workers == 1:
+        _write_outputs(src_path, chunks[0])
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_write_outputs, src_path, chunk)
+            for chunk in chunks
+        ]
+        for future in futures:
+            # re-raises exception (if any) of the worker
+            future.result()
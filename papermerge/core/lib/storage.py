@@ -1,14 +1,34 @@
+import hashlib
 import logging
 import os
 import shutil
 from os import listdir
 from os.path import isdir, join
 
-from .path import DocumentPath, PagePath, AUX_DIR_SIDECARS, AUX_DIR_DOCS
+from .path import (
+    DocumentPath,
+    PagePath,
+    AUX_DIR_SIDECARS,
+    AUX_DIR_DOCS,
+    AUX_DIR_BLOBS,
+    AUX_DIR_EXPORTS
+)
 from .utils import safe_to_delete
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 64 * 1024
+
+
+def file_digest(abs_file_path: str) -> str:
+    """Returns hex encoded sha256 digest of the file content"""
+    digest = hashlib.sha256()
+    with open(abs_file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
 
 class Storage:
     """
@@ -41,8 +61,14 @@ class Storage:
             f'user_{user_id}'
         )
 
+        folder3_to_delete = os.path.join(
+            self.abspath(AUX_DIR_EXPORTS),
+            f'user_{user_id}'
+        )
+
         self.safe_delete_folder(folder1_to_delete)
         self.safe_delete_folder(folder2_to_delete)
+        self.safe_delete_folder(folder3_to_delete)
 
     def safe_delete_folder(self, abs_path_to_folder_to_delete: str):
         logger.debug(
@@ -159,6 +185,41 @@ class Storage:
             if os.path.exists(abs_dirname_sidecars):
                 os.rmdir(abs_dirname_sidecars)
 
+    def delete_version(self, doc_path: DocumentPath) -> int:
+        """
+        Deletes files of one document version i.e. version's document file
+        (``docs/.../v<N>/``) and its sidecars (``sidecars/.../v<N>/``).
+
+        Returns number of reclaimed bytes. Sidecars shared (hardlinked)
+        with other versions or with the blob store do not count - their
+        content is reclaimed by ``collect_garbage`` once not referenced
+        anymore.
+        """
+        if doc_path.version < 1:
+            raise ValueError("Document path does not point to a version")
+
+        reclaimed_bytes = 0
+        dirnames = (
+            doc_path.dirname(),
+            f"{doc_path.dir_sidecars}v{doc_path.version}/"
+        )
+        for dirname in dirnames:
+            abs_dirname = self.abspath(dirname)
+            if not os.path.exists(abs_dirname):
+                continue
+            if not safe_to_delete(abs_dirname):
+                continue
+
+            for root, _, files in os.walk(abs_dirname):
+                for name in files:
+                    stat = os.lstat(os.path.join(root, name))
+                    if stat.st_nlink == 1:
+                        reclaimed_bytes += stat.st_size
+
+            shutil.rmtree(abs_dirname)
+
+        return reclaimed_bytes
+
     def copy_doc(self, src: DocumentPath, dst: DocumentPath):
         """
         copy given file src file path to destination
@@ -187,63 +248,141 @@ class Storage:
             self.path(_path)
         )
 
+    def blob_path(self, digest: str, ext: str = '') -> str:
+        """Absolute path of the blob with given content digest"""
+        return self.abspath(
+            f"{AUX_DIR_SIDECARS}/{AUX_DIR_BLOBS}/{digest[:2]}/{digest}{ext}"
+        )
+
+    def intern_file(self, abs_file_path: str) -> str:
+        """
+        Stores file content in the content addressed blob store.
+
+        Blob is a hardlink to the same inode as ``abs_file_path``, thus no
+        bytes are copied. If blob with identical content was already stored,
+        ``abs_file_path`` is replaced with a link to existing blob (i.e. content
+        is deduplicated).
+
+        Returns absolute path to the blob.
+        """
+        _, ext = os.path.splitext(abs_file_path)
+        blob = self.blob_path(file_digest(abs_file_path), ext)
+
+        if not os.path.exists(blob):
+            self.make_sure_path_exists(blob)
+            try:
+                os.link(abs_file_path, blob)
+            except FileExistsError:
+                pass  # same content was just stored by someone else
+            return blob
+
+        if not os.path.samefile(blob, abs_file_path):
+            os.unlink(abs_file_path)
+            os.link(blob, abs_file_path)
+
+        return blob
+
+    def link_file(self, abs_src: str, abs_dst: str) -> None:
+        """
+        Makes ``abs_dst`` share the content of ``abs_src``.
+
+        Sidecar files never change once written, so instead of copying bytes
+        the destination becomes a hardlink of the content addressed blob.
+        Number of links of the blob is its reference count - see
+        ``collect_garbage``.
+        Falls back to plain copy if filesystem does not support hardlinks
+        (or when source and destination are on different devices).
+        """
+        self.make_sure_path_exists(abs_dst)
+        if os.path.lexists(abs_dst):
+            os.unlink(abs_dst)
+
+        try:
+            if os.stat(abs_src).st_nlink == 1:
+                # not yet in blob store
+                abs_src = self.intern_file(abs_src)
+            os.link(abs_src, abs_dst)
+        except OSError as exc:
+            logger.debug(f"link_file: falling back to copy ({exc})")
+            shutil.copy(abs_src, abs_dst)
+
+    def collect_garbage(self) -> tuple[int, int]:
+        """
+        Removes blobs which are not referenced by any page anymore.
+
+        Blob is not referenced when the only remaining link to its inode is
+        the blob itself.
+
+        Returns a tuple (number of removed blobs, number of reclaimed bytes).
+        """
+        blobs_dir = self.abspath(f"{AUX_DIR_SIDECARS}/{AUX_DIR_BLOBS}")
+        removed_count, reclaimed_bytes = 0, 0
+
+        if not os.path.exists(blobs_dir):
+            return removed_count, reclaimed_bytes
+
+        for entry in os.scandir(blobs_dir):
+            if not entry.is_dir():
+                continue
+            for blob in os.scandir(entry.path):
+                stat = blob.stat()
+                if stat.st_nlink == 1:
+                    os.unlink(blob.path)
+                    removed_count += 1
+                    reclaimed_bytes += stat.st_size
+            if not os.listdir(entry.path):
+                os.rmdir(entry.path)
+
+        logger.debug(
+            f"collect_garbage: removed {removed_count} blobs,"
+            f" reclaimed {reclaimed_bytes} bytes"
+        )
+        return removed_count, reclaimed_bytes
+
     def copy_page_txt(self, src: PagePath, dst: PagePath):
         logger.debug(f"copy_page_txt src={src.txt_url} dst={dst.txt_url}")
-        src_txt = self.abspath(src.txt_url)
-        dst_txt = self.abspath(dst.txt_url)
-
-        self.make_sure_path_exists(
+        self.link_file(
+            self.abspath(src.txt_url),
             self.abspath(dst.txt_url)
         )
 
-        shutil.copy(src_txt, dst_txt)
-
     def copy_page_jpg(self, src: PagePath, dst: PagePath):
         logger.debug(f"copy_page_jpg src={src.jpg_url} dst={dst.jpg_url}")
-        src_jpg = self.abspath(src.jpg_url)
-        dst_jpg = self.abspath(dst.jpg_url)
-
-        self.make_sure_path_exists(
+        self.link_file(
+            self.abspath(src.jpg_url),
             self.abspath(dst.jpg_url)
         )
-        shutil.copy(src_jpg, dst_jpg)
 
     def copy_page_hocr(self, src: PagePath, dst: PagePath):
         logger.debug(f"copy_page_hocr: src={src.hocr_url} dst={dst.hocr_url}")
-        src_hocr = self.abspath(src.hocr_url)
-        dst_hocr = self.abspath(dst.hocr_url)
-
-        self.make_sure_path_exists(
+        self.link_file(
+            self.abspath(src.hocr_url),
             self.abspath(dst.hocr_url)
         )
 
-        shutil.copy(src_hocr, dst_hocr)
-
     def copy_page_svg(self, src: PagePath, dst: PagePath):
         logger.debug(f"copy_page_svg: src={src.svg_url} dst={dst.svg_url}")
-        src_svg = self.abspath(src.svg_url)
-        dst_svg = self.abspath(dst.svg_url)
-
-        self.make_sure_path_exists(self.abspath(dst.svg_url))
-
-        shutil.copy(src_svg, dst_svg)
+        self.link_file(
+            self.abspath(src.svg_url),
+            self.abspath(dst.svg_url)
+        )
 
     def copy_page_preview(self, src: PagePath, dst: PagePath):
         logger.debug(
             f"copy_page_preview: src={src.preview_url} dst={dst.preview_url}"
         )
-        src_preview = self.abspath(src.preview_url)
-        dst_preview = self.abspath(dst.preview_url)
-
-        self.make_sure_path_exists(self.abspath(dst.preview_url))
-
-        shutil.copy(src_preview, dst_preview)
+        self.link_file(
+            self.abspath(src.preview_url),
+            self.abspath(dst.preview_url)
+        )
 
     def copy_page(self, src: PagePath, dst: PagePath):
         """
         Copies page data from source folder/path to page destination folder/path
 
         Page data are files with 'txt', 'hocr', 'jpg', 'svg' extentions.
+        Data is not physically copied - destination files are hardlinks
+        of the content addressed blobs (see ``link_file``).
         """
         for inst in [src, dst]:
             if not isinstance(inst, PagePath):
@@ -1,11 +1,54 @@
+"""
+TIFF documents.
+
+TIFF files are converted to PDF in-process with img2pdf, one page at
+a time; each page is written to its own one page PDF file, which are
+then joined with pikepdf. Thus memory usage does not depend on number
+of pages: at most one page image is held in memory and page PDFs stay on
+disk until they are joined (pikepdf copies their content from disk).
+
+Pages compressed with a codec PDF supports are embedded without decoding
+(i.e. without any loss and without growing): JPEG pages (YCbCr or
+grayscale) and CCITT group 4 pages (e.g. faxes) stored in a single strip.
+Other pages (e.g. LZW or Deflate compressed) are decoded by Pillow and
+re-encoded losslessly: 1-bit pages as CCITT group 4, others as PNG.
+ImageMagick is used only for TIFFs img2pdf refuses (e.g. with alpha
+channel).
+"""
+import io
 import os
+import shutil
+import struct
 import logging
+import tempfile
+from contextlib import ExitStack
+
+import img2pdf
+from pikepdf import Pdf
+from PIL import Image, ImageOps, TiffImagePlugin
 
 from .runcmd import run
 from ..app_settings import settings
 
 logger = logging.getLogger(__name__)
 
+BYTE_ORDERS = {
+    b'II': '<',  # little endian
+    b'MM': '>',  # big endian
+}
+TIFF_VERSION = 42
+BIGTIFF_VERSION = 43
+ORIENTATION = 274
+# photometric interpretations
+WHITE_IS_ZERO = 0
+BLACK_IS_ZERO = 1
+YCBCR = 6
+# TIFF field types
+SHORT = 3
+LONG = 4
+# page PDFs joined at once; each of them is kept open until joined
+PAGES_PER_PART = 100
+
 
 def pdfname_from_tiffname(doc_url):
     """
@@ -27,6 +70,260 @@ def pdfname_from_tiffname(doc_url):
     return new_doc_url, f"{base_root}.pdf"
 
 
+def get_tiff_pagecount(filepath) -> int:
+    """
+    Returns number of pages of TIFF file.
+
+    Pages are counted by walking the chain of image file directories
+    (IFDs); page images are not read.
+    """
+    with open(filepath, 'rb') as f:
+        header = f.read(16)
+        byte_order = BYTE_ORDERS.get(header[:2])
+        if byte_order is None:
+            raise ValueError(f"{filepath} is not a TIFF file")
+
+        version, = struct.unpack(f'{byte_order}H', header[2:4])
+        if version == TIFF_VERSION:
+            offset, = struct.unpack(f'{byte_order}I', header[4:8])
+            count_format, entry_size, offset_format = 'H', 12, 'I'
+        elif version == BIGTIFF_VERSION:
+            offset, = struct.unpack(f'{byte_order}Q', header[8:16])
+            count_format, entry_size, offset_format = 'Q', 20, 'Q'
+        else:
+            raise ValueError(f"{filepath} is not a TIFF file")
+
+        count_size = struct.calcsize(count_format)
+        offset_size = struct.calcsize(offset_format)
+        visited = set()
+        page_count = 0
+
+        # offset of zero terminates the chain
+        while offset and offset not in visited:
+            visited.add(offset)
+            f.seek(offset)
+            data = f.read(count_size)
+            if len(data) < count_size:
+                break
+            entry_count, = struct.unpack(f'{byte_order}{count_format}', data)
+            page_count += 1
+            f.seek(offset + count_size + entry_count * entry_size)
+            data = f.read(offset_size)
+            if len(data) < offset_size:
+                break
+            offset, = struct.unpack(f'{byte_order}{offset_format}', data)
+
+    return page_count
+
+
+def _dpi(frame):
+    """Returns resolution of current frame of TIFF image or None"""
+    if TiffImagePlugin.X_RESOLUTION not in frame.tag_v2:
+        return None
+
+    dpi = frame.info.get('dpi')
+    if not dpi or not all(dpi):
+        return None
+
+    if frame.tag_v2.get(ORIENTATION, 1) in (5, 6, 7, 8):
+        # frame is transposed (see ``_encoded_image``)
+        return dpi[1], dpi[0]
+
+    return dpi
+
+
+def _single_strip(frame, fp):
+    """
+    Returns compressed data of current frame of TIFF image or None if
+    the frame is not stored in a single strip (e.g. it is tiled)
+    """
+    offsets = frame.tag_v2.get(TiffImagePlugin.STRIPOFFSETS)
+    byte_counts = frame.tag_v2.get(TiffImagePlugin.STRIPBYTECOUNTS)
+    if not offsets or not byte_counts:
+        return None
+    if len(offsets) != 1 or len(byte_counts) != 1:
+        return None
+
+    fp.seek(offsets[0])
+
+    return fp.read(byte_counts[0])
+
+
+def _ccitt_image(frame, strip) -> bytes:
+    """
+    Returns one page TIFF file with CCITT group 4 compressed ``strip``
+    of ``frame``
+    """
+    width, height = frame.size
+    fields = [
+        (TiffImagePlugin.IMAGEWIDTH, LONG, width),
+        (TiffImagePlugin.IMAGELENGTH, LONG, height),
+        (TiffImagePlugin.BITSPERSAMPLE, SHORT, 1),
+        (TiffImagePlugin.COMPRESSION, SHORT, 4),
+        (
+            TiffImagePlugin.PHOTOMETRIC_INTERPRETATION,
+            SHORT,
+            frame.tag_v2.get(
+                TiffImagePlugin.PHOTOMETRIC_INTERPRETATION,
+                WHITE_IS_ZERO
+            )
+        ),
+        (
+            TiffImagePlugin.FILLORDER,
+            SHORT,
+            frame.tag_v2.get(TiffImagePlugin.FILLORDER, 1)
+        ),
+        # strip follows the header and the only image file directory
+        (TiffImagePlugin.STRIPOFFSETS, LONG, 8 + 2 + 10 * 12 + 4),
+        (TiffImagePlugin.SAMPLESPERPIXEL, SHORT, 1),
+        (TiffImagePlugin.ROWSPERSTRIP, LONG, height),
+        (TiffImagePlugin.STRIPBYTECOUNTS, LONG, len(strip)),
+    ]
+    output = io.BytesIO()
+    output.write(struct.pack('<2sHIH', b'II', TIFF_VERSION, 8, len(fields)))
+    for tag, field_type, value in fields:
+        value_format = 'H2x' if field_type == SHORT else 'I'
+        output.write(
+            struct.pack(f'<HHI{value_format}', tag, field_type, 1, value)
+        )
+    # offset of zero terminates the chain of image file directories
+    output.write(struct.pack('<I', 0))
+    output.write(strip)
+
+    return output.getvalue()
+
+
+def _embeddable_image(frame, fp):
+    """
+    Returns current frame of TIFF image as a single page image file, which
+    img2pdf embeds as it is, or None if frame has to be decoded
+    """
+    tags = frame.tag_v2
+    if tags.get(ORIENTATION, 1) != 1:
+        return None
+    if tags.get(TiffImagePlugin.PLANAR_CONFIGURATION, 1) != 1:
+        return None
+
+    compression = frame.info.get('compression')
+    photometric = tags.get(TiffImagePlugin.PHOTOMETRIC_INTERPRETATION)
+
+    if compression == 'group4' and photometric in (
+        WHITE_IS_ZERO,
+        BLACK_IS_ZERO,
+        None
+    ):
+        strip = _single_strip(frame, fp)
+        if strip is None:
+            return None
+        return _ccitt_image(frame, strip)
+
+    # RGB (not YCbCr) JPEG data cannot be told apart from YCbCr one in PDF
+    if compression == 'jpeg' and (
+        photometric == YCBCR or (
+            photometric == BLACK_IS_ZERO and frame.mode == 'L'
+        )
+    ):
+        strip = _single_strip(frame, fp)
+        if strip is None:
+            return None
+        tables = tags.get(TiffImagePlugin.JPEGTABLES)
+        if tables:
+            # tables and strip are both JPEG streams (SOI ... EOI)
+            strip = bytes(tables[:-2]) + strip[2:]
+        return strip
+
+    return None
+
+
+def _encoded_image(frame) -> bytes:
+    """
+    Returns current (decoded) frame of TIFF image as a single page image
+    file, losslessly compressed
+    """
+    # orientation tag is not kept in the single page image
+    page = ImageOps.exif_transpose(frame)
+    output = io.BytesIO()
+    if page.mode == '1':
+        page.save(output, format='TIFF', compression='group4')
+    else:
+        page.save(output, format='PNG')
+
+    return output.getvalue()
+
+
+def _join_pdfs(paths, dst: str) -> None:
+    with ExitStack() as stack, Pdf.new() as pdf:
+        for path in paths:
+            part = stack.enter_context(Pdf.open(path))
+            pdf.pages.extend(part.pages)
+        # content of pages is copied (from disk) when ``pdf`` is saved,
+        # thus all parts are kept open until then
+        pdf.save(dst)
+
+
+def tiff_pages_to_pdf(src: str, dst: str) -> None:
+    """
+    Converts TIFF file ``src`` to PDF file ``dst`` one page at a time
+    (see module docstring)
+    """
+    dirname = os.path.dirname(os.path.abspath(dst))
+    with tempfile.TemporaryDirectory(dir=dirname) as tempdir:
+        page_paths = []
+        part_paths = []
+
+        def join_pages():
+            part_path = os.path.join(tempdir, f'part-{len(part_paths)}.pdf')
+            _join_pdfs(page_paths, part_path)
+            for page_path in page_paths:
+                os.remove(page_path)
+            page_paths.clear()
+            part_paths.append(part_path)
+
+        with open(src, 'rb') as fp, Image.open(src) as image:
+            for index in range(image.n_frames):
+                image.seek(index)
+                options = {}
+                dpi = _dpi(image)
+                if dpi:
+                    # embedded images may lack (or have other) resolution
+                    options['layout_fun'] = img2pdf.get_fixed_dpi_layout_fun(
+                        dpi
+                    )
+                data = _embeddable_image(image, fp)
+                if data is None:
+                    data = _encoded_image(image)
+
+                page_path = os.path.join(tempdir, f'page-{index}.pdf')
+                with open(page_path, 'wb') as page_file:
+                    img2pdf.convert(data, outputstream=page_file, **options)
+                page_paths.append(page_path)
+                if len(page_paths) == PAGES_PER_PART:
+                    join_pages()
+
+        if page_paths:
+            join_pages()
+
+        if len(part_paths) == 1:
+            shutil.move(part_paths[0], dst)
+        else:
+            _join_pdfs(part_paths, dst)
+
+
+def tiff2pdf(src: str, dst: str) -> None:
+    """Converts (multi page) TIFF file ``src`` to PDF file ``dst``"""
+    logger.debug(f"tiff2pdf source={src} dest={dst}")
+
+    try:
+        tiff_pages_to_pdf(src, dst)
+    except (
+        img2pdf.AlphaChannelError,
+        img2pdf.UnsupportedColorspaceError,
+        img2pdf.ImageOpenError
+    ) as error:
+        logger.info(f"tiff2pdf: {error}; converting {src} with ImageMagick")
+        run((settings.BINARY_CONVERT, src, dst))
+
+
 def convert_tiff2pdf(doc_url):
 
     logger.debug(f"convert_tiff2pdf for {doc_url}")
@@ -35,17 +332,7 @@ def convert_tiff2pdf(doc_url):
         doc_url
     )
 
-    logger.debug(
-        f"tiff2pdf source={doc_url} dest={new_doc_url}"
-    )
-
-    cmd = (
-        settings.BINARY_CONVERT,
-        doc_url,
-        new_doc_url,
-    )
-
-    run(cmd)
+    tiff2pdf(doc_url, new_doc_url)
 
     # returns new filename
     return new_filename
@@ -12,7 +12,9 @@ SAFE_EXTENSIONS = [
     '.png',
     '.hocr',
     '.pdf',
-    '.tiff'
+    '.tiff',
+    '.zip',
+    '.gz'
 ]
 
 
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-17 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_remove_basetreenode_unique title per parent_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentversion',
+            name='manifest',
+            field=models.JSONField(blank=True, default=None, null=True),
+        ),
+    ]
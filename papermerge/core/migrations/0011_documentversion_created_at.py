@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-17 09:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_documentversion_manifest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentversion',
+            name='created_at',
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_documentversion_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.0.10 on 2026-10-17 15:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_page_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('node_ids', models.JSONField(default=list)),
+                ('include_version', models.CharField(max_length=32)),
+                ('archive_type', models.CharField(max_length=32)),
+                ('file_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('entries', models.IntegerField(default=0)),
+                ('download_name', models.CharField(blank=True, default='', max_length=255)),
+                ('content_type', models.CharField(blank=True, default='', max_length=255)),
+                ('file_extension', models.CharField(blank=True, default='', max_length=16)),
+                ('size', models.BigIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='exportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('pending', 'running'))), fields=('user', 'fingerprint'), name='unique_active_export_job'),
+        ),
+    ]
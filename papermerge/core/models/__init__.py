@@ -13,6 +13,7 @@ from papermerge.core.models.tags import (
 )
 
 from papermerge.core.models.document_version import DocumentVersion
+from papermerge.core.models.export_job import ExportJob
 
 
 class User(AbstractUser):
@@ -1,18 +1,25 @@
 import logging
 import os
+import tempfile
 from typing import Optional
 from os.path import getsize
 from pikepdf import Pdf
 
 from django.db import models
 from django.db import transaction
+from django.utils import timezone
 
+from papermerge.core.lib import mime
 from papermerge.core.lib.path import DocumentPath, PagePath
+from papermerge.core.lib.pdf import save_pdf
+from papermerge.core.lib.fingerprint import pdf_fingerprints
+from papermerge.core.lib.split import split_pdf
+from papermerge.core.lib.tiff import pdfname_from_tiffname, tiff2pdf
 from papermerge.core.signal_definitions import document_post_upload
 from papermerge.core.storage import get_storage_instance, abs_path
 from papermerge.core.models import utils
 
-from .node import BaseTreeNode
+from .node import BaseTreeNode, NODE_TYPE_DOCUMENT
 
 from .page import Page
 from .document_version import DocumentVersion
@@ -21,6 +28,18 @@ from .document_version import DocumentVersion
 logger = logging.getLogger(__name__)
 
 
+def idified_document_title(title: str, document_id) -> str:
+    """
+    Returns document title with ID part inserted before extention
+    (see ``Document.idified_title``)
+    """
+    base_title_arr = title.split('.')[:-1]
+    base_title = '.'.join(base_title_arr)
+    ext = title.split('.')[-1]
+
+    return f'{base_title}-{document_id}.{ext}'
+
+
 class UploadStrategy:
     """
     Defines how to proceed with uploaded file
@@ -69,6 +88,117 @@ class DocumentManager(models.Manager):
         #    doc.inherit_kv_from(parent)
         return doc
 
+    @transaction.atomic
+    def bulk_create_from_pages(self, items, parent, **kwargs):
+        """
+        Creates one document per item of ``items`` in ``parent`` folder.
+
+        ``items`` is a list of (title, pages) tuples; ``pages`` is
+        a non empty list of ``Page`` instances (of any document version).
+        Each new document gets one document version with copies of
+        the ``pages`` (PDF pages, OCR data and text).
+
+        Source PDF of each document version is opened only once, output
+        PDFs are written in parallel (see
+        ``papermerge.core.lib.split.split_pdf``) and database rows are
+        inserted in bulk - thus ``post_save`` signals are not sent
+        (callers send ``page_move_to_folder_batch`` instead).
+
+        Returns list of newly created document versions.
+        """
+        now = timezone.now()
+        user = parent.user
+        documents = []
+        versions = []
+        new_pages = []
+        # source document version => list of (page numbers, abs dst path)
+        outputs = {}
+        sources = {}
+
+        for title, pages in items:
+            first_page = pages[0]
+            doc = self.model(
+                title=title,
+                lang=first_page.lang,
+                parent=parent,
+                user=user,
+                ctype=NODE_TYPE_DOCUMENT,
+                created_at=now,
+                updated_at=now,
+                **kwargs
+            )
+            # multi-table inheritance: document's primary key is
+            # the pointer to its node
+            doc.basetreenode_ptr_id = doc.id
+            documents.append(doc)
+
+            text = ' '.join(page.text.strip() for page in pages)
+            version = DocumentVersion(
+                document=doc,
+                number=1,  # versioning number starts with 1
+                file_name=first_page.document_version.file_name,
+                lang=doc.lang,
+                page_count=len(pages),
+                short_description="Original",
+                text=text.strip()
+            )
+            versions.append(version)
+
+            for number, page in enumerate(pages, start=1):
+                new_pages.append(
+                    Page(
+                        document_version=version,
+                        number=number,
+                        page_count=len(pages),
+                        lang=page.lang,
+                        text=page.text
+                    )
+                )
+
+            src_version = first_page.document_version
+            sources[src_version.pk] = src_version
+            outputs.setdefault(src_version.pk, []).append(
+                (
+                    [page.number for page in pages],
+                    abs_path(version.document_path.url)
+                )
+            )
+
+        for src_version_id, src_outputs in outputs.items():
+            split_pdf(
+                sources[src_version_id].abs_file_path(),
+                src_outputs
+            )
+
+        for version in versions:
+            version.size = getsize(abs_path(version.document_path.url))
+
+        BaseTreeNode.objects.bulk_create([
+            BaseTreeNode(**{
+                field.attname: getattr(doc, field.attname)
+                for field in BaseTreeNode._meta.concrete_fields
+            })
+            for doc in documents
+        ])
+        # ``bulk_create`` does not support multi-table inheritance
+        utils.bulk_insert_child_rows(self.model, documents, using=self.db)
+
+        DocumentVersion.objects.bulk_create(versions)
+        Page.objects.bulk_create(new_pages)
+
+        storage = get_storage_instance()
+        for (_, pages), version in zip(items, versions):
+            for number, page in enumerate(pages, start=1):
+                storage.copy_page(
+                    src=page.page_path,
+                    dst=PagePath(
+                        document_path=version.document_path,
+                        page_num=number
+                    )
+                )
+
+        return versions
+
     def _get_parent(self, parent_id):
         """
         Returns parent node instance based on ``parent_id``
@@ -128,11 +258,7 @@ class Document(BaseTreeNode):
             input: title="invoice.pdf", id="233453"
             output: invoice-233453.pdf
         """
-        base_title_arr = self.title.split('.')[:-1]
-        base_title = '.'.join(base_title_arr)
-        ext = self.title.split('.')[-1]
-
-        return f'{base_title}-{self.id}.{ext}'
+        return idified_document_title(self.title, self.id)
 
     class Meta:
         verbose_name = "Document"
@@ -151,7 +277,23 @@ class Document(BaseTreeNode):
         If document has zero sized document version, it will associate
         payload with that (existing) version, otherwise it will create
         new document version and associate it the payload.
+
+        TIFF files are converted to PDF first i.e. document version
+        is always a PDF file.
         """
+        if mime.Mime(file_path).is_tiff():
+            with tempfile.TemporaryDirectory() as tempdir:
+                _, pdf_file_name = pdfname_from_tiffname(file_name)
+                pdf_file_path = os.path.join(tempdir, pdf_file_name)
+                tiff2pdf(os.fspath(file_path), pdf_file_path)
+
+                return self.upload(
+                    payload=pdf_file_path,
+                    file_path=pdf_file_path,
+                    file_name=pdf_file_name,
+                    strategy=strategy
+                )
+
         pdf = Pdf.open(payload)
 
         document_version = self.versions.filter(size=0).last()
@@ -159,13 +301,15 @@ class Document(BaseTreeNode):
         if not document_version:
             document_version = DocumentVersion(
                 document=self,
-                number=self.versions.count(),
+                number=self.next_version_number(),
                 lang=self.lang
             )
 
         document_version.file_name = file_name
         document_version.size = getsize(file_path)
         document_version.page_count = len(pdf.pages)
+        # uploaded file replaces whatever manifest version had
+        document_version.manifest = None
 
         get_storage_instance().copy_doc(
             src=file_path,
@@ -173,7 +317,7 @@ class Document(BaseTreeNode):
         )
 
         document_version.save()
-        document_version.create_pages()
+        document_version.create_pages(fingerprints=pdf_fingerprints(pdf))
         pdf.close()
 
         document_post_upload.send(
@@ -198,7 +342,7 @@ class Document(BaseTreeNode):
             first_page = pages.first()
             page_count = pages.count()
         source_pdf = Pdf.open(
-            abs_path(first_page.document_version.document_path.url)
+            first_page.document_version.abs_file_path()
         )
         dst_pdf = Pdf.new()
 
@@ -207,7 +351,7 @@ class Document(BaseTreeNode):
         if not document_version:
             document_version = DocumentVersion(
                 document=self,
-                number=self.versions.count(),
+                number=self.next_version_number(),
                 lang=self.lang
             )
 
@@ -224,7 +368,7 @@ class Document(BaseTreeNode):
         )
         os.makedirs(dirname, exist_ok=True)
 
-        dst_pdf.save(abs_path(document_version.document_path.url))
+        save_pdf(dst_pdf, abs_path(document_version.document_path.url))
 
         document_version.size = getsize(
             abs_path(document_version.document_path.url)
@@ -254,32 +398,59 @@ class Document(BaseTreeNode):
         previous document (useful when new document was OCRed or
         when pages were rotated)
         """
-        last_doc_version = self.versions.last()
-        new_page_count = last_doc_version.page_count
-        if page_count:
-            new_page_count = page_count
-
-        new_doc_version = DocumentVersion(
-            document=self,
-            number=last_doc_version.number + 1,
-            file_name=last_doc_version.file_name,
-            size=0,  # TODO: set to newly created file size
-            page_count=new_page_count,
-            short_description=short_description,
-            lang=last_doc_version.lang
-        )
-        new_doc_version.save()
-
-        for page_number in range(1, new_page_count + 1):
-            Page.objects.create(
-                document_version=new_doc_version,
-                number=page_number,
+        with transaction.atomic():
+            # concurrent version bumps of the same document are serialized
+            self.lock()
+            last_doc_version = self.versions.last()
+            new_page_count = last_doc_version.page_count
+            if page_count:
+                new_page_count = page_count
+
+            new_doc_version = DocumentVersion(
+                document=self,
+                number=last_doc_version.number + 1,
+                file_name=last_doc_version.file_name,
+                size=0,  # TODO: set to newly created file size
                 page_count=new_page_count,
+                short_description=short_description,
                 lang=last_doc_version.lang
             )
+            new_doc_version.save()
+            new_doc_version.create_pages()
 
         return new_doc_version
 
+    def next_version_number(self):
+        """
+        Number of the next document version.
+
+        Version numbers are not necessarily contiguous (archived versions
+        may be pruned - see ``compact_document_versions_task``), thus
+        next number is derived from the last version's number and not
+        from the count of versions.
+        """
+        last_version = self.versions.last()
+        if last_version is None:
+            return 1
+
+        return last_version.number + 1
+
+    def lock(self):
+        """
+        Locks document's row until the end of current transaction.
+
+        Concurrent page operations on the same document wait for each other
+        (while operations on different documents run in parallel).
+        Must be called inside ``transaction.atomic`` block.
+        On databases without ``SELECT ... FOR UPDATE`` support (e.g. SQLite,
+        which locks the whole database on write anyway) this is a no-op.
+        """
+        list(
+            Document.objects.select_for_update().filter(
+                pk=self.pk
+            ).values_list('pk', flat=True)
+        )
+
     def __repr__(self):
         return f"Document(id={self.pk}, title={self.title})"
 
@@ -1,19 +1,75 @@
 import os
 import uuid
 import logging
+import tempfile
 
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact
 from django.utils.translation import gettext_lazy as _
 from papermerge.core.storage import abs_path
 
-from pdf2image import convert_from_path
-from pdf2image.generators import counter_generator
+from pikepdf import Pdf
 
+from papermerge.core.lib import manifest
 from papermerge.core.lib.path import DocumentPath
+from papermerge.core.lib.pdf import save_pdf
+from papermerge.core.lib.preview import render_previews
 
 
 logger = logging.getLogger(__name__)
 
+# (new page number, old page number) pairs copied by one UPDATE statement
+# in ``DocumentVersion.copy_text_field`` on databases without
+# ``UPDATE ... FROM`` support; each pair binds three parameters
+COPY_TEXT_BATCH_SIZE = 250
+
+
+def supports_update_from(connection) -> bool:
+    """Whether database supports ``UPDATE ... FROM (VALUES ...)`` joins"""
+    if connection.vendor == 'postgresql':
+        return True
+
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 33)
+
+    return False
+
+
+class DocumentVersionQuerySet(models.QuerySet):
+
+    def prunable(self, keep_last=None, older_than=None):
+        """
+        Archived document versions outside of retention policy.
+
+        Document version is kept if it is one of the ``keep_last`` last
+        versions of the document or if it was created after ``older_than``
+        (datetime). When both ``keep_last`` and ``older_than`` are None
+        retention policy is "keep everything".
+        Last version of the document is never prunable.
+        """
+        if keep_last is None and older_than is None:
+            return self.none()
+
+        newer_versions = DocumentVersion.objects.filter(
+            document=OuterRef('document'),
+            number__gt=OuterRef('number')
+        ).order_by().values('document').annotate(
+            count=Count('pk')
+        ).values('count')
+
+        result = self.annotate(
+            newer_count=Coalesce(Subquery(newer_versions), 0)
+        ).filter(newer_count__gt=0)
+
+        if keep_last is not None:
+            result = result.filter(newer_count__gte=keep_last)
+        if older_than is not None:
+            result = result.filter(created_at__lt=older_than)
+
+        return result
+
 
 class DocumentVersion(models.Model):
     """Document Version
@@ -69,6 +125,23 @@ class DocumentVersion(models.Model):
 
     text = models.TextField(blank=True)
 
+    #: Lazy document versions do not have their own file (yet).
+    #: Instead they store a list of (source version, source page number,
+    #: rotation) entries - see ``papermerge.core.lib.manifest``.
+    #: File is built from the manifest on first access, after which
+    #: manifest is set back to ``None``.
+    manifest = models.JSONField(
+        blank=True,
+        null=True,
+        default=None
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    objects = DocumentVersionQuerySet.as_manager()
+
     class Meta:
         ordering = ('number',)
         verbose_name = _('Document version')
@@ -78,34 +151,92 @@ class DocumentVersion(models.Model):
         return f"DocumentVersion(id={self.pk}, number={self.number})"
 
     def abs_file_path(self):
+        """
+        Returns absolute path of the file associated with document version.
+
+        Lazy document version's file is built first.
+        """
+        self.materialize()
+
         return abs_path(
             self.document_path.url
         )
 
+    @property
+    def is_lazy(self):
+        return self.manifest is not None
+
+    def get_manifest(self) -> list[dict]:
+        """Returns page manifest of the document version
+
+        For non lazy document versions, manifest points to version's
+        own pages.
+        """
+        if self.manifest is not None:
+            return self.manifest
+
+        return manifest.identity(self.pk, self.page_count)
+
+    def materialize(self):
+        """Builds PDF file of the lazy document version from its manifest
+
+        Does nothing for non lazy document versions.
+        """
+        if self.manifest is None:
+            return
+
+        logger.debug(f'materialize: document_version_id={self.pk}')
+        sources = {}
+        dst = Pdf.new()
+        try:
+            for item in self.manifest:
+                version_id = item['version']
+                if version_id not in sources:
+                    src_version = DocumentVersion.objects.get(pk=version_id)
+                    sources[version_id] = Pdf.open(
+                        src_version.abs_file_path()
+                    )
+                dst.pages.append(
+                    sources[version_id].pages.p(item['number'])
+                )
+                if item['angle']:
+                    dst.pages[-1].rotate(item['angle'], relative=True)
+
+            file_path = abs_path(self.document_path.url)
+            dirname = os.path.dirname(file_path)
+            os.makedirs(dirname, exist_ok=True)
+            # write to temporary file first, so that concurrent readers
+            # never see half written file
+            fd, temp_path = tempfile.mkstemp(suffix='.pdf', dir=dirname)
+            os.close(fd)
+            save_pdf(dst, temp_path)
+            os.replace(temp_path, file_path)
+        finally:
+            dst.close()
+            for pdf in sources.values():
+                pdf.close()
+
+        self.size = os.path.getsize(file_path)
+        self.manifest = None
+        self.save(update_fields=['size', 'manifest'])
+
     def generate_previews(self, page_number=None):
         logger.debug('generate_previews BEGIN')
         abs_dirname = abs_path(self.document_path.dirname_sidecars())
 
-        kwargs = {
-            'pdf_path': abs_path(self.document_path.url),
-            'output_folder':  abs_dirname,
-            'fmt': 'jpg',
-            'size': (900,),
-            'output_file': counter_generator(padding_goal=3)
-        }
-
         # in case page_number not None - generate only specific
         # page number's preview
         if page_number:
-            kwargs['first_page'] = page_number
-            kwargs['last_page'] = page_number
+            pages = [page_number]
+        else:
+            pages = range(1, self.page_count + 1)
 
-        os.makedirs(
-            abs_dirname,
-            exist_ok=True
-        )
         # generates jpeg previews of PDF file using pdftoppm (poppler-utils)
-        convert_from_path(**kwargs)
+        render_previews(
+            pdf_path=self.abs_file_path(),
+            output_dir=abs_dirname,
+            pages=pages
+        )
         logger.debug('generate_previews END')
 
     @property
@@ -130,12 +261,14 @@ class DocumentVersion(models.Model):
             file_name=self.file_name,
         )
 
-    def create_pages(self, page_count=None):
+    def create_pages(self, page_count=None, fingerprints=None):
         """
         Creates Page models for current document version.
 
         If no argument is supplied, will read
-        number of pages from `self.page_count`
+        number of pages from `self.page_count`.
+        ``fingerprints`` is an optional list of page content fingerprints
+        (n-th item is the fingerprint of the n-th page).
         """
 
         new_page_count = self.page_count  # may be zero
@@ -149,17 +282,55 @@ class DocumentVersion(models.Model):
             # Also no argument was supplied. Nothing to do.
             return
 
-        for page_number in range(1, new_page_count + 1):
-            self.pages.create(
+        fingerprints = fingerprints or []
+
+        self.pages.bulk_create([
+            self.pages.model(
+                document_version=self,
                 number=page_number,
                 page_count=new_page_count,
-                lang=self.lang
+                lang=self.lang,
+                fingerprint=(
+                    fingerprints[page_number - 1]
+                    if page_number <= len(fingerprints) else ''
+                )
             )
+            for page_number in range(1, new_page_count + 1)
+        ])
 
         if new_page_count and new_page_count != self.page_count:
             self.page_count = new_page_count
             self.save()
 
+    def ocr_reuse_map(self) -> dict:
+        """
+        Maps page numbers of this document version to pages of the
+        previous document version with identical content and available
+        OCR data.
+
+        Pages are matched by their content fingerprint, thus a page
+        is matched even if it changed its position. Pages not present
+        in the returned dictionary need to be OCRed.
+        """
+        previous_version = self.document.versions.filter(
+            number__lt=self.number
+        ).last()
+        if previous_version is None:
+            return {}
+
+        ocred_pages = {}
+        for page in previous_version.pages.exclude(fingerprint=''):
+            if page.fingerprint in ocred_pages:
+                continue
+            if os.path.exists(abs_path(page.txt_url)):
+                ocred_pages[page.fingerprint] = page
+
+        return {
+            page.number: ocred_pages[page.fingerprint]
+            for page in self.pages.exclude(fingerprint='')
+            if page.fingerprint in ocred_pages
+        }
+
     @property
     def has_combined_text(self):
         """
@@ -167,12 +338,7 @@ class DocumentVersion(models.Model):
         page contains non empty, non whitespace text - otherwise
         returns ``False``
         """
-        text = ''
-
-        for page in self.pages.all():
-            text = text + ' ' + page.text
-
-        return len(text.strip()) != 0
+        return self.pages.filter(text__regex=r'\S').exists()
 
     def update_text_field(self, streams):
         """Update document versions's text field from IO streams.
@@ -186,25 +352,175 @@ class DocumentVersion(models.Model):
         Returns True if document version contains non empty non whitespace
         text (i.e it was OCRed)
         """
-        text = []
-
         logger.debug(
             'document.update_text_field: '
             f'document_id={self.pk} streams_count={len(streams)}'
         )
 
-        for page, stream in zip(self.pages.all(), streams):
-            if len(page.text) == 0:
-                page.update_text_field(stream)
-                text.append(page.stripped_text)
+        return self.update_pages_text([stream.read() for stream in streams])
+
+    def update_pages_text(self, texts):
+        """Update pages' and document versions's text field from strings.
+
+        Arguments:
+            ``texts`` - a list of strings; n-th string is the text of
+            n-th page
+
+        Only pages without text are updated. Pages are updated with one
+        ``bulk_update`` and document version's text is computed from
+        their texts in one step; all in one transaction.
+
+        Returns True if document version contains non empty non whitespace
+        text (i.e it was OCRed)
+        """
+        changed_pages = []
+
+        with transaction.atomic():
+            for page, text in zip(self.pages.order_by('number'), texts):
+                if len(page.text) == 0:
+                    page.text = text
+                    changed_pages.append(page)
+
+            if changed_pages:
+                self.pages.bulk_update(changed_pages, ['text'])
+
+            stripped_text = ' '.join(
+                page.stripped_text for page in changed_pages
+            ).strip()
+            if stripped_text:
+                self.text = stripped_text
+                self.save(update_fields=['text'])
+
+        return self.has_combined_text
+
+    def copy_text_field(self, old_version, page_map):
+        """Copies pages' ``text`` field from ``old_version``.
+
+        Arguments:
+            ``old_version`` - document version to copy text from
+            ``page_map`` - a list of (new page number, old page number)
+                pairs
+
+        See ``copy_text_fields``.
+        """
+        self.copy_text_fields([(old_version, page_map)])
+
+    def copy_text_fields(self, sources):
+        """Copies pages' ``text`` field from one or more document versions.
+
+        Arguments:
+            ``sources`` - a list of (old document version, page map) pairs;
+                page map is a list of (new page number, old page number)
+                pairs
+
+        Texts are copied by the database, without reading them. Pages
+        shifted by the same offset (e.g. identity mapping) are copied with
+        one ``UPDATE ... SET text = (SELECT ...)`` statement, any other
+        page map with one ``UPDATE ... FROM (VALUES ...)`` join. Databases
+        without ``UPDATE ... FROM`` (e.g. MySQL) copy such page maps in
+        batches of ``COPY_TEXT_BATCH_SIZE`` pages. Document version's text
+        field is recomputed with one more query.
+        """
+        copied = False
+        for old_version, page_map in sources:
+            page_map = list(page_map)
+            if page_map:
+                self._copy_text_field(old_version, page_map)
+                copied = True
+
+        if not copied:
+            return
 
-        stripped_text = ' '.join(text)
-        stripped_text = stripped_text.strip()
+        texts = self.pages.values_list('text', flat=True)
+        stripped_text = ' '.join(text.strip() for text in texts).strip()
         if stripped_text:
             self.text = stripped_text
-            self.save()
+            self.save(update_fields=['text'])
 
-        return self.has_combined_text
+    def _copy_text_field(self, old_version, page_map):
+        new_numbers = sorted(new_number for new_number, _ in page_map)
+        offsets = {
+            new_number - old_number for new_number, old_number in page_map
+        }
+        first, last = new_numbers[0], new_numbers[-1]
+        if len(offsets) == 1 and last - first + 1 == len(page_map):
+            old_text = old_version.pages.filter(
+                number=models.OuterRef('number') - offsets.pop()
+            ).values('text')[:1]
+            self.pages.filter(
+                number__range=(first, last)
+            ).update(
+                text=models.Subquery(old_text)
+            )
+            return
+
+        connection = connections[router.db_for_write(self.pages.model)]
+        if supports_update_from(connection):
+            self._copy_text_field_join(connection, old_version, page_map)
+            return
+
+        for index in range(0, len(page_map), COPY_TEXT_BATCH_SIZE):
+            self._copy_text_field_batch(
+                old_version,
+                page_map[index:index + COPY_TEXT_BATCH_SIZE]
+            )
+
+    def _copy_text_field_join(self, connection, old_version, page_map):
+        """
+        Copies texts with one ``UPDATE ... FROM`` statement joining pages
+        of both versions via ``page_map`` (SQLite >= 3.33, PostgreSQL).
+
+        Page numbers are integers and are inlined in the statement, so
+        the number of bound parameters does not depend on the number of
+        pages.
+        """
+        page_model = self.pages.model
+        qn = connection.ops.quote_name
+        table = qn(page_model._meta.db_table)
+        number = qn(page_model._meta.get_field('number').column)
+        text = qn(page_model._meta.get_field('text').column)
+        version = qn(page_model._meta.get_field('document_version').column)
+        values = ', '.join(
+            f"({int(new_number)}, {int(old_number)})"
+            for new_number, old_number in page_map
+        )
+        # VALUES columns are named column1, column2 by both databases
+        sql = (
+            f"UPDATE {table} SET {text} = old_page.{text}"
+            f" FROM (VALUES {values}) AS page_map, {table} AS old_page"
+            f" WHERE {table}.{version} = %s"
+            f" AND {table}.{number} = page_map.column1"
+            f" AND old_page.{version} = %s"
+            f" AND old_page.{number} = page_map.column2"
+        )
+        pk_field = self._meta.pk
+        params = [
+            pk_field.get_db_prep_value(self.pk, connection),
+            pk_field.get_db_prep_value(old_version.pk, connection),
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def _copy_text_field_batch(self, old_version, page_map):
+        old_number = models.Case(
+            *[
+                models.When(
+                    Exact(models.OuterRef('number'), new_number),
+                    then=models.Value(old_number)
+                )
+                for new_number, old_number in page_map
+            ],
+            output_field=models.IntegerField()
+        )
+        old_text = old_version.pages.filter(
+            number=old_number
+        ).values('text')[:1]
+
+        self.pages.filter(
+            number__in=[new_number for new_number, _ in page_map]
+        ).update(
+            text=models.Subquery(old_text)
+        )
 
     def get_ocred_text(
         self,
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import uuid
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from papermerge.core.lib.path import AUX_DIR_EXPORTS
+from papermerge.core.storage import abs_path
+
+EXPORT_STATUS_PENDING = 'pending'
+EXPORT_STATUS_RUNNING = 'running'
+EXPORT_STATUS_SUCCEEDED = 'succeeded'
+EXPORT_STATUS_FAILED = 'failed'
+
+EXPORT_STATUS_CHOICES = [
+    (EXPORT_STATUS_PENDING, _('Pending')),
+    (EXPORT_STATUS_RUNNING, _('Running')),
+    (EXPORT_STATUS_SUCCEEDED, _('Succeeded')),
+    (EXPORT_STATUS_FAILED, _('Failed')),
+]
+
+# export jobs in these states are reused by identical export requests
+EXPORT_STATUS_ACTIVE = (EXPORT_STATUS_PENDING, EXPORT_STATUS_RUNNING)
+
+
+def export_fingerprint(
+    node_ids,
+    include_version,
+    archive_type,
+    file_name=None
+) -> str:
+    """Returns digest identifying export request's parameters"""
+    value = json.dumps([
+        sorted(str(node_id) for node_id in node_ids),
+        include_version,
+        archive_type,
+        file_name
+    ])
+
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+class ExportJobManager(models.Manager):
+
+    def get_or_create_active(
+        self,
+        user,
+        node_ids,
+        include_version,
+        archive_type,
+        file_name=None
+    ):
+        """
+        Returns (export job, created) tuple.
+
+        If an export job with the same parameters is still pending or
+        running, it is returned instead of creating a new one.
+        At most one such job exists per user and parameters (enforced
+        by database constraint), thus concurrent requests get the
+        same job too.
+        """
+        fingerprint = export_fingerprint(
+            node_ids, include_version, archive_type, file_name
+        )
+        lookup = {
+            'user': user,
+            'fingerprint': fingerprint,
+            'status__in': EXPORT_STATUS_ACTIVE
+        }
+        job = self.filter(**lookup).first()
+        if job is not None:
+            return job, False
+
+        try:
+            with transaction.atomic():
+                job = self.create(
+                    user=user,
+                    fingerprint=fingerprint,
+                    node_ids=sorted(str(node_id) for node_id in node_ids),
+                    include_version=include_version,
+                    archive_type=archive_type,
+                    file_name=file_name
+                )
+        except IntegrityError:
+            # created by concurrent request
+            job = self.filter(**lookup).first()
+            if job is None:
+                raise
+            return job, False
+
+        return job, True
+
+
+class ExportJob(models.Model):
+    """
+    Archive (or document file) of nodes built in background
+    (see ``papermerge.core.tasks.export_nodes_task``).
+
+    Finished archive is kept in storage (see ``file_path``) until the
+    export job is deleted, either by the user or once it is older than
+    ``EXPORT_MAX_AGE`` (see ``delete_expired_export_jobs_task``).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    user = models.ForeignKey(
+        'User',
+        on_delete=models.CASCADE,
+        related_name='export_jobs'
+    )
+    node_ids = models.JSONField(default=list)
+    include_version = models.CharField(max_length=32)
+    archive_type = models.CharField(max_length=32)
+    # file name requested by user; None means default one
+    file_name = models.CharField(max_length=255, blank=True, null=True)
+    status = models.CharField(
+        max_length=16,
+        choices=EXPORT_STATUS_CHOICES,
+        default=EXPORT_STATUS_PENDING
+    )
+    # number of documents written to the archive so far
+    entries = models.IntegerField(default=0)
+    # file name and content type of the finished archive
+    download_name = models.CharField(max_length=255, blank=True, default='')
+    content_type = models.CharField(max_length=255, blank=True, default='')
+    file_extension = models.CharField(max_length=16, blank=True, default='')
+    # size in bytes of the finished archive
+    size = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    # digest of export parameters (see ``export_fingerprint``)
+    fingerprint = models.CharField(max_length=64)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ExportJobManager()
+
+    class Meta:
+        ordering = ('-created_at',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'fingerprint'],
+                condition=Q(status__in=EXPORT_STATUS_ACTIVE),
+                name='unique_active_export_job'
+            )
+        ]
+
+    @property
+    def is_succeeded(self):
+        return self.status == EXPORT_STATUS_SUCCEEDED
+
+    @property
+    def file_path(self):
+        """Path of the finished archive relative to media root"""
+        return (
+            f"{AUX_DIR_EXPORTS}/user_{self.user_id}/"
+            f"{self.id}{self.file_extension}"
+        )
+
+    def abs_file_path(self):
+        return abs_path(self.file_path)
+
+    def __str__(self):
+        return f"ExportJob(id={self.id}, status={self.status})"
@@ -81,7 +81,51 @@ class PolymorphicTagManager(_TaggableManager):
 
 
 class NodeManager(models.Manager):
-    pass
+
+    def subtree_with_versions(self, node_ids, last_version=True):
+        """
+        Returns nodes ``node_ids`` and all their descendants, loaded with
+        one recursive query.
+
+        Only ``id``, ``parent_id``, ``title``, ``user_id`` and ``ctype``
+        fields are loaded. Document nodes are annotated with their last
+        (or first, if ``last_version`` is False) document version's
+        ``version_id``, ``version_number``, ``version_file_name`` and
+        ``version_is_lazy``; these are None for folders.
+        """
+        if not node_ids:
+            return []
+
+        aggregate = 'MAX' if last_version else 'MIN'
+        placeholders = ', '.join(['%s'] * len(node_ids))
+        sql = f'''
+        WITH RECURSIVE tree AS (
+            SELECT id, parent_id, title, user_id, ctype
+            FROM core_basetreenode WHERE id IN ({placeholders})
+            UNION
+            SELECT core_basetreenode.id,
+                core_basetreenode.parent_id,
+                core_basetreenode.title,
+                core_basetreenode.user_id,
+                core_basetreenode.ctype
+            FROM core_basetreenode, tree
+            WHERE core_basetreenode.parent_id = tree.id
+        )
+        SELECT tree.*,
+            version.id AS version_id,
+            version.number AS version_number,
+            version.file_name AS version_file_name,
+            version.manifest IS NOT NULL AS version_is_lazy
+        FROM tree
+        LEFT JOIN core_documentversion version
+            ON version.document_id = tree.id
+            AND version.number = (
+                SELECT {aggregate}(number) FROM core_documentversion
+                WHERE document_id = tree.id
+            )
+        '''
+
+        return self.raw(sql, [uuid2raw_str(node_id) for node_id in node_ids])
 
 
 class NodeQuerySet(models.QuerySet):
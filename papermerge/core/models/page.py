@@ -4,7 +4,17 @@ import uuid
 
 from django.db import models
 
+from papermerge.core.app_settings import settings
 from papermerge.core.lib.path import PagePath
+from papermerge.core.lib.preview import (
+    PREVIEW_WIDTH,
+    evict_previews,
+    render_previews,
+    resize_preview,
+    single_flight,
+    touch
+)
+from papermerge.core.signal_definitions import page_previews_prefetch
 from papermerge.core.storage import abs_path
 from papermerge.core.utils import clock
 
@@ -64,6 +74,14 @@ class Page(models.Model):
         default=''
     )
 
+    #: sha256 of page's content (see ``papermerge.core.lib.fingerprint``);
+    #: empty if not known
+    fingerprint = models.CharField(
+        max_length=64,
+        blank=True,
+        default=''
+    )
+
     class Meta:
         # Guarantees that
         # doc.pages.all() will return pages ordered by number.
@@ -194,28 +212,131 @@ class Page(models.Model):
 
         return OCR_STATUS_UNKNOWN
 
-    @clock
-    def get_jpeg(self):
-        jpeg_abs_path = abs_path(self.page_path.preview_url)
+    def preview_abs_path(self, size=None, number=None):
+        """
+        Absolute path of preview of page ``number`` (of the same document
+        version; by default this page) in width ``size``
+        (None means default width).
+        """
+        page_path = self.page_path
+        if number is not None:
+            page_path = PagePath(
+                document_path=self.document_version.document_path,
+                page_num=number
+            )
 
-        if not os.path.exists(jpeg_abs_path):
+        if size is None or size == PREVIEW_WIDTH:
+            return abs_path(page_path.preview_url)
+
+        return abs_path(page_path.sized_preview_url(size))
+
+    def generate_preview(self, size=None):
+        """
+        Generates page preview (jpeg image) of given width unless it
+        already exists. Returns its absolute path.
+
+        Concurrent requests for the same preview (e.g. several users
+        opening the same new document) render it only once.
+        """
+        if size is not None and size not in settings.PREVIEW_SIZES:
+            raise ValueError(f"Unsupported preview size {size}")
+
+        jpeg_abs_path = self.preview_abs_path(size)
+        if os.path.exists(jpeg_abs_path):
+            if size is not None and size != PREVIEW_WIDTH:
+                touch(jpeg_abs_path)
+            return jpeg_abs_path
+
+        with single_flight(jpeg_abs_path):
+            # preview may have been rendered while waiting for the lock
+            if not os.path.exists(jpeg_abs_path):
+                self._render_preview(size, jpeg_abs_path)
+
+        return jpeg_abs_path
+
+    def _render_preview(self, size, jpeg_abs_path):
+        if size is None or size == PREVIEW_WIDTH:
             # generate preview only for this page
             self.document_version.generate_previews(
                 page_number=self.number
             )
+            return
+
+        if size > PREVIEW_WIDTH:
+            # upscaled default preview would be blurry
+            render_previews(
+                pdf_path=self.document_version.abs_file_path(),
+                output_dir=os.path.dirname(jpeg_abs_path),
+                pages=[self.number],
+                width=size
+            )
+        else:
+            resize_preview(self.generate_preview(), jpeg_abs_path, size)
+
+        evict_previews(
+            abs_path(self.page_path.previews_dirname),
+            settings.PREVIEW_CACHE_MAX_SIZE
+        )
+
+    def prefetch_previews(self, size=None):
+        """
+        Requests background generation of missing previews of next
+        ``PREVIEW_PREFETCH_PAGES`` pages, so that paging through
+        the document hits already generated previews.
+        """
+        page_numbers = [
+            number
+            for number in range(
+                self.number + 1,
+                self.number + 1 + settings.PREVIEW_PREFETCH_PAGES
+            )
+            if number <= self.page_count
+            and not os.path.exists(self.preview_abs_path(size, number))
+        ]
+        if page_numbers:
+            page_previews_prefetch.send(
+                sender=Page,
+                document_version=self.document_version,
+                page_numbers=page_numbers,
+                size=size
+            )
+
+    def get_jpeg_path(self, size=None, prefetch=True):
+        """
+        Returns absolute path of page preview (jpeg image) of given width;
+        preview is generated if it does not exist yet.
+
+        ``size`` - one of ``PREVIEW_SIZES``; None means default width
+        ``prefetch`` - if True, previews of next pages are generated
+        in background (see ``prefetch_previews``)
+        """
+        jpeg_abs_path = self.generate_preview(size)
 
         if not os.path.exists(jpeg_abs_path):
             # means that self.generate_preview() failed
             # to extract page image from the document
             raise IOError
 
+        if prefetch:
+            self.prefetch_previews(size)
+
+        return jpeg_abs_path
+
+    @clock
+    def get_jpeg(self, size=None, prefetch=True):
+        """
+        Returns page preview (jpeg image) of given width.
+        See ``get_jpeg_path`` for arguments.
+        """
+        jpeg_abs_path = self.get_jpeg_path(size=size, prefetch=prefetch)
+
         with open(jpeg_abs_path, "rb") as f:
             data = f.read()
 
         return data
 
-    @clock
-    def get_svg(self):
+    def get_svg_path(self):
+        """Returns absolute path of page's svg image"""
         svg_abs_path = abs_path(
             self.page_path.svg_url
         )
@@ -223,7 +344,11 @@ class Page(models.Model):
         if not os.path.exists(svg_abs_path):
             raise IOError
 
-        with open(svg_abs_path, "rb") as f:
+        return svg_abs_path
+
+    @clock
+    def get_svg(self):
+        with open(self.get_svg_path(), "rb") as f:
             data = f.read()
 
         return data
@@ -2,6 +2,7 @@ from pathlib import PurePath
 import uuid
 import logging
 
+from django.db import connections, router
 from django.utils.translation import gettext_lazy as _
 
 logger = logging.getLogger(__name__)
@@ -21,6 +22,45 @@ OCR_STATUS_CHOICES = [
 ]
 
 
+def bulk_insert_child_rows(model, objs, using=None) -> None:
+    """
+    Inserts rows of multi-table inheritance child ``model``'s own table
+    for ``objs``, whose parent table rows already exist.
+
+    ``QuerySet.bulk_create`` refuses models with multi-table inheritance
+    (even when parent rows exist), thus rows are inserted with one plain
+    ``INSERT INTO <child table> (...) VALUES (...)`` statement executed
+    for all ``objs`` (``cursor.executemany``). Values are prepared by
+    model fields, the same way ``Model.save`` prepares them. Like
+    ``bulk_create``, no signals are sent.
+    """
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    fields = model._meta.local_concrete_fields
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        qn(model._meta.db_table),
+        ", ".join(qn(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields))
+    )
+    rows = [
+        [
+            field.get_db_prep_save(
+                field.pre_save(obj, add=True),
+                connection=connection
+            )
+            for field in fields
+        ]
+        for obj in objs
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+    for obj in objs:
+        obj._state.adding = False
+        obj._state.db = using
+
+
 def uuid2raw_str(value: uuid.UUID) -> str:
     """Converts value into string as stored in database
 
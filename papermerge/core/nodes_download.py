@@ -1,16 +1,54 @@
+import gzip
+import io
 import os
-import zipfile
 import tarfile
-
-from django.core.files.temp import NamedTemporaryFile
-
-from papermerge.core.models import Document, BaseTreeNode
+import zipfile
+from collections import defaultdict
+from uuid import UUID
+
+from papermerge.core.lib.path import DocumentPath
+from papermerge.core.models import BaseTreeNode, Document, DocumentVersion
+from papermerge.core.models.document import idified_document_title
+from papermerge.core.models.node import NODE_TYPE_DOCUMENT
+from papermerge.core.storage import get_storage_instance
 from papermerge.core.serializers.node import (
     ONLY_ORIGINAL,
     ONLY_LAST,
     ZIP
 )
 
+# size of chunks in which files are read and archives are sent
+CHUNK_SIZE = 64 * 1024
+
+
+def read_chunks(abs_file_path):
+    with open(abs_file_path, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield chunk
+
+
+class ArchiveStream(io.RawIOBase):
+    """
+    Unseekable output stream archives are written to; written data is
+    collected until it is taken out with ``drain``.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+
+        return data
+
 
 class NodesDownload:
     """
@@ -18,27 +56,37 @@ class NodesDownload:
         * document file (e.g. invoice.pdf)
         * zip archive (e.g. my_invoices.zip)
         * targz archive (e.g. my_invoices.tar.gz
+
+    Content is produced by ``streaming_content`` generator in chunks
+    (e.g. for ``StreamingHttpResponse``), thus memory usage does not
+    depend on size of downloaded documents.
+
+    If ``progress`` callable is given, it is called with number of
+    documents written so far after each document is written.
     """
     def __init__(
         self,
         node_ids,
         file_name=None,
-        include_version=ONLY_LAST
+        include_version=ONLY_LAST,
+        progress=None
     ):
         self._file_name = file_name
         self._include_version = include_version
         self._node_ids = node_ids
+        self._progress = progress
+        self.entries_count = 0
 
-    def _create(self):
+    def streaming_content(self):
         raise Exception("Not Implemented")
 
     def get_content(self):
-        file_handle = self._create()
-        file_handle.seek(0)
-        data = file_handle.read()
-        file_handle.close()
+        return b''.join(self.streaming_content())
 
-        return data
+    def entry_written(self):
+        self.entries_count += 1
+        if self._progress is not None:
+            self._progress(self.entries_count)
 
     def wants_only_orignal(self):
         return self._include_version == ONLY_ORIGINAL
@@ -46,30 +94,73 @@ class NodesDownload:
     def wants_only_last(self):
         return self._include_version == ONLY_LAST
 
-    def _recursive_create_archive(self, archive, node_ids, abspath):
-        for node in BaseTreeNode.objects.filter(id__in=node_ids):
-            if node.is_document():
-                arcname = os.path.join(*abspath, node.idified_title)
-                if self.wants_only_last():
-                    doc_version = node.versions.last()
-                else:
-                    doc_version = node.versions.first()
-
-                self.archive_add(
-                    archive=archive,
-                    abs_file_path=doc_version.abs_file_path(),
-                    arcname=arcname
+    def archive_entries(self):
+        """
+        Yields (abs_file_path, arcname) tuple for each document
+        under ``node_ids`` (recursively); arcname preserves folder
+        structure.
+
+        Whole subtree, including file paths of documents' versions,
+        is loaded with one query (see
+        ``NodeManager.subtree_with_versions``), thus number of queries
+        does not depend on number of nodes.
+        """
+        nodes = {}
+        children = defaultdict(list)
+        for node in BaseTreeNode.objects.subtree_with_versions(
+            self._node_ids,
+            last_version=self.wants_only_last()
+        ):
+            if node.pk in nodes:
+                continue
+            nodes[node.pk] = node
+            children[node.parent_id].append(node)
+
+        storage = get_storage_instance()
+
+        def entries(subtree, abspath):
+            for node in subtree:
+                is_document = (
+                    node.ctype == NODE_TYPE_DOCUMENT
+                    or node.version_id is not None
+                )
+                if not is_document:
+                    yield from entries(
+                        children[node.pk],
+                        abspath + [node.idified_title]
+                    )
+                    continue
+
+                if node.version_number is None:
+                    # document without any version has no file
+                    continue
+
+                # document's title keeps file extension at the end
+                arcname = os.path.join(
+                    *abspath,
+                    idified_document_title(node.title, node.pk)
                 )
-            else:
-                child_ids = [child.id for child in node.get_children()]
-                self._recursive_create_archive(
-                    archive,
-                    child_ids,
-                    abspath + [node.idified_title]
+                if node.version_is_lazy:
+                    # file of lazy version is built first
+                    doc_version = DocumentVersion.objects.get(
+                        pk=node.version_id
+                    )
+                    yield doc_version.abs_file_path(), arcname
+                    continue
+
+                doc_path = DocumentPath(
+                    user_id=node.user_id,
+                    document_id=node.pk,
+                    version=node.version_number,
+                    file_name=node.version_file_name
                 )
+                yield storage.abspath(doc_path.url), arcname
 
-    def archive_add(self, abs_file_path, arcname):
-        raise Exception("Not Implemented")
+        roots = [
+            nodes[node_id] for node_id in map(UUID, map(str, self._node_ids))
+            if node_id in nodes
+        ]
+        yield from entries(roots, [])
 
     @property
     def file_name(self):
@@ -79,6 +170,10 @@ class NodesDownload:
     def content_type(self):
         raise Exception("Not Implemented")
 
+    @property
+    def file_extension(self):
+        raise Exception("Not Implemented")
+
     @property
     def content_disposition(self):
         return f"attachment; filename={self.file_name}"
@@ -96,22 +191,30 @@ class NodesDownloadZip(NodesDownload):
         include_version="only_last"
     )
 
-    # returns zip archives content (as bytes)
-    data = nodes_download.get_content()
+    # yields zip archive's content (as bytes) chunk by chunk
+    for chunk in nodes_download.streaming_content():
+        ...
     """
-    def _create(self):
-        temp_file_obj = NamedTemporaryFile(prefix='download_')
-        archive = zipfile.ZipFile(temp_file_obj, mode='w')
-        self._recursive_create_archive(
-            archive=archive,
-            node_ids=self._node_ids,
-            abspath=[]
-        )
-        temp_file_obj.seek(0)
-        return temp_file_obj
-
-    def archive_add(self, archive, abs_file_path, arcname):
-        archive.write(abs_file_path, arcname=arcname)
+    def streaming_content(self):
+        stream = ArchiveStream()
+        # zip archive written to unseekable stream has sizes and
+        # checksums of its entries after their data
+        with zipfile.ZipFile(
+            stream,
+            mode='w',
+            compression=zipfile.ZIP_DEFLATED
+        ) as archive:
+            for abs_file_path, arcname in self.archive_entries():
+                info = zipfile.ZipInfo.from_file(abs_file_path, arcname)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with archive.open(info, mode='w', force_zip64=True) as entry:
+                    for chunk in read_chunks(abs_file_path):
+                        entry.write(chunk)
+                        yield stream.drain()
+                self.entry_written()
+                yield stream.drain()
+
+        yield stream.drain()
 
     @property
     def file_name(self):
@@ -124,6 +227,10 @@ class NodesDownloadZip(NodesDownload):
     def content_type(self):
         return "application/zip"
 
+    @property
+    def file_extension(self):
+        return ".zip"
+
     def __str__(self):
         return f'NodesDownloadZip(node_ids={self._node_ids})'
 
@@ -140,22 +247,47 @@ class NodesDownloadTarGz(NodesDownload):
         include_version="only_last"
     )
 
-    # returns tar.gz archives content (as bytes)
-    data = nodes_download.get_content()
+    # yields tar.gz archive's content (as bytes) chunk by chunk
+    for chunk in nodes_download.streaming_content():
+        ...
     """
-    def _create(self):
-        temp_file_obj = NamedTemporaryFile(prefix='download_')
-        archive = tarfile.open(temp_file_obj.name, mode='w:gz')
-        self._recursive_create_archive(
-            archive=archive,
-            node_ids=self._node_ids,
-            abspath=[]
-        )
-        temp_file_obj.seek(0)
-        return temp_file_obj
-
-    def archive_add(self, archive, abs_file_path, arcname):
-        archive.add(abs_file_path, arcname=arcname)
+    def streaming_content(self):
+        stream = ArchiveStream()
+        # tar records are written by hand (``TarInfo.tobuf``) instead of
+        # ``TarFile.addfile``, which would write whole file at once
+        with gzip.GzipFile(fileobj=stream, mode='wb') as archive:
+            size = 0
+            for abs_file_path, arcname in self.archive_entries():
+                tarinfo = tarfile.TarInfo(arcname)
+                stat = os.stat(abs_file_path)
+                tarinfo.size = stat.st_size
+                tarinfo.mtime = int(stat.st_mtime)
+                tarinfo.mode = 0o644
+                header = tarinfo.tobuf(format=tarfile.PAX_FORMAT)
+                archive.write(header)
+                size += len(header)
+
+                written = 0
+                for chunk in read_chunks(abs_file_path):
+                    # file may grow while being read
+                    chunk = chunk[:tarinfo.size - written]
+                    archive.write(chunk)
+                    written += len(chunk)
+                    yield stream.drain()
+
+                # file may shrink while being read
+                archive.write(tarfile.NUL * (tarinfo.size - written))
+                padding = -tarinfo.size % tarfile.BLOCKSIZE
+                archive.write(tarfile.NUL * padding)
+                size += tarinfo.size + padding
+                self.entry_written()
+
+            # end of archive: two empty blocks, padded to full record
+            end = 2 * tarfile.BLOCKSIZE
+            end += -(size + end) % tarfile.RECORDSIZE
+            archive.write(tarfile.NUL * end)
+
+        yield stream.drain()
 
     @property
     def file_name(self):
@@ -168,6 +300,10 @@ class NodesDownloadTarGz(NodesDownload):
     def content_type(self):
         return "application/x-gtar"
 
+    @property
+    def file_extension(self):
+        return ".tar.gz"
+
     def __str__(self):
         return f'NodesDownloadTarGz(node_ids={self._node_ids})'
 
@@ -185,12 +321,14 @@ class NodesDownloadDocument(NodesDownload):
         include_version="only_last"
     )
 
-    # returns document's last version file content (as bytes)
-    data = nodes_download.get_content()
+    # yields document's last version file content (as bytes)
+    # chunk by chunk
+    for chunk in nodes_download.streaming_content():
+        ...
     """
-    def _create(self):
-        abs_path = self.get_document_file_abs_path()
-        return open(abs_path, 'rb')
+    def streaming_content(self):
+        yield from read_chunks(self.get_document_file_abs_path())
+        self.entry_written()
 
     def get_document_version(self):
         doc = Document.objects.get(pk=self._node_ids[0])
@@ -220,6 +358,10 @@ class NodesDownloadDocument(NodesDownload):
         # document file
         return "application/pdf"
 
+    @property
+    def file_extension(self):
+        return ".pdf"
+
     def __str__(self):
         return f'NodesDownloadDocument(node_ids={self._node_ids})'
 
@@ -250,7 +392,8 @@ def get_nodes_download(
     node_ids,
     file_name=None,
     include_version=ONLY_LAST,
-    archive_type=ZIP
+    archive_type=ZIP,
+    progress=None
 ):
     """
     Helper function which returns correct instance/version
@@ -262,6 +405,8 @@ def get_nodes_download(
     * `file_name` file name of end archive/document file
     * `include_version` can be either 'only_last' or 'only_original'
     * `archive_type` can be either 'zip' or 'targz'
+    * `progress` callable called with number of documents written
+      so far (see NodesDownload)
 
     Returns:
         NodesDownloadDocument or NodesDownloadZip or NodesDownloadTarGzFile
@@ -272,18 +417,21 @@ def get_nodes_download(
         return NodesDownloadDocument(
             node_ids=node_ids,
             file_name=file_name,
-            include_version=include_version
+            include_version=include_version,
+            progress=progress
         )
 
     if archive_type == ZIP:
         return NodesDownloadZip(
             node_ids,
             file_name,
-            include_version=include_version
+            include_version=include_version,
+            progress=progress
         )
 
     return NodesDownloadTarGz(
         node_ids,
         file_name,
-        include_version=include_version
+        include_version=include_version,
+        progress=progress
     )
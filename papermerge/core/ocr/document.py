@@ -1,11 +1,17 @@
 import os
 import logging
+import shutil
+import tempfile
 
 import ocrmypdf
+from pikepdf import Pdf
 
+from papermerge.core.app_settings import settings
 from papermerge.core.storage import abs_path
 from papermerge.core.lib import mime
+from papermerge.core.lib.pdf import save_pdf
 from papermerge.core.lib.tiff import convert_tiff2pdf
+from papermerge.core.ocr.text_layer import text_layer_pages, write_sidecars
 from papermerge.core.lib.path import (
     DocumentPath,
 )
@@ -16,6 +22,10 @@ logger = logging.getLogger(__name__)
 STARTED = "started"
 COMPLETE = "complete"
 
+# page ranges OCRed in parallel are stored (until merged) in this
+# subdirectory of target document version
+AUX_DIR_RANGES = "ranges"
+
 
 def notify_hocr_ready(page_path, **kwargs):
     pass
@@ -29,24 +39,42 @@ def notify_pre_page_ocr(page_path, **kwargs):
     pass
 
 
-def _ocr_document(
-    input_doc_path: DocumentPath,
-    target_doc_path,
-    lang,
-    preview_width,
-):
+def _graft_pages(abs_file_path: str, reused_pages: list) -> None:
+    """
+    Replaces pages of ``abs_file_path`` PDF file with pages of other
+    (already OCRed) PDF files.
 
-    # file_name = kwargs.pop('file_name', None)
+    ``reused_pages`` is a list of (page number, source PDF file path,
+    source page number) tuples. Page numbering starts with 1.
+    """
+    sources = {}
+    with Pdf.open(abs_file_path, allow_overwriting_input=True) as pdf:
+        try:
+            for number, src_file_path, src_number in reused_pages:
+                if src_file_path not in sources:
+                    sources[src_file_path] = Pdf.open(src_file_path)
+                src_page = sources[src_file_path].pages.p(src_number)
+                pdf.pages[number - 1] = src_page
+            save_pdf(pdf, abs_file_path)
+        finally:
+            for src in sources.values():
+                src.close()
 
-    # if not file_name:
-    #    input_file_name = input_doc_path.file_name
-
-    sidecars_dir = abs_path(target_doc_path.dirname_sidecars())
 
-    input_document = abs_path(input_doc_path.path)
-
-    output_document = abs_path(target_doc_path.path)
+def _ocrmypdf(
+    input_document: str,
+    output_document: str,
+    sidecars_dir: str,
+    lang,
+    preview_width,
+    pages=None
+):
+    """
+    Runs ocrmypdf on ``pages`` (None means all pages) of input document.
 
+    Pages with usable text layer (see ``papermerge.core.ocr.text_layer``)
+    are not OCRed, their sidecars are built from the text layer.
+    """
     output_dir = os.path.dirname(output_document)
 
     if not os.path.exists(output_dir):
@@ -55,6 +83,34 @@ def _ocr_document(
             exist_ok=True
         )
 
+    text_pages = text_layer_pages(input_document, pages)
+    for page in text_pages.values():
+        write_sidecars(
+            file_path=input_document,
+            page=page,
+            sidecars_dir=sidecars_dir,
+            preview_width=preview_width
+        )
+
+    if text_pages:
+        if pages is None:
+            with Pdf.open(input_document) as pdf:
+                pages = range(1, len(pdf.pages) + 1)
+        pages = [number for number in pages if number not in text_pages]
+        logger.debug(
+            f"_ocrmypdf: pages {list(text_pages)} of {input_document}"
+            " have text layer"
+        )
+        if not pages:
+            # nothing to OCR, text layer of the document is kept as is
+            shutil.copyfile(input_document, output_document)
+            return
+
+    options = {}
+    if settings.LINEARIZE_PDF_VERSIONS:
+        # by default OCRmyPDF linearizes only files larger than 1 MB
+        options['fast_web_view'] = 0
+
     ocrmypdf.ocr(
         input_document,
         output_document,
@@ -69,10 +125,259 @@ def _ocr_document(
         sidecar_dir=sidecars_dir,
         sidecar_format='svg',
         preview_width=preview_width,
-        deskew=True
+        deskew=True,
+        pages=None if pages is None else ','.join(
+            str(number) for number in pages
+        ),
+        **options
     )
 
 
+def _ocr_document(
+    input_doc_path: DocumentPath,
+    target_doc_path,
+    lang,
+    preview_width,
+    pages=None,
+    reused_pages=None
+):
+    """
+    OCRs ``input_doc_path`` into ``target_doc_path``.
+
+    ``pages`` - list of page numbers to OCR; None means all pages.
+    ``reused_pages`` - pages which are not OCRed, but taken over
+    from already OCRed PDF files (see ``_graft_pages``).
+    """
+
+    # file_name = kwargs.pop('file_name', None)
+
+    # if not file_name:
+    #    input_file_name = input_doc_path.file_name
+
+    sidecars_dir = abs_path(target_doc_path.dirname_sidecars())
+
+    input_document = abs_path(input_doc_path.path)
+
+    output_document = abs_path(target_doc_path.path)
+
+    if pages is not None and len(pages) == 0:
+        # nothing to OCR, all pages are reused
+        logger.debug(f"_ocr_document: all pages of {input_document} reused")
+        os.makedirs(os.path.dirname(output_document), exist_ok=True)
+        shutil.copyfile(input_document, output_document)
+    else:
+        _ocrmypdf(
+            input_document=input_document,
+            output_document=output_document,
+            sidecars_dir=sidecars_dir,
+            lang=lang,
+            preview_width=preview_width,
+            pages=pages
+        )
+
+    if reused_pages:
+        _graft_pages(output_document, reused_pages)
+
+
+def page_ranges(page_count: int, range_size: int) -> list:
+    """
+    Splits pages 1..``page_count`` into consecutive ranges of at most
+    ``range_size`` pages. Returns a list of (first, last) tuples.
+    """
+    return [
+        (first, min(first + range_size - 1, page_count))
+        for first in range(1, page_count + 1, range_size)
+    ]
+
+
+def page_range_paths(target_doc_path: DocumentPath, first, last):
+    """
+    Returns absolute paths (output document, sidecars directory) where
+    OCR of pages ``first``..``last`` of ``target_doc_path`` is stored
+    until page ranges are merged (see ``merge_page_ranges``).
+    """
+    name = f"{first:06d}-{last:06d}"
+    output_document = abs_path(
+        f"{target_doc_path.dirname()}{AUX_DIR_RANGES}/{name}/"
+        f"{target_doc_path.file_name}"
+    )
+    sidecars_dir = abs_path(
+        f"{target_doc_path.dir_sidecars}v{target_doc_path.version}/"
+        f"{AUX_DIR_RANGES}/{name}/"
+    )
+
+    return output_document, sidecars_dir
+
+
+def _extract_pages(src: str, dst: str, first, last) -> None:
+    """Writes pages ``first``..``last`` of ``src`` PDF file to ``dst``"""
+    with Pdf.open(src) as pdf, Pdf.new() as part:
+        part.pages.extend(pdf.pages[first - 1:last])
+        part.save(dst)
+
+
+def _renumber_sidecars(sidecars_dir: str, offset) -> None:
+    """
+    Adds ``offset`` to page numbers of sidecars in ``sidecars_dir``.
+    Sidecar file (or directory) names start with zero padded page number.
+    """
+    names = [
+        name for name in os.listdir(sidecars_dir) if name[:6].isdigit()
+    ]
+    # highest numbers first, thus no sidecar is renamed onto another one
+    for name in sorted(names, reverse=True):
+        path = os.path.join(sidecars_dir, name)
+        if os.path.isdir(path):
+            _renumber_sidecars(path, offset)
+        new_name = f"{int(name[:6]) + offset:06d}{name[6:]}"
+        os.replace(path, os.path.join(sidecars_dir, new_name))
+
+
+def ocr_page_range(
+    user_id,
+    document_id,
+    file_name,
+    lang,
+    version,
+    target_version,
+    first,
+    last,
+    pages=None
+):
+    """
+    OCRs pages ``first``..``last`` of the document version.
+
+    ``pages`` - page numbers (within the range) to OCR; None means all
+    pages of the range. Pages of the range are extracted into their own
+    PDF file, which is OCRed; output contains pages of the range only and
+    is written aside (see ``page_range_paths``), thus several ranges of
+    the same document can be OCRed in parallel.
+    """
+    doc_path = DocumentPath(
+        user_id=user_id,
+        document_id=document_id,
+        file_name=file_name,
+        version=version
+    )
+    target_doc_path = DocumentPath.copy_from(
+        doc_path,
+        version=target_version
+    )
+    output_document, sidecars_dir = page_range_paths(
+        target_doc_path, first, last
+    )
+    if pages is None:
+        pages = list(range(first, last + 1))
+
+    range_dir = os.path.dirname(output_document)
+    os.makedirs(range_dir, exist_ok=True)
+    fd, input_document = tempfile.mkstemp(suffix='.pdf', dir=range_dir)
+    os.close(fd)
+    try:
+        _extract_pages(abs_path(doc_path.path), input_document, first, last)
+        _ocrmypdf(
+            input_document=input_document,
+            output_document=output_document,
+            sidecars_dir=sidecars_dir,
+            lang=lang.lower(),
+            preview_width=300,
+            # page numbers within extracted pages
+            pages=[number - first + 1 for number in pages]
+        )
+    finally:
+        os.remove(input_document)
+
+    if first > 1 and os.path.isdir(sidecars_dir):
+        _renumber_sidecars(sidecars_dir, first - 1)
+
+
+def _move_sidecars(src_dir: str, dst_dir: str, first, last) -> None:
+    """
+    Moves sidecars of pages ``first``..``last`` from ``src_dir``
+    to ``dst_dir``. Sidecar file (or directory) names start with
+    zero padded page number.
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    for name in os.listdir(src_dir):
+        number = name[:6]
+        if number.isdigit() and first <= int(number) <= last:
+            dst = os.path.join(dst_dir, name)
+            if os.path.isdir(dst):
+                shutil.rmtree(dst)
+            os.replace(os.path.join(src_dir, name), dst)
+
+
+def merge_page_ranges(
+    user_id,
+    document_id,
+    file_name,
+    version,
+    target_version,
+    reused_pages=None
+) -> bool:
+    """
+    Merges separately OCRed page ranges (see ``ocr_page_range``)
+    of the target document version into its file and sidecars directory.
+
+    Target document version's file is built from the file of document
+    version ``version``, its pages are replaced by pages of OCRed ranges
+    and by ``reused_pages`` (as in ``_ocr_document``).
+    Returns False if target document version has no OCRed page ranges.
+    """
+    doc_path = DocumentPath(
+        user_id=user_id,
+        document_id=document_id,
+        file_name=file_name,
+        version=version
+    )
+    target_doc_path = DocumentPath.copy_from(
+        doc_path,
+        version=target_version
+    )
+    ranges_dir = abs_path(f"{target_doc_path.dirname()}{AUX_DIR_RANGES}/")
+    if not os.path.isdir(ranges_dir):
+        return False
+
+    # range directories are named "<first>-<last>"
+    ranges = sorted(
+        tuple(int(number) for number in name.split('-'))
+        for name in os.listdir(ranges_dir)
+    )
+    output_document = abs_path(target_doc_path.path)
+    sidecars_dir = abs_path(target_doc_path.dirname_sidecars())
+    grafted_pages = list(reused_pages or [])
+    # reused pages are not OCRed (see ``ocr_page_range``), range output
+    # has them unchanged; thus they are grafted from ``reused_pages`` only
+    reused_numbers = {number for number, _, _ in grafted_pages}
+
+    for first, last in ranges:
+        range_document, range_sidecars_dir = page_range_paths(
+            target_doc_path, first, last
+        )
+        # range output contains pages of the range only
+        grafted_pages.extend(
+            (number, range_document, number - first + 1)
+            for number in range(first, last + 1)
+            if number not in reused_numbers
+        )
+        if os.path.exists(range_sidecars_dir):
+            _move_sidecars(range_sidecars_dir, sidecars_dir, first, last)
+
+    shutil.copyfile(abs_path(doc_path.path), output_document)
+    _graft_pages(output_document, grafted_pages)
+
+    shutil.rmtree(ranges_dir, ignore_errors=True)
+    shutil.rmtree(
+        abs_path(
+            f"{target_doc_path.dir_sidecars}v{target_version}/"
+            f"{AUX_DIR_RANGES}/"
+        ),
+        ignore_errors=True
+    )
+
+    return True
+
+
 def ocr_document(
     user_id,
     document_id,
@@ -81,6 +386,8 @@ def ocr_document(
     version,
     target_version,
     namespace='',
+    pages=None,
+    reused_pages=None
 ):
     lang = lang.lower()
     doc_path = DocumentPath(
@@ -103,25 +410,27 @@ def ocr_document(
             input_doc_path=doc_path,
             target_doc_path=target_doc_path,
             lang=lang,
-            preview_width=300
+            preview_width=300,
+            pages=pages,
+            reused_pages=reused_pages
         )
     elif mime_type.is_tiff():
         new_filename = convert_tiff2pdf(
             doc_url=abs_path(doc_path.url)
         )
-        # now .pdf
-        orig_file_name = doc_path.file_name
-        doc_path.file_name = new_filename
-        # and continue as usual
+        # OCR runs on converted (pdf) file; OCRed file keeps
+        # name of the target document version
+        pdf_doc_path = DocumentPath.copy_from(
+            doc_path,
+            file_name=new_filename
+        )
         _ocr_document(
-            doc_path=doc_path,
+            input_doc_path=pdf_doc_path,
+            target_doc_path=target_doc_path,
             lang=lang,
-            user_id=user_id,
-            document_id=document_id,
-            # Pass original file_name i.e. tiff file name as well.
-            file_name=orig_file_name,
-            namespace=namespace,
-            version=version
+            preview_width=300,
+            pages=pages,
+            reused_pages=reused_pages
         )
     else:
         logger.error(
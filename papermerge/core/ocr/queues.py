@@ -0,0 +1,191 @@
+"""
+OCR task queues and per-user fair scheduling.
+
+OCR tasks are routed by page count into queues configured by
+``OCR_QUEUES`` setting (e.g. small, large and bulk) so that single
+page documents are not stuck behind bulk imports of large scans.
+Each queue is served by its own pool of celery workers, e.g.::
+
+    celery -A config worker -Q ocr_small
+    celery -A config worker -Q ocr_large,ocr_bulk
+
+Independently of queues, ``OCR_USER_MAX_CONCURRENCY`` limits the number
+of OCR tasks which run at the same time on behalf of one user; tasks over
+the limit are put back to the queue, thus workers are shared among users.
+Slots are counted in django cache, which must be shared by all workers
+(e.g. redis; see ``papermerge.core.checks``).
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from celery import current_app
+from django.core.cache import cache
+
+from papermerge.core.app_settings import settings
+from papermerge.core.models import DocumentVersion
+
+logger = logging.getLogger(__name__)
+
+OCR_DOCUMENT_TASK = 'papermerge.core.tasks.ocr_document_task'
+OCR_PAGE_RANGE_TASK = 'papermerge.core.tasks.ocr_page_range_task'
+
+# seconds after which task over user's concurrency limit is retried
+USER_SLOT_RETRY_COUNTDOWN = 10
+# user's slot counter expires in case worker was killed
+# before it released the slot
+USER_SLOT_TIMEOUT = 60 * 60
+# while a slot is taken, user's slot counter is refreshed this often
+# (in seconds), thus it does not expire however long OCR runs
+USER_SLOT_REFRESH_INTERVAL = USER_SLOT_TIMEOUT // 4
+
+
+def ocr_queue(page_count: int):
+    """
+    Returns name of the OCR queue for documents with ``page_count``
+    pages or None if OCR queues are not configured.
+    """
+    queues = settings.OCR_QUEUES
+    if not queues:
+        return None
+
+    for name, max_page_count in queues:
+        if max_page_count is None or page_count <= max_page_count:
+            return name
+
+    # page count over the limit of the last queue
+    name, _ = queues[-1]
+    return name
+
+
+def route_ocr_task(name, args, kwargs, options, task=None, **kw):
+    """
+    Celery router (see ``CELERY_TASK_ROUTES``) which routes OCR tasks
+    by page count.
+    """
+    if name == OCR_DOCUMENT_TASK:
+        page_count = DocumentVersion.objects.filter(
+            document_id=kwargs['document_id']
+        ).order_by('-number').values_list('page_count', flat=True).first()
+    elif name == OCR_PAGE_RANGE_TASK:
+        page_count = kwargs['last'] - kwargs['first'] + 1
+    else:
+        return None
+
+    queue = ocr_queue(page_count or 0)
+    if queue is None:
+        return None
+
+    return {'queue': queue}
+
+
+def queue_depths() -> dict:
+    """
+    Returns number of messages waiting in each of OCR queues.
+
+    Depth of queue which cannot be inspected (e.g. it was not declared
+    yet) is None.
+    """
+    depths = {}
+    queues = settings.OCR_QUEUES or []
+
+    with current_app.connection_for_read() as conn:
+        for name, _ in queues:
+            try:
+                with conn.channel() as channel:
+                    _, depth, _ = channel.queue_declare(
+                        queue=name,
+                        passive=True
+                    )
+            except conn.channel_errors:
+                depth = None
+            depths[name] = depth
+
+    return depths
+
+
+def _user_slot_key(user_id) -> str:
+    return f'papermerge.ocr.user_slots.{user_id}'
+
+
+def acquire_user_slot(user_id) -> bool:
+    """
+    Takes one of user's OCR slots. Returns False if all
+    ``OCR_USER_MAX_CONCURRENCY`` slots are taken.
+    """
+    max_concurrency = settings.OCR_USER_MAX_CONCURRENCY
+    if not max_concurrency:
+        return True
+
+    key = _user_slot_key(user_id)
+    cache.add(key, 0, timeout=USER_SLOT_TIMEOUT)
+    try:
+        taken = cache.incr(key)
+    except ValueError:
+        # slot counter expired right after ``cache.add``
+        if cache.add(key, 1, timeout=USER_SLOT_TIMEOUT):
+            taken = 1
+        else:
+            taken = cache.incr(key)
+
+    if taken > max_concurrency:
+        cache.decr(key)
+        return False
+
+    cache.touch(key, timeout=USER_SLOT_TIMEOUT)
+
+    return True
+
+
+def release_user_slot(user_id) -> None:
+    if not settings.OCR_USER_MAX_CONCURRENCY:
+        return
+
+    key = _user_slot_key(user_id)
+    try:
+        taken = cache.decr(key)
+        if taken < 0:
+            # counter is never left below zero; unlike ``cache.set``
+            # this does not overwrite concurrent changes
+            cache.incr(key, -taken)
+    except ValueError:
+        # slot counter expired meanwhile
+        pass
+
+
+def _refresh_user_slot(user_id, stop: threading.Event) -> None:
+    """Refreshes timeout of user's slot counter until ``stop`` is set"""
+    key = _user_slot_key(user_id)
+    while not stop.wait(USER_SLOT_REFRESH_INTERVAL):
+        cache.touch(key, timeout=USER_SLOT_TIMEOUT)
+
+
+@contextmanager
+def user_slot(task, user_id):
+    """
+    Runs the body on one of user's OCR slots. If user has no free slot,
+    ``task`` is retried later (i.e. put back to its queue).
+    """
+    if not acquire_user_slot(user_id):
+        logger.debug(
+            f'user_slot: no free OCR slot for user_id={user_id},'
+            f' {task.name} retried'
+        )
+        raise task.retry(
+            countdown=USER_SLOT_RETRY_COUNTDOWN,
+            max_retries=None
+        )
+
+    stop = threading.Event()
+    if settings.OCR_USER_MAX_CONCURRENCY:
+        threading.Thread(
+            target=_refresh_user_slot,
+            args=(user_id, stop),
+            daemon=True
+        ).start()
+
+    try:
+        yield
+    finally:
+        stop.set()
+        release_user_slot(user_id)
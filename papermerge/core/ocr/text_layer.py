@@ -0,0 +1,302 @@
+"""
+Text layer of born-digital PDF pages.
+
+Pages which already have a usable text layer (e.g. invoices generated
+by accounting systems) are not OCRed; instead their text and word boxes
+are extracted from the PDF and written to the same sidecar files (txt,
+hocr, svg and jpg preview) which OCR would produce.
+
+Page text layer is considered usable if it has at least
+``OCR_TEXT_LAYER_MIN_CHARS`` characters, almost all of them map to
+unicode and page is not a scan (i.e. it is not covered by an image).
+Scans with a text layer are OCRed again, as their text layer was created
+by an OCR engine of unknown quality.
+"""
+import base64
+import io
+import logging
+import os
+
+from lxml import etree
+from pdf2image import convert_from_path
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import (
+    LTChar,
+    LTFigure,
+    LTImage,
+    LTTextContainer,
+    LTTextLine
+)
+
+from papermerge.core.app_settings import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b'%PDF-'
+# resolution of svg sidecar's image; words' bounding boxes
+# in hocr and svg sidecars are in pixels of this image
+DPI = 150
+# pdfminer's replacement of characters without unicode mapping
+UNMAPPED_CHAR = '(cid:'
+# max ratio of characters without unicode mapping
+MAX_UNMAPPED_RATIO = 0.1
+# page covered by an image of at least this ratio of its area is a scan
+MAX_IMAGE_AREA_RATIO = 0.5
+
+SVG_TEMPLATE = """<svg viewBox="0 0 {width} {height}" \
+xmlns="http://www.w3.org/2000/svg">
+  <g id="image">
+    <image width="{width}" href="data:image/jpeg;base64,{image}"/>
+  </g>
+  <g id="text">
+{text}
+  </g>
+</svg>
+"""
+
+
+class Word:
+
+    def __init__(self, text, x1, y1, x2, y2):
+        """
+        ``x1``, ``y1``, ``x2``, ``y2`` - bounding box in pixels,
+        origin is top left corner of the page
+        """
+        self.text = text
+        self.x1, self.y1, self.x2, self.y2 = x1, y1, x2, y2
+
+    @property
+    def bbox(self):
+        return f"{self.x1} {self.y1} {self.x2} {self.y2}"
+
+
+class TextLayerPage:
+
+    def __init__(self, number, width, height, lines):
+        """
+        ``number`` - page number (starting with 1)
+        ``width``, ``height`` - page size in pixels
+        ``lines`` - list of lines; each line is a list of ``Word``
+        """
+        self.number = number
+        self.width = width
+        self.height = height
+        self.lines = lines
+
+    @property
+    def text(self):
+        return '\n'.join(
+            ' '.join(word.text for word in line)
+            for line in self.lines
+        )
+
+
+def _to_pixels(value):
+    return round(value * DPI / 72)
+
+
+def _line_words(line: LTTextLine, page_height) -> list:
+    """Groups characters of pdfminer's text line into words"""
+    words = []
+    chars = []
+
+    def flush():
+        if chars:
+            words.append(
+                Word(
+                    text=''.join(char.get_text() for char in chars),
+                    x1=_to_pixels(min(char.x0 for char in chars)),
+                    y1=_to_pixels(page_height - max(c.y1 for c in chars)),
+                    x2=_to_pixels(max(char.x1 for char in chars)),
+                    y2=_to_pixels(page_height - min(c.y0 for c in chars))
+                )
+            )
+            chars.clear()
+
+    for item in line:
+        if isinstance(item, LTChar) and not item.get_text().isspace():
+            chars.append(item)
+        else:
+            flush()
+    flush()
+
+    return words
+
+
+def _text_lines(container):
+    for item in container:
+        if isinstance(item, LTTextLine):
+            yield item
+        elif isinstance(item, LTTextContainer):
+            yield from _text_lines(item)
+
+
+def _is_scan(layout) -> bool:
+    page_area = layout.width * layout.height
+    for item in layout:
+        if isinstance(item, (LTFigure, LTImage)):
+            if item.width * item.height >= page_area * MAX_IMAGE_AREA_RATIO:
+                return True
+
+    return False
+
+
+def _is_usable(text: str, min_chars: int) -> bool:
+    char_count = len(''.join(text.split()))
+    if char_count < min_chars:
+        return False
+
+    unmapped_count = text.count(UNMAPPED_CHAR)
+
+    return unmapped_count <= char_count * MAX_UNMAPPED_RATIO
+
+
+def text_layer_pages(file_path: str, pages=None) -> dict:
+    """
+    Returns dictionary page number -> ``TextLayerPage`` of pages
+    with usable text layer.
+
+    ``pages`` - page numbers to check (starting with 1); None means
+    all pages. Returns empty dictionary if ``file_path`` is not a PDF file
+    or text layer extraction is disabled (``OCR_TEXT_LAYER_MIN_CHARS``
+    is None).
+    """
+    min_chars = settings.OCR_TEXT_LAYER_MIN_CHARS
+    if min_chars is None:
+        return {}
+
+    with open(file_path, 'rb') as f:
+        if f.read(len(PDF_MAGIC)) != PDF_MAGIC:
+            # e.g. jpeg or png image
+            return {}
+
+    page_numbers = None
+    if pages is not None:
+        page_numbers = [number - 1 for number in pages]
+
+    result = {}
+    layouts = extract_pages(file_path, page_numbers=page_numbers)
+    for index, layout in enumerate(layouts):
+        number = pages[index] if pages is not None else index + 1
+        if _is_scan(layout):
+            continue
+
+        lines = [
+            words for words in (
+                _line_words(line, layout.height)
+                for line in _text_lines(layout)
+            ) if words
+        ]
+        page = TextLayerPage(
+            number=number,
+            width=_to_pixels(layout.width),
+            height=_to_pixels(layout.height),
+            lines=lines
+        )
+        if _is_usable(page.text, min_chars):
+            result[number] = page
+
+    return result
+
+
+def _hocr(page: TextLayerPage) -> bytes:
+    html = etree.Element('html', xmlns='http://www.w3.org/1999/xhtml')
+    head = etree.SubElement(html, 'head')
+    etree.SubElement(
+        head, 'meta', name='ocr-system', content='papermerge text layer'
+    )
+    body = etree.SubElement(html, 'body')
+    page_el = etree.SubElement(
+        body,
+        'div',
+        id=f'page_{page.number}',
+        title=f'bbox 0 0 {page.width} {page.height}; ppageno {page.number}'
+    )
+    page_el.set('class', 'ocr_page')
+    word_index = 0
+    for line_index, line in enumerate(page.lines, start=1):
+        line_el = etree.SubElement(page_el, 'span', id=f'line_{line_index}')
+        line_el.set('class', 'ocr_line')
+        for word in line:
+            word_index += 1
+            word_el = etree.SubElement(
+                line_el,
+                'span',
+                id=f'word_{word_index}',
+                title=f'bbox {word.bbox}'
+            )
+            word_el.set('class', 'ocrx_word')
+            word_el.text = word.text
+
+    return etree.tostring(html, pretty_print=True, encoding='utf-8')
+
+
+def _svg(page: TextLayerPage, image) -> str:
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, quality=50, format='JPEG')
+    texts = []
+    word_index = 0
+    for line in page.lines:
+        for word in line:
+            word_index += 1
+            height = word.y2 - word.y1
+            text = etree.Element(
+                'text',
+                x=str(word.x1),
+                y=str(word.y2),
+                textLength=str(word.x2 - word.x1),
+                id=f'word_{word_index}',
+                title=f'bbox {word.bbox}',
+                fill='transparent',
+                opacity='0.4'
+            )
+            text.set('font-size', str(height))
+            text.text = word.text
+            texts.append(
+                '    ' + etree.tostring(text, encoding='unicode')
+            )
+
+    return SVG_TEMPLATE.format(
+        width=page.width,
+        height=page.height,
+        image=base64.b64encode(buffer.getvalue()).decode('utf-8'),
+        text='\n'.join(texts)
+    )
+
+
+def write_sidecars(
+    file_path: str,
+    page: TextLayerPage,
+    sidecars_dir: str,
+    preview_width: int
+) -> None:
+    """
+    Writes txt, hocr, svg and jpg preview sidecars of the ``page``
+    in the same layout as OCR does (see ``PagePath``).
+    """
+    name = f"{page.number:06d}"
+    page_dir = os.path.join(sidecars_dir, name)
+    os.makedirs(page_dir, exist_ok=True)
+
+    with open(os.path.join(page_dir, f"{name}_ocr_hocr.txt"), 'w') as f:
+        f.write(page.text)
+
+    with open(os.path.join(page_dir, f"{name}_ocr_hocr.hocr"), 'wb') as f:
+        f.write(_hocr(page))
+
+    image, = convert_from_path(
+        file_path,
+        dpi=DPI,
+        first_page=page.number,
+        last_page=page.number
+    )
+    with open(os.path.join(page_dir, f"{name}_ocr.svg"), 'w') as f:
+        f.write(_svg(page, image))
+
+    height = int(image.size[1] * preview_width / image.size[0])
+    preview = image.convert('RGB').resize((preview_width, height))
+    preview.save(
+        os.path.join(page_dir, f"{name}_ocr.jpg"),
+        quality=50,
+        format='JPEG'
+    )
@@ -8,6 +8,7 @@ from .document_version import (
     DocumentVersionOcrTextSerializer,
     DocumentVersionDownloadSerializer
 )
+from .export_job import ExportJobSerializer
 from .folder import FolderSerializer
 from .node import (
     NodeSerializer,
@@ -16,7 +17,7 @@ from .node import (
     NodeTagsSerializer,
     InboxCountSerializer
 )
-from .ocr import OcrSerializer
+from .ocr import OcrSerializer, OcrQueueSerializer
 from .user import UserSerializer, Data_UserSerializer
 from .group import GroupSerializer
 from .tag import TagSerializer
@@ -29,6 +30,8 @@ from .page import (
     PageReorderSerializer,
     PagesRotateSerializer,
     PageRotateSerializer,
+    PagesEditSerializer,
+    PageEditOperationSerializer,
     PagesMoveToFolderSerializer,
     PagesMoveToDocumentSerializer
 )
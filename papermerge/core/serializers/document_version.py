@@ -39,16 +39,13 @@ class DocumentVersionOcrTextSerializer(rest_serializers.Serializer):
 
 
 class DocumentVersionDownloadSerializer(BaseSerializer):
-    """DocumentVersion => corresponding file bytes"""
+    """
+    DocumentVersion => corresponding file bytes
+
+    Describes download endpoint only; file is sent by the view without
+    being read into memory (see ``papermerge.core.file_response``).
+    """
 
     @property
     def fields(self):
         return {}
-
-    def to_representation(self, instance):
-        file_abs_path = instance.abs_file_path()
-
-        with open(file_abs_path, "rb") as file:
-            content = file.read()
-
-        return content
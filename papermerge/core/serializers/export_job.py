@@ -0,0 +1,38 @@
+from django.urls import reverse
+
+from drf_spectacular.openapi import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+from rest_framework import serializers as rest_serializers
+
+from papermerge.core.models import ExportJob
+
+
+class ExportJobSerializer(rest_serializers.ModelSerializer):
+
+    download_url = rest_serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = (
+            'id',
+            'node_ids',
+            'include_version',
+            'archive_type',
+            'status',
+            'entries',
+            'download_name',
+            'size',
+            'error',
+            'created_at',
+            'updated_at',
+            'download_url'
+        )
+        read_only_fields = fields
+
+    @extend_schema_field(OpenApiTypes.STR)
+    def get_download_url(self, obj):
+        # archive is available for download only once export succeeded
+        if not obj.is_succeeded:
+            return None
+
+        return reverse('export-job-download', args=[str(obj.pk)])
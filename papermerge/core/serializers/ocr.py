@@ -4,3 +4,11 @@ from rest_framework import serializers as rest_serializers
 class OcrSerializer(rest_serializers.Serializer):
     doc_id = id = rest_serializers.CharField(max_length=32, required=True)
     lang = rest_serializers.CharField(required=True)
+
+
+class OcrQueueSerializer(rest_serializers.Serializer):
+    name = rest_serializers.CharField()
+    # None means no limit
+    max_page_count = rest_serializers.IntegerField(allow_null=True)
+    # number of waiting tasks; None if queue cannot be inspected
+    depth = rest_serializers.IntegerField(allow_null=True)
@@ -35,7 +35,17 @@ class PageSerializer(serializers.ModelSerializer):
         return reverse('pages_page', args=[str(obj.pk)])
 
 
-class PageDeleteSerializer(rest_serializers.Serializer):
+class PageOperationSerializer(rest_serializers.Serializer):
+    """Base serializer of page operations (i.e. page mutating requests)"""
+    expected_version = rest_serializers.IntegerField(
+        required=False,
+        help_text='Number of the document version the client expects to '
+        'modify. If document version was changed meanwhile, request '
+        'fails with 409 Conflict.'
+    )
+
+
+class PageDeleteSerializer(PageOperationSerializer):
     # list of pages to delete
     pages = rest_serializers.ListField(
         child=rest_serializers.UUIDField()
@@ -55,7 +65,7 @@ class PageReorderSerializer(rest_serializers.Serializer):
     )
 
 
-class PagesReorderSerializer(rest_serializers.Serializer):
+class PagesReorderSerializer(PageOperationSerializer):
     pages = PageReorderSerializer(many=True)
 
 
@@ -65,11 +75,47 @@ class PageRotateSerializer(rest_serializers.Serializer):
     angle = rest_serializers.IntegerField()
 
 
-class PagesRotateSerializer(rest_serializers.Serializer):
+class PagesRotateSerializer(PageOperationSerializer):
     pages = PageRotateSerializer(many=True)
 
 
-class PagesMoveToFolderSerializer(rest_serializers.Serializer):
+PAGE_EDIT_DELETE = 'delete'
+PAGE_EDIT_ROTATE = 'rotate'
+PAGE_EDIT_REORDER = 'reorder'
+
+
+class PageEditOperationSerializer(rest_serializers.Serializer):
+    op = rest_serializers.ChoiceField(
+        choices=[PAGE_EDIT_DELETE, PAGE_EDIT_ROTATE, PAGE_EDIT_REORDER]
+    )
+    # pages the operation applies to; for `reorder` operation - all
+    # (not deleted) pages in the desired order
+    pages = rest_serializers.ListField(
+        child=rest_serializers.UUIDField(),
+        allow_empty=False
+    )
+    # rotation angle, required by `rotate` operation only
+    angle = rest_serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if data['op'] == PAGE_EDIT_ROTATE:
+            if 'angle' not in data:
+                raise rest_serializers.ValidationError(
+                    "Rotate operation requires angle"
+                )
+            if data['angle'] % 90 != 0:
+                raise rest_serializers.ValidationError(
+                    "Angle must be a multiple of 90"
+                )
+
+        return data
+
+
+class PagesEditSerializer(PageOperationSerializer):
+    operations = PageEditOperationSerializer(many=True, allow_empty=False)
+
+
+class PagesMoveToFolderSerializer(PageOperationSerializer):
     pages = serializers.ListSerializer(
         child=serializers.UUIDField()
     )
@@ -82,7 +128,7 @@ class PagesMoveToFolderSerializer(rest_serializers.Serializer):
     )
 
 
-class PagesMoveToDocumentSerializer(rest_serializers.Serializer):
+class PagesMoveToDocumentSerializer(PageOperationSerializer):
     pages = serializers.ListSerializer(
         child=serializers.UUIDField()
     )
@@ -100,3 +146,8 @@ class PagesMoveToDocumentSerializer(rest_serializers.Serializer):
     # ...
     # -1 - at the end
     position = rest_serializers.IntegerField(default=-1)
+    dst_expected_version = rest_serializers.IntegerField(
+        required=False,
+        help_text='Number of the destination document version the client '
+        'expects to modify.'
+    )
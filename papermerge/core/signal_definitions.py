@@ -23,6 +23,15 @@ Arguments:
 """
 page_move_to_folder = Signal()
 
+"""
+Sent once after document's pages were extracted to folder as multiple
+new documents at once (documents are created in bulk, thus no
+``post_save`` signal is sent for them).
+Arguments:
+    document_versions - list of newly created document versions
+"""
+page_move_to_folder_batch = Signal()
+
 """
 Sent immediately after (some of) document's page(s) were moved to another doc.
 Arguments:
@@ -52,6 +61,24 @@ Arguments:
 """
 page_reorder = Signal()
 
+"""
+Sent immediately after multiple page operations (delete, rotate, reorder)
+were applied on document's page(s) at once.
+Arguments:
+    document_version - model instance of newly created document version
+"""
+page_edit = Signal()
+
+"""
+Sent after page preview was served; previews of following pages
+should be generated in background.
+Arguments:
+    document_version - model instance of page's document version
+    page_numbers - list of page numbers whose previews are missing
+    size - preview width (None means default width)
+"""
+page_previews_prefetch = Signal()
+
 
 # Sent by core.views.documents.create_folder
 # Sent AFTER one single folder was created
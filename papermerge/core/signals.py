@@ -1,4 +1,5 @@
 import logging
+import os
 
 from kombu.exceptions import OperationalError
 from channels.layers import get_channel_layer
@@ -20,6 +21,8 @@ from django.conf import settings
 from papermerge.core.models import (
     Document,
     DocumentVersion,
+    ExportJob,
+    Page,
     User,
 )
 from papermerge.core.storage import get_storage_instance
@@ -29,7 +32,7 @@ from .tasks import (
     post_ocr_document_task,
     generate_page_previews_task
 )
-from .signal_definitions import document_post_upload
+from .signal_definitions import document_post_upload, page_previews_prefetch
 
 
 logger = logging.getLogger(__name__)
@@ -37,6 +40,8 @@ logger = logging.getLogger(__name__)
 # Tasks that need to notify websocket clients
 MONITORED_TASKS = (
     'papermerge.core.tasks.ocr_document_task',
+    'papermerge.core.tasks.page_operation_task',
+    'papermerge.core.tasks.export_nodes_task',
 )
 
 HEARTBEAT_FILE = Path("/tmp/worker_heartbeat")
@@ -65,6 +70,15 @@ def delete_files(sender, instance: Document, **kwargs):
             )
 
 
+@receiver(post_delete, sender=ExportJob)
+def delete_export_file(sender, instance: ExportJob, **kwargs):
+    """Deletes archive built by export job"""
+    try:
+        os.unlink(instance.abs_file_path())
+    except FileNotFoundError:
+        pass
+
+
 @receiver(post_delete, sender=User)
 def delete_user_data(sender, instance, **kwargs):
     """Deletes associated user folder(s) under media root"""
@@ -89,6 +103,14 @@ def get_channel_data(task_name, type):
         return {
             'type': f"ocrdocumenttask.{type}"
         }
+    elif task_name == 'papermerge.core.tasks.page_operation_task':
+        return {
+            'type': f"pageoperationtask.{type}"
+        }
+    elif task_name == 'papermerge.core.tasks.export_nodes_task':
+        return {
+            'type': f"exportnodestask.{type}"
+        }
     else:
         raise ValueError(f"Task name not in {MONITORED_TASKS}")
 
@@ -141,14 +163,21 @@ def channel_group_notify_task_postrun(sender=None, **kwargs):
     if sender:
         if sender.name in MONITORED_TASKS:
             state = kwargs['state']
+            task_kwargs = dict(kwargs['kwargs'])
+            if state in ('IGNORED', 'RETRY'):
+                # task was replaced (e.g. ``ocr_document_task`` fanned
+                # out into page ranges) or will run again later
+                return
             if state == 'SUCCESS':
                 type = 'tasksucceeded'
             else:
                 type = 'taskfailed'
+                # on failure ``retval`` is the raised exception
+                task_kwargs['error'] = str(kwargs.get('retval'))
 
             channel_group_notify(
                 task_name=sender.name,
-                task_kwargs=kwargs['kwargs'],
+                task_kwargs=task_kwargs,
                 type=type
             )
 
@@ -185,6 +214,29 @@ def generate_page_previews(
     generate_page_previews_task.delay(str(document_version.id))
 
 
+@receiver(page_previews_prefetch, sender=Page)
+def prefetch_page_previews(
+    sender,
+    document_version: DocumentVersion,
+    page_numbers,
+    size=None,
+    **_
+):
+    """Generates previews of given pages in background"""
+    try:
+        generate_page_previews_task.delay(
+            str(document_version.id),
+            page_numbers=page_numbers,
+            size=size
+        )
+    except OperationalError:
+        # previews will be generated on request
+        logger.warning(
+            "Operation Error while creating the task",
+            exc_info=True
+        )
+
+
 @receiver(document_post_upload, sender=Document)
 def receiver_document_post_upload(
     sender,
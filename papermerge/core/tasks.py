@@ -1,22 +1,46 @@
-import io
 import os
 import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
+from django.db import transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from celery import shared_task
-from papermerge.core.ocr.document import ocr_document
+from celery import chord, shared_task
+from papermerge.core.app_settings import settings
+from papermerge.core.lib.path import PagePath
+from papermerge.core.ocr.document import (
+    merge_page_ranges,
+    ocr_document,
+    ocr_page_range,
+    page_ranges
+)
+from papermerge.core.ocr.queues import user_slot
 from papermerge.core.storage import abs_path, get_storage_instance
 
 from .models import (
     Document,
     DocumentVersion,
+    ExportJob,
     Folder,
-    Page
+    Page,
+    User
+)
+from .models.export_job import (
+    EXPORT_STATUS_ACTIVE,
+    EXPORT_STATUS_FAILED,
+    EXPORT_STATUS_RUNNING,
+    EXPORT_STATUS_SUCCEEDED
 )
 
 logger = logging.getLogger(__name__)
 
+# min number of seconds between two progress notifications of export job
+EXPORT_PROGRESS_INTERVAL = 1
+
 
 @shared_task
 def delete_user_data(user_id):
@@ -26,8 +50,66 @@ def delete_user_data(user_id):
     storage.delete_user_data(user_id=user_id)
 
 
-@shared_task(acks_late=True, reject_on_worker_lost=True)
+@shared_task
+def collect_garbage_task():
+    """
+    Removes sidecar blobs not referenced by any document version.
+
+    Meant to be run periodically (e.g. via celery beat).
+    """
+    storage = get_storage_instance()
+    removed_count, reclaimed_bytes = storage.collect_garbage()
+    logger.debug(
+        f'collect_garbage_task: removed_count={removed_count}'
+        f' reclaimed_bytes={reclaimed_bytes}'
+    )
+
+    return reclaimed_bytes
+
+
+@shared_task
+def compact_document_versions_task():
+    """
+    Prunes archived document versions which are outside of retention
+    policy (see ``VERSION_RETENTION_KEEP_LAST`` and
+    ``VERSION_RETENTION_MAX_AGE`` settings) together with their files.
+
+    Meant to be run periodically (e.g. via celery beat).
+    Returns number of reclaimed bytes.
+    """
+    older_than = None
+    if settings.VERSION_RETENTION_MAX_AGE is not None:
+        older_than = timezone.now() - timedelta(
+            days=settings.VERSION_RETENTION_MAX_AGE
+        )
+
+    pruned_count, reclaimed_bytes = compact_document_versions(
+        keep_last=settings.VERSION_RETENTION_KEEP_LAST,
+        older_than=older_than,
+        batch_size=settings.VERSION_COMPACTION_BATCH_SIZE
+    )
+    logger.info(
+        f'compact_document_versions_task: pruned_count={pruned_count}'
+        f' reclaimed_bytes={reclaimed_bytes}'
+    )
+
+    return reclaimed_bytes
+
+
+def _reused_pages(reuse_map):
+    """
+    Pages of ``reuse_map`` as (page number, source PDF file path,
+    source page number) tuples
+    """
+    return [
+        (number, page.document_version.abs_file_path(), page.number)
+        for number, page in reuse_map.items()
+    ]
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
 def ocr_document_task(
+    self,
     document_id,
     lang,
     user_id,  # UUID of the user who initiated OCR of the document
@@ -43,6 +125,16 @@ def ocr_document_task(
     is chained with other celery tasks which will receive as
     first argument returned value of this task (i.e. ``document_id``).
 
+    Documents with more pages than ``OCR_FAN_OUT_PAGE_COUNT`` are
+    OCRed in page ranges, in parallel: this task is replaced by a chord
+    of ``ocr_page_range_task`` tasks (tasks linked to this task are
+    linked to the chord). OCRed ranges are merged
+    in ``post_ocr_document_task``.
+
+    OCR tasks are routed to queues by page count and each user
+    runs at most ``OCR_USER_MAX_CONCURRENCY`` OCR tasks at the same time
+    (see ``papermerge.core.ocr.queues``).
+
     If you use `acks_late` then the worker will remove the item from the queue
     at the end of the task rather than the beginning.
     However, if the worker process is killed the task is still acknowledged even
@@ -51,34 +143,165 @@ def ocr_document_task(
     """
     doc = Document.objects.get(pk=document_id)
     user_id = doc.user.id
+    with user_slot(self, user_id):
+        doc_version = doc.versions.last()
+        # lazy document version's file is built before OCR
+        doc_version.materialize()
+
+        # pages with same content as in previous (OCRed) version
+        # are not OCRed
+        reuse_map = doc_version.ocr_reuse_map()
+        pages = None
+        reused_pages = None
+        if reuse_map:
+            pages = [
+                number for number in range(1, doc_version.page_count + 1)
+                if number not in reuse_map
+            ]
+            reused_pages = _reused_pages(reuse_map)
+
+        range_size = settings.OCR_FAN_OUT_PAGE_COUNT
+        page_count = doc_version.page_count
+        ocr_page_count = page_count if pages is None else len(pages)
+        if range_size and ocr_page_count > range_size:
+            header = []
+            for first, last in page_ranges(page_count, range_size):
+                range_pages = [
+                    number for number in range(first, last + 1)
+                    if number not in reuse_map
+                ]
+                if range_pages:
+                    header.append(
+                        ocr_page_range_task.si(
+                            document_id=document_id,
+                            lang=lang,
+                            first=first,
+                            last=last,
+                            pages=range_pages,
+                            namespace=namespace
+                        )
+                    )
+
+            logger.debug(
+                'ocr_document_task: fan out '
+                f'document_id={document_id} namespace={namespace} '
+                f'lang={lang} ranges={len(header)}'
+            )
+
+            return self.replace(
+                chord(
+                    header,
+                    ocr_page_ranges_complete_task.si(
+                        document_id=document_id,
+                        lang=lang,
+                        user_id=user_id,
+                        namespace=namespace
+                    )
+                )
+            )
+
+        logger.debug(
+            'ocr_document_task: ocr start'
+            f'document_id={document_id} namespace={namespace} '
+            f'lang={lang} pages={pages}'
+        )
+
+        ocr_document(
+            user_id=user_id,
+            document_id=document_id,
+            file_name=doc_version.file_name,
+            lang=lang,
+            namespace=namespace,
+            version=doc_version.number,
+            target_version=doc_version.number + 1,
+            pages=pages,
+            reused_pages=reused_pages
+        )
+
+        logger.debug(
+            'ocr_document_task: ocr end'
+            f'document_id={document_id} namespace={namespace} '
+            f'lang={lang}'
+        )
+
+        logger.debug(
+            'ocr_document_task: successfully complete'
+            f'document_id={document_id} namespace={namespace} '
+            f'lang={lang}'
+        )
+
+        return document_id
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def ocr_page_range_task(
+    self,
+    document_id,
+    lang,
+    first,
+    last,
+    pages=None,
+    namespace=None
+):
+    """
+    OCRs pages ``first``..``last`` of the document's last version.
+
+    ``pages`` - page numbers within the range to OCR; None means
+    all pages of the range.
+    Part of the chord created by ``ocr_document_task``.
+    """
+    doc = Document.objects.get(pk=document_id)
     doc_version = doc.versions.last()
 
     logger.debug(
-        'ocr_document_task: ocr start'
+        'ocr_page_range_task: '
         f'document_id={document_id} namespace={namespace} '
-        f'lang={lang}'
+        f'lang={lang} first={first} last={last}'
     )
 
-    ocr_document(
-        user_id=user_id,
-        document_id=document_id,
-        file_name=doc_version.file_name,
-        lang=lang,
-        namespace=namespace,
-        version=doc_version.number,
-        target_version=doc_version.number + 1
-    )
+    with user_slot(self, doc.user.id):
+        ocr_page_range(
+            user_id=doc.user.id,
+            document_id=document_id,
+            file_name=doc_version.file_name,
+            lang=lang,
+            version=doc_version.number,
+            target_version=doc_version.number + 1,
+            first=first,
+            last=last,
+            pages=pages
+        )
 
-    logger.debug(
-        'ocr_document_task: ocr end'
-        f'document_id={document_id} namespace={namespace} '
-        f'lang={lang}'
-    )
+    return document_id
 
-    logger.debug(
-        'ocr_document_task: successfully complete'
-        f'document_id={document_id} namespace={namespace} '
-        f'lang={lang}'
+
+@shared_task
+def ocr_page_ranges_complete_task(
+    document_id,
+    lang,
+    user_id,
+    namespace=None
+):
+    """
+    Body of the chord created by ``ocr_document_task``; runs
+    after all page ranges of the document were OCRed.
+
+    Notifies websocket clients that OCR of the document is complete
+    (on behalf of replaced ``ocr_document_task``) and returns
+    ``document_id``, as ``ocr_document_task`` would.
+    """
+    # imported here to avoid circular imports (signals -> tasks)
+    from papermerge.core.signals import channel_group_notify
+
+    channel_group_notify(
+        task_name=ocr_document_task.name,
+        task_kwargs={
+            'document_id': document_id,
+            'lang': lang,
+            'user_id': str(user_id),
+            'namespace': namespace
+        },
+        type='tasksucceeded'
     )
 
     return document_id
@@ -90,11 +313,25 @@ def post_ocr_document_task(document_id, namespace=None):
     Task to run immediately after document OCR is complete
 
     This task guarantees that `increment_document_version` will run
-    before `update_document_pages`.
+    before `update_document_pages`. If document was OCRed in page
+    ranges (see ``ocr_document_task``), ranges are merged first.
     """
     logger.debug(f'post_ocr_task_task doc_id={document_id}')
 
+    # computed before OCRed document version is added
+    doc_version = Document.objects.get(pk=document_id).versions.last()
+    reuse_map = doc_version.ocr_reuse_map()
+
+    merge_page_ranges(
+        user_id=doc_version.document.user_id,
+        document_id=document_id,
+        file_name=doc_version.file_name,
+        version=doc_version.number,
+        target_version=doc_version.number + 1,
+        reused_pages=_reused_pages(reuse_map)
+    )
     increment_document_version(document_id, namespace)
+    reuse_ocr_sidecars(document_id, reuse_map)
     update_document_pages(document_id, namespace)
 
     # generate previews for newly created document version (which has OCR)
@@ -106,18 +343,288 @@ def post_ocr_document_task(document_id, namespace=None):
     return document_id
 
 
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def page_operation_task(
+    operation_id,
+    operation,
+    user_id,  # UUID of the user who initiated page operation
+    data
+):
+    """
+    Runs page operation (delete, reorder, rotate, edit, move to folder,
+    move to document) in background.
+
+    ``data`` is validated data of the operation's serializer.
+    While operation is running, progress of each completed stage
+    is sent to ``page_operation_task`` channel group.
+    Start, success and failure notifications are sent
+    by celery task signal handlers (see ``papermerge.core.signals``).
+
+    On success returns list of IDs of newly created document versions.
+    """
+    # imported here to avoid circular imports (views -> tasks)
+    from papermerge.core.views.page_operations import run_page_operation
+    from papermerge.core.signals import channel_group_notify
+
+    user = User.objects.get(pk=user_id)
+
+    def progress(stage):
+        channel_group_notify(
+            task_name=page_operation_task.name,
+            task_kwargs={
+                'operation_id': operation_id,
+                'operation': operation,
+                'user_id': user_id,
+                'stage': stage
+            },
+            type='taskprogress'
+        )
+
+    logger.debug(
+        f'page_operation_task: operation_id={operation_id}'
+        f' operation={operation} user_id={user_id}'
+    )
+
+    new_versions = run_page_operation(
+        name=operation,
+        user=user,
+        data=data,
+        progress=progress
+    )
+
+    return [str(version.id) for version in new_versions]
+
+
+@shared_task
+def delete_expired_export_jobs_task():
+    """
+    Deletes finished (succeeded or failed) export jobs older than
+    ``EXPORT_MAX_AGE`` hours together with their archives.
+
+    Meant to be run periodically (e.g. via celery beat).
+    Returns number of deleted export jobs.
+    """
+    if settings.EXPORT_MAX_AGE is None:
+        return 0
+
+    older_than = timezone.now() - timedelta(hours=settings.EXPORT_MAX_AGE)
+    # archives are deleted by ``post_delete`` signal handler
+    deleted_count, _ = ExportJob.objects.exclude(
+        status__in=EXPORT_STATUS_ACTIVE
+    ).filter(updated_at__lt=older_than).delete()
+    logger.info(
+        f'delete_expired_export_jobs_task: deleted_count={deleted_count}'
+    )
+
+    return deleted_count
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def export_nodes_task(
+    export_job_id,
+    user_id  # UUID of the user who requested the export
+):
+    """
+    Builds archive (or document file) of export job's nodes in storage.
+
+    Archive is written under temporary name and moved in place once
+    complete. While archive is being built, number of written documents
+    is saved in export job and sent (at most once per
+    ``EXPORT_PROGRESS_INTERVAL`` seconds) to ``export_nodes_task``
+    channel group. Start, success and failure notifications are sent
+    by celery task signal handlers (see ``papermerge.core.signals``).
+
+    On success returns size of the archive in bytes.
+    """
+    # imported here to avoid circular imports (nodes_download -> models)
+    from papermerge.core.nodes_download import get_nodes_download
+    from papermerge.core.signals import channel_group_notify
+
+    job = ExportJob.objects.get(pk=export_job_id)
+    last_notified = time.monotonic()
+
+    def progress(entries):
+        nonlocal last_notified
+        now = time.monotonic()
+        if now - last_notified < EXPORT_PROGRESS_INTERVAL:
+            return
+        last_notified = now
+        ExportJob.objects.filter(pk=job.pk).update(entries=entries)
+        channel_group_notify(
+            task_name=export_nodes_task.name,
+            task_kwargs={
+                'export_job_id': export_job_id,
+                'user_id': user_id,
+                'entries': entries
+            },
+            type='taskprogress'
+        )
+
+    logger.debug(
+        f'export_nodes_task: export_job_id={export_job_id} user_id={user_id}'
+    )
+
+    try:
+        nodes_download = get_nodes_download(
+            node_ids=job.node_ids,
+            file_name=job.file_name,
+            include_version=job.include_version,
+            archive_type=job.archive_type,
+            progress=progress
+        )
+        job.status = EXPORT_STATUS_RUNNING
+        job.entries = 0
+        job.download_name = nodes_download.file_name
+        job.content_type = nodes_download.content_type
+        job.file_extension = nodes_download.file_extension
+        job.save(update_fields=[
+            'status',
+            'entries',
+            'download_name',
+            'content_type',
+            'file_extension',
+            'updated_at'
+        ])
+
+        dst = job.abs_file_path()
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(dst),
+            suffix=job.file_extension
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in nodes_download.streaming_content():
+                    f.write(chunk)
+            os.replace(tmp_path, dst)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except Exception as error:
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=EXPORT_STATUS_FAILED,
+            error=str(error),
+            updated_at=timezone.now()
+        )
+        raise
+
+    size = os.stat(dst).st_size
+    updated = ExportJob.objects.filter(pk=job.pk).update(
+        status=EXPORT_STATUS_SUCCEEDED,
+        entries=nodes_download.entries_count,
+        size=size,
+        updated_at=timezone.now()
+    )
+    if not updated:
+        # export job was deleted while archive was being built
+        os.unlink(dst)
+
+    return size
+
+
 @shared_task
-def generate_page_previews_task(document_version_id):
+def generate_page_previews_task(
+    document_version_id,
+    page_numbers=None,
+    size=None
+):
+    """
+    Generates previews of document version's pages.
+
+    ``page_numbers`` - pages to generate previews for; None means all
+    pages. ``size`` - preview width; None means default width.
+    """
     document_version = DocumentVersion.objects.get(id=document_version_id)
 
     doc = document_version.document
     logger.debug(f"Generating previews doc_id={doc.id}")
 
-    document_version.generate_previews()
+    if page_numbers is None and size is None:
+        document_version.generate_previews()
+        return document_version_id
+
+    pages = document_version.pages.all()
+    if page_numbers is not None:
+        pages = pages.filter(number__in=page_numbers)
+
+    for page in pages:
+        page.generate_preview(size=size)
 
     return document_version_id
 
 
+def compact_document_versions(
+    keep_last=None,
+    older_than=None,
+    batch_size=100
+):
+    """
+    Deletes prunable document versions (see
+    ``DocumentVersionQuerySet.prunable``) in batches of ``batch_size``.
+
+    Returns a tuple (number of pruned versions, number of reclaimed bytes).
+    """
+    storage = get_storage_instance()
+    pruned_count, reclaimed_bytes = 0, 0
+
+    while True:
+        batch = list(
+            DocumentVersion.objects.prunable(
+                keep_last=keep_last,
+                older_than=older_than
+            ).select_related(
+                'document__user'
+            ).order_by('document_id', 'number')[:batch_size]
+        )
+        if not batch:
+            break
+
+        versions_by_document = {}
+        for version in batch:
+            versions_by_document.setdefault(
+                version.document_id, []
+            ).append(version)
+
+        for versions in versions_by_document.values():
+            prune_document_versions(versions)
+            for version in versions:
+                reclaimed_bytes += storage.delete_version(
+                    version.document_path
+                )
+            pruned_count += len(versions)
+
+    _, blobs_reclaimed_bytes = storage.collect_garbage()
+
+    return pruned_count, reclaimed_bytes + blobs_reclaimed_bytes
+
+
+def prune_document_versions(versions):
+    """
+    Deletes ``versions`` (archived versions of one document) from database.
+
+    Lazy versions of the document which are kept, but whose manifest
+    references pages of pruned versions, are materialized first.
+    Files of pruned versions are not touched.
+    """
+    document = versions[0].document
+    pruned_ids = {str(version.pk) for version in versions}
+
+    with transaction.atomic():
+        # page operations on the document wait until pruning is done
+        document.lock()
+        kept_versions = document.versions.exclude(
+            pk__in=pruned_ids
+        ).filter(manifest__isnull=False)
+        for kept_version in kept_versions:
+            if any(
+                entry['version'] in pruned_ids
+                for entry in kept_version.manifest
+            ):
+                kept_version.materialize()
+
+        DocumentVersion.objects.filter(pk__in=pruned_ids).delete()
+
+
 def increment_document_version(document_id, namespace=None):
     logger.debug(
         'increment_document_version: '
@@ -145,12 +652,33 @@ def increment_document_version(document_id, namespace=None):
         f'lang={lang}'
     )
 
-    for page_number in range(1, new_doc_version.page_count + 1):
-        Page.objects.create(
-            document_version=new_doc_version,
-            number=page_number,
-            page_count=new_doc_version.page_count,
-            lang=lang
+    # OCRed version has the same content as its source version
+    new_doc_version.create_pages(
+        fingerprints=list(
+            doc_version.pages.values_list('fingerprint', flat=True)
+        )
+    )
+
+
+def reuse_ocr_sidecars(document_id, reuse_map):
+    """
+    Copies OCR data (sidecars) of reused pages into the last
+    document version.
+
+    ``reuse_map`` maps page numbers to pages of the previous
+    version with identical content (see ``DocumentVersion.ocr_reuse_map``).
+    """
+    if not reuse_map:
+        return
+
+    doc = Document.objects.get(pk=document_id)
+    doc_version = doc.versions.last()
+    storage = get_storage_instance()
+
+    for page in doc_version.pages.filter(number__in=reuse_map.keys()):
+        storage.copy_page(
+            src=reuse_map[page.number].page_path,
+            dst=page.page_path
         )
 
 
@@ -163,7 +691,7 @@ def update_document_pages(document_id, namespace=None):
 
     In case when a particular file with ``page.txt_url`` does not exist,
     page content (to the precise, the lack of page content) will
-    be replaced with empty string (io.String('')).
+    be replaced with empty string.
 
     In particular when no OCR was performed yet each individual
     page as well as document versions's ``text`` fields will be
@@ -177,16 +705,41 @@ def update_document_pages(document_id, namespace=None):
 
     doc = Document.objects.get(pk=document_id)
     doc_version = doc.versions.last()
-    streams = []
+    # document path is built once, not once per page
+    document_path = doc_version.document_path
+    paths = [
+        abs_path(
+            PagePath(document_path=document_path, page_num=number).txt_url
+        )
+        for number in doc_version.pages.order_by(
+            'number'
+        ).values_list('number', flat=True)
+    ]
 
-    for page in doc_version.pages.order_by('number'):
-        url = abs_path(page.txt_url)
-        if os.path.exists(url):
-            streams.append(open(url))
-        else:
-            streams.append(io.StringIO(''))
+    doc_version.update_pages_text(read_text_files(paths))
+
+
+def _read_text_file(path):
+    if not os.path.exists(path):
+        return ''
+
+    with open(path) as f:
+        return f.read()
+
+
+def read_text_files(paths):
+    """
+    Returns list of contents of text files at ``paths`` (in the same order);
+    missing files are read as empty strings.
+
+    Files are read by at most ``OCR_INGEST_WORKERS`` threads.
+    """
+    if not paths:
+        return []
 
-    doc_version.update_text_field(streams)
+    max_workers = min(settings.OCR_INGEST_WORKERS, len(paths))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_read_text_file, paths))
 
 
 def norm_pages_from_doc(document):
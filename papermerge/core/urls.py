@@ -68,6 +68,21 @@ urlpatterns = [
         'nodes/inboxcount/', views.InboxCountView.as_view(), name='inboxcount'
     ),
     path('nodes/download/', views.NodesDownloadView.as_view()),
+    path(
+        'nodes/export/',
+        views.NodesExportView.as_view(),
+        name='nodes-export'
+    ),
+    path(
+        'nodes/export/<uuid:pk>/',
+        views.ExportJobView.as_view(),
+        name='export-job'
+    ),
+    path(
+        'nodes/export/<uuid:pk>/download/',
+        views.ExportJobDownloadView.as_view(),
+        name='export-job-download'
+    ),
     path(
         'nodes/<uuid:pk>/tags/',
         views.NodeTagsView.as_view(),
@@ -83,6 +98,11 @@ urlpatterns = [
         views.PagesRotateView.as_view(),
         name='pages_rotate'
     ),
+    path(
+        'pages/edit/',
+        views.PagesEditView.as_view(),
+        name='pages_edit'
+    ),
     path(
         'pages/move-to-folder/',
         views.PagesMoveToFolderView.as_view(),
@@ -119,6 +139,11 @@ urlpatterns = [
         views.OCRView.as_view(),
         name='tasks-ocr'
     ),
+    path(
+        'ocr/queues/',
+        views.OCRQueuesView.as_view(),
+        name='tasks-ocr-queues'
+    ),
     path(
         'version/',
         views.VersionView.as_view(),
@@ -24,16 +24,22 @@ from .document_versions import (
     DocumentVersionView
 )
 from .documents import DocumentDetailsViewSet
+from .export_jobs import (
+    NodesExportView,
+    ExportJobView,
+    ExportJobDownloadView
+)
 from .folders import FoldersViewSet
 from .pages import (
     PageView,
     PagesView,
     PagesReorderView,
     PagesRotateView,
+    PagesEditView,
     PagesMoveToFolderView,
     PagesMoveToDocumentView
 )
-from .tasks import OCRView
+from .tasks import OCRView, OCRQueuesView
 from .preferences import CustomUserPreferencesViewSet
 from .login import LoginView
 from .logout import LogoutView, LogoutAllView
@@ -1,23 +1,26 @@
-import magic
+import os
 
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.generics import RetrieveAPIView, GenericAPIView
 
-from django.http import (
-    Http404,
-    HttpResponse
-)
+from django.http import Http404
 
+from papermerge.core.file_response import file_response
+from papermerge.core.lib import mime
 from papermerge.core.models import DocumentVersion
 from papermerge.core.serializers import (
     DocumentVersionSerializer,
     DocumentVersionDownloadSerializer
 )
 from papermerge.core.renderers import PDFRenderer
-from .mixins import RequireAuthMixin
+from .mixins import ConditionalGetMixin, RequireAuthMixin, content_etag
 
 
-class DocumentVersionsDownloadView(RequireAuthMixin, GenericAPIView):
+class DocumentVersionsDownloadView(
+    RequireAuthMixin,
+    ConditionalGetMixin,
+    GenericAPIView
+):
 
     serializer_class = DocumentVersionDownloadSerializer
     renderer_classes = [PDFRenderer]
@@ -25,23 +28,39 @@ class DocumentVersionsDownloadView(RequireAuthMixin, GenericAPIView):
     def get(self, *args, **kwargs):
         doc_ver = self.get_object()
 
+        # file of archived version never changes; ETag derived from
+        # version id is thus returned without touching the file
+        immutable = doc_ver.is_archived
+        if immutable:
+            etag = content_etag(doc_ver.id, 'file')
+            not_modified = self.not_modified(etag, immutable)
+            if not_modified is not None:
+                return not_modified
+
         file_abs_path = doc_ver.abs_file_path()
 
-        mime_type = magic.from_file(file_abs_path, mime=True)
         try:
-            file_handle = open(file_abs_path, "rb")
+            if not immutable:
+                stat = os.stat(file_abs_path)
+                etag = content_etag(
+                    doc_ver.id, 'file', stat.st_size, stat.st_mtime_ns
+                )
+                not_modified = self.not_modified(etag, immutable)
+                if not_modified is not None:
+                    return not_modified
+
+            # file is not read by web worker (see file_response module)
+            resp = file_response(
+                file_abs_path,
+                content_type=mime.guess(file_abs_path),
+                filename=doc_ver.document.title,
+                request=self.request,
+                etag=etag
+            )
         except OSError:
             raise Http404("Cannot open local version of the document")
 
-        resp = HttpResponse(
-            file_handle.read(),
-            content_type=mime_type
-        )
-        disposition = "attachment; filename=%s" % doc_ver.document.title
-        resp['Content-Disposition'] = disposition
-        file_handle.close()
-
-        return resp
+        return self.patch_cache_headers(resp, etag, immutable)
 
     def get_object(self):
         doc_ver = DocumentVersion.objects.get(
@@ -0,0 +1,162 @@
+import logging
+
+from django.http import Http404
+from kombu.exceptions import OperationalError
+from rest_framework import status
+from rest_framework.generics import GenericAPIView, RetrieveDestroyAPIView
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from drf_spectacular.utils import extend_schema, OpenApiTypes
+
+from papermerge.core.exceptions import ExportNotReady
+from papermerge.core.file_response import file_response
+from papermerge.core.models import BaseTreeNode, ExportJob
+from papermerge.core.models.export_job import EXPORT_STATUS_FAILED
+from papermerge.core.serializers import (
+    ExportJobSerializer,
+    NodesDownloadSerializer
+)
+from papermerge.core.tasks import export_nodes_task
+
+from .mixins import ConditionalGetMixin, RequireAuthMixin, content_etag
+
+logger = logging.getLogger(__name__)
+
+
+class NodesExportView(RequireAuthMixin, GenericAPIView):
+    """
+    POST /nodes/export/
+
+    Starts building archive of given nodes in background (see
+    ``export_nodes_task``) and responds right away with 202 Accepted
+    and the export job. If identical export of the user is still pending
+    or running, that export job is returned (with 200 OK) instead.
+
+    Progress of the export is reported via ``ws/exports/`` websocket
+    and by ``/nodes/export/<uuid>/`` endpoint; finished archive is
+    downloaded from export job's ``download_url``.
+    """
+    parser_classes = [JSONParser]
+    renderer_classes = [JSONRenderer]
+    serializer_class = NodesDownloadSerializer
+
+    @extend_schema(
+        operation_id="nodes_export",
+        responses={
+            200: ExportJobSerializer,
+            202: ExportJobSerializer
+        }
+    )
+    def post(self, request):
+        serializer = NodesDownloadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        node_ids = set(serializer.validated_data['node_ids'])
+
+        owned_count = BaseTreeNode.objects.filter(
+            pk__in=node_ids,
+            user=request.user
+        ).count()
+        if owned_count != len(node_ids):
+            raise Http404("Node not found")
+
+        job, created = ExportJob.objects.get_or_create_active(
+            user=request.user,
+            node_ids=node_ids,
+            include_version=serializer.validated_data['include_version'],
+            archive_type=serializer.validated_data['archive_type'],
+            file_name=serializer.validated_data.get('file_name')
+        )
+
+        if created:
+            try:
+                export_nodes_task.apply_async(
+                    kwargs={
+                        'export_job_id': str(job.id),
+                        'user_id': str(request.user.id)
+                    }
+                )
+            except OperationalError as error:
+                # otherwise pending job would block identical exports
+                job.status = EXPORT_STATUS_FAILED
+                job.error = str(error)
+                job.save(update_fields=['status', 'error', 'updated_at'])
+                raise
+
+        return Response(
+            data=ExportJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+        )
+
+
+class ExportJobView(RequireAuthMixin, RetrieveDestroyAPIView):
+    """
+    GET /nodes/export/<uuid>/ - status of the export job
+    DELETE /nodes/export/<uuid>/ - deletes export job and its archive
+    """
+    renderer_classes = [JSONRenderer]
+    serializer_class = ExportJobSerializer
+
+    def get_queryset(self):
+        if not self.request:
+            return ExportJob.objects.none()
+
+        return ExportJob.objects.filter(user=self.request.user)
+
+
+class ExportJobDownloadView(
+    RequireAuthMixin,
+    ConditionalGetMixin,
+    GenericAPIView
+):
+    """
+    GET /nodes/export/<uuid>/download/
+
+    Archive of succeeded export job. Archive never changes, thus
+    interrupted download can be resumed with byte range requests.
+    """
+    renderer_classes = [JSONRenderer]
+    serializer_class = ExportJobSerializer
+
+    def perform_content_negotiation(self, request, force=False):
+        # archive is sent as it is, whatever ``Accept`` header asks for
+        # (e.g. application/zip); only errors are rendered (as JSON)
+        return super().perform_content_negotiation(request, force=True)
+
+    @extend_schema(
+        operation_id="export_job_download",
+        responses={
+            (200, 'application/pdf'): OpenApiTypes.BINARY,
+            (200, 'application/zip'): OpenApiTypes.BINARY,
+            (200, 'application/x-gtar'): OpenApiTypes.BINARY
+        }
+    )
+    def get(self, *args, **kwargs):
+        job = self.get_object()
+        if not job.is_succeeded:
+            raise ExportNotReady
+
+        etag = content_etag(job.id, 'export', job.size)
+        not_modified = self.not_modified(etag, immutable=True)
+        if not_modified is not None:
+            return not_modified
+
+        try:
+            resp = file_response(
+                job.abs_file_path(),
+                content_type=job.content_type,
+                filename=job.download_name,
+                request=self.request,
+                etag=etag
+            )
+        except OSError:
+            raise Http404("Cannot open export archive")
+
+        return self.patch_cache_headers(resp, etag, immutable=True)
+
+    def get_queryset(self):
+        if not self.request:
+            return ExportJob.objects.none()
+
+        return ExportJob.objects.filter(user=self.request.user)
@@ -1,14 +1,70 @@
+import hashlib
+
 from django.http import (
     JsonResponse,
     HttpResponse
 )
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers
+)
 from rest_framework.permissions import IsAuthenticated
 
+# max-age of content which never changes (content of archived versions)
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
 
 class RequireAuthMixin:
     permission_classes = [IsAuthenticated]
 
 
+def content_etag(*parts) -> str:
+    """Returns strong ETag derived from given parts"""
+    value = ':'.join(str(part) for part in parts)
+    digest = hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+    return f'"{digest}"'
+
+
+class ConditionalGetMixin:
+    """
+    ETag and Cache-Control headers for views serving document content.
+
+    Content of archived document versions never changes, thus it is
+    cached as immutable; content of last version must be revalidated
+    (``If-None-Match``) on every use. Responses are private as they
+    are available to authenticated users only.
+    """
+
+    def not_modified(self, etag, immutable):
+        """
+        Returns 304 (Not Modified) response if client's copy of the
+        content matches ``etag``; otherwise returns None.
+        """
+        response = get_conditional_response(self.request, etag=etag)
+        if response is None:
+            return None
+
+        return self.patch_cache_headers(response, etag, immutable)
+
+    def patch_cache_headers(self, response, etag, immutable):
+        response['ETag'] = etag
+        if immutable:
+            patch_cache_control(
+                response,
+                private=True,
+                max_age=IMMUTABLE_MAX_AGE,
+                immutable=True
+            )
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        # same URL serves different representations (see renderers)
+        patch_vary_headers(response, ['Accept'])
+
+        return response
+
+
 class JSONResponseMixin:
     """
     A mixin that can be used to render a JSON response.
@@ -4,7 +4,7 @@ from collections import OrderedDict
 
 from django.http import (
     Http404,
-    HttpResponse
+    StreamingHttpResponse
 )
 from django.db.models.signals import post_save
 from django.utils import encoding
@@ -290,8 +290,8 @@ class NodesDownloadView(RequireAuthMixin, GenericAPIView):
             except Document.DoesNotExist as exc:
                 raise Http404 from exc
 
-            response = HttpResponse(
-                nodes_download.get_content(),
+            response = StreamingHttpResponse(
+                nodes_download.streaming_content(),
                 content_type=nodes_download.content_type
             )
             response['Content-Disposition'] = nodes_download.content_disposition
@@ -0,0 +1,897 @@
+"""
+Page operations (delete, reorder, rotate, edit, move to folder,
+move to document).
+
+Each operation is a function with signature
+``operation(user, data, progress=None)`` where ``data`` is validated
+data of the corresponding serializer and ``progress`` is an optional
+callable invoked with the name of the stage the operation just
+completed. Operations return the list of newly created document versions.
+
+Each operation runs in a transaction (see ``page_operation``) which
+holds a lock on the affected document(s): concurrent operations on the
+same document are serialized, operations on different documents run in
+parallel. Page signals (and search index updates) are sent once the
+transaction is committed; if it is rolled back, files written for the
+new document versions are removed.
+Optional ``expected_version`` (number of the document version as seen
+by the client) enables optimistic concurrency control - if document
+was changed meanwhile, ``VersionConflict`` (409) is raised.
+
+Operations are run either directly inside HTTP request
+(see ``papermerge.core.views.pages``) or in background
+by ``papermerge.core.tasks.page_operation_task``.
+"""
+import functools
+import logging
+from contextvars import ContextVar
+from uuid import uuid4
+
+from django.db import transaction
+
+from papermerge.core.models import Page, Document, Folder
+from papermerge.core.lib.utils import (
+    get_reordered_list,
+    annotate_page_data
+)
+from papermerge.core.serializers.page import (
+    PAGE_EDIT_DELETE,
+    PAGE_EDIT_ROTATE,
+    PAGE_EDIT_REORDER
+)
+from papermerge.core.storage import get_storage_instance
+from papermerge.core.exceptions import APIBadRequest, VersionConflict
+from papermerge.core.signal_definitions import (
+    page_move_to_folder,
+    page_move_to_folder_batch,
+    page_move_to_document,
+    page_rotate,
+    page_delete,
+    page_reorder,
+    page_edit
+)
+from papermerge.core.models.utils import OCR_STATUS_SUCCEEDED
+from .utils import (
+    remove_pdf_pages,
+    insert_pdf_pages,
+    total_merge,
+    partial_merge,
+    reuse_ocr_data,
+    reuse_ocr_data_multi,
+    reuse_ocr_data_after_rotate,
+    reuse_text_field,
+    reuse_text_field_multi,
+    reorder_pdf_pages,
+    rotate_pdf_pages,
+    edit_pdf_pages,
+    rotate_page_images,
+    PageRecycleMap,
+    PageEditMap
+)
+
+logger = logging.getLogger(__name__)
+
+PAGE_OPERATION_DELETE = 'delete'
+PAGE_OPERATION_REORDER = 'reorder'
+PAGE_OPERATION_ROTATE = 'rotate'
+PAGE_OPERATION_EDIT = 'edit'
+PAGE_OPERATION_MOVE_TO_FOLDER = 'move_to_folder'
+PAGE_OPERATION_MOVE_TO_DOCUMENT = 'move_to_document'
+
+# stages reported via ``progress`` callable
+STAGE_VERSION_BUMP = 'version_bump'
+STAGE_PDF = 'pdf'
+STAGE_OCR_DATA = 'ocr_data'
+STAGE_TEXT = 'text'
+STAGE_DOCUMENTS = 'documents'
+
+
+# document versions created by the running page operation
+# (see ``page_operation``)
+_new_versions = ContextVar('new_versions', default=None)
+
+
+def _no_progress(stage):
+    pass
+
+
+def _created(*versions):
+    """
+    Registers document versions created by the running page operation;
+    their files are removed if the operation is rolled back
+    """
+    new_versions = _new_versions.get()
+    if new_versions is not None:
+        new_versions.extend(versions)
+
+
+def _version_bump(document, *args, **kwargs):
+    """``document.version_bump`` of the running page operation"""
+    new_version = document.version_bump(*args, **kwargs)
+    _created(new_version)
+
+    return new_version
+
+
+def _send_on_commit(signal, **kwargs):
+    """Sends page ``signal`` once current transaction is committed"""
+    transaction.on_commit(
+        lambda: signal.send(sender=Page, **kwargs)
+    )
+
+
+def _remove_files(versions):
+    storage = get_storage_instance()
+    for version in versions:
+        try:
+            storage.delete_version(version.document_path)
+        except OSError as error:
+            logger.error(
+                f"Error deleting files of document version {version.pk}:"
+                f" {error}"
+            )
+
+
+def page_operation(func):
+    """
+    Runs page operation ``func`` in a transaction.
+
+    If the transaction is rolled back, files written for document
+    versions created by the operation are removed.
+    """
+    @functools.wraps(func)
+    def inner(user, data, progress=None):
+        new_versions = []
+        token = _new_versions.set(new_versions)
+        try:
+            with transaction.atomic():
+                return func(user, data, progress=progress)
+        except Exception:
+            _remove_files(new_versions)
+            raise
+        finally:
+            _new_versions.reset(token)
+
+    return inner
+
+
+def lock_document(document, expected_version=None):
+    """
+    Locks ``document`` until the end of current transaction.
+
+    Returns last version of the document. If ``expected_version``
+    is given and does not match last version's number,
+    ``VersionConflict`` is raised.
+    """
+    document.lock()
+    last_version = document.versions.last()
+    if expected_version is not None:
+        if last_version.number != expected_version:
+            raise VersionConflict(
+                detail=f'Expected document version {expected_version},'
+                f' current document version is {last_version.number}'
+            )
+
+    return last_version
+
+
+def pages_document(page_ids):
+    """
+    Returns document of pages ``page_ids``.
+
+    Document is read without lock, pages must be read (again) once
+    the document is locked.
+    """
+    document = Document.objects.filter(
+        versions__pages__pk__in=page_ids
+    ).first()
+    if document is None:
+        raise APIBadRequest(detail='Page not found')
+
+    return document
+
+
+def lock_pages(page_ids, expected_version=None):
+    """
+    Locks document of pages ``page_ids`` until the end of current
+    transaction. Returns (pages, last version of the document) tuple;
+    pages are read once the lock is held, thus their numbers and
+    versions are not stale.
+
+    See ``lock_document`` for ``expected_version``.
+    """
+    last_version = lock_document(
+        pages_document(page_ids),
+        expected_version=expected_version
+    )
+
+    return Page.objects.filter(pk__in=page_ids), last_version
+
+
+def check_last_version(version, last_version):
+    """
+    ``version`` must (still) be the last version of the document,
+    otherwise ``VersionConflict`` is raised.
+    """
+    if version.pk != last_version.pk:
+        raise VersionConflict()
+
+
+@page_operation
+def delete_pages(user, data, progress=None):
+    progress = progress or _no_progress
+    pages_to_delete, _ = lock_pages(
+        data['pages'],
+        data.get('expected_version')
+    )
+
+    first_page = pages_to_delete.first()
+
+    for page in pages_to_delete:
+        if page.is_archived:
+            raise APIBadRequest(
+                detail='Deleting archived page is not allowed'
+            )
+
+    old_version = first_page.document_version
+
+    count = old_version.pages.count()
+    if count <= pages_to_delete.count():
+        raise APIBadRequest(
+            detail='Document version must have at least one page'
+        )
+
+    doc = old_version.document
+    new_version = _version_bump(
+        doc,
+        page_count=old_version.page_count - pages_to_delete.count()
+    )
+    progress(STAGE_VERSION_BUMP)
+
+    remove_pdf_pages(
+        old_version=old_version,
+        new_version=new_version,
+        page_numbers=[page.number for page in pages_to_delete]
+    )
+    progress(STAGE_PDF)
+
+    page_recycle_map = PageRecycleMap(
+        total=old_version.page_count,
+        deleted=[item.number for item in pages_to_delete]
+    )
+
+    page_map = list(page_recycle_map)
+
+    reuse_ocr_data(
+        old_version=old_version,
+        new_version=new_version,
+        page_map=page_map
+    )
+    progress(STAGE_OCR_DATA)
+
+    reuse_text_field(
+        old_version=old_version,
+        new_version=new_version,
+        page_map=page_map
+    )
+    progress(STAGE_TEXT)
+
+    _send_on_commit(
+        page_delete,
+        document_version=new_version
+    )
+
+    return [new_version]
+
+
+@page_operation
+def reorder_pages(user, data, progress=None):
+    progress = progress or _no_progress
+    pages_data = data['pages']
+    pages, last_version = lock_pages(
+        [item['id'] for item in pages_data],
+        data.get('expected_version')
+    )
+    old_version = pages.first().document_version
+    check_last_version(old_version, last_version)
+
+    doc = old_version.document
+    new_version = _version_bump(
+        doc,
+        page_count=old_version.page_count
+    )
+    progress(STAGE_VERSION_BUMP)
+
+    page_count = old_version.pages.count()
+
+    reorder_pdf_pages(
+        old_version=old_version,
+        new_version=new_version,
+        pages_data=pages_data,
+        page_count=page_count
+    )
+    progress(STAGE_PDF)
+
+    reordered_list = get_reordered_list(
+        pages_data=pages_data,
+        page_count=page_count
+    )
+
+    reuse_ocr_data(
+        old_version=old_version,
+        new_version=new_version,
+        page_map=list(
+            zip(reordered_list, range(1, page_count + 1))
+        )
+    )
+    progress(STAGE_OCR_DATA)
+
+    reuse_text_field(
+        old_version=old_version,
+        new_version=new_version,
+        page_map=list(
+            zip(range(1, page_count + 1), reordered_list)
+        )
+    )
+    progress(STAGE_TEXT)
+
+    _send_on_commit(
+        page_reorder,
+        document_version=new_version
+    )
+
+    return [new_version]
+
+
+@page_operation
+def rotate_pages(user, data, progress=None):
+    progress = progress or _no_progress
+    pages_data = data['pages']
+    pages, last_version = lock_pages(
+        [item['id'] for item in pages_data],
+        data.get('expected_version')
+    )
+    old_version = pages.first().document_version
+    check_last_version(old_version, last_version)
+
+    doc = old_version.document
+    new_version = _version_bump(doc)
+    progress(STAGE_VERSION_BUMP)
+
+    pages_data = annotate_page_data(pages, pages_data, 'angle')
+
+    rotate_pdf_pages(
+        old_version=old_version,
+        new_version=new_version,
+        pages_data=pages_data
+    )
+    progress(STAGE_PDF)
+
+    reuse_ocr_data_after_rotate(
+        old_version=old_version,
+        new_version=new_version,
+        pages_data=pages_data
+    )
+    progress(STAGE_OCR_DATA)
+
+    # page mapping is 1 to 1 as rotation does not
+    # add/remove any page
+    page_map = [
+        (page.number, page.number)
+        for page in old_version.pages.all()
+    ]
+
+    reuse_text_field(
+        old_version=old_version,
+        new_version=new_version,
+        page_map=page_map
+    )
+    progress(STAGE_TEXT)
+
+    _send_on_commit(
+        page_rotate,
+        document_version=new_version
+    )
+
+    return [new_version]
+
+
+@page_operation
+def edit_pages(user, data, progress=None):
+    progress = progress or _no_progress
+    operations = data['operations']
+    page_ids = {
+        str(page_id)
+        for operation in operations
+        for page_id in operation['pages']
+    }
+    # pages are read once their document is locked
+    lock_document(
+        pages_document(page_ids),
+        expected_version=data.get('expected_version')
+    )
+    pages = list(
+        Page.objects.select_related('document_version').filter(
+            pk__in=page_ids,
+            document_version__document__user=user
+        )
+    )
+    if len(pages) != len(page_ids):
+        raise APIBadRequest(detail='Page not found')
+
+    old_version = pages[0].document_version
+    for page in pages:
+        if page.document_version_id != old_version.pk:
+            raise APIBadRequest(
+                detail='All pages must belong to same document version'
+            )
+
+    if old_version.is_archived:
+        raise APIBadRequest(detail='Editing archived page is not allowed')
+
+    numbers = {str(page.pk): page.number for page in pages}
+    page_edit_map = PageEditMap(total=old_version.page_count)
+    try:
+        for operation in operations:
+            old_numbers = [
+                numbers[str(page_id)] for page_id in operation['pages']
+            ]
+            if operation['op'] == PAGE_EDIT_DELETE:
+                page_edit_map.delete(old_numbers)
+            elif operation['op'] == PAGE_EDIT_ROTATE:
+                page_edit_map.rotate(old_numbers, operation['angle'])
+            elif operation['op'] == PAGE_EDIT_REORDER:
+                page_edit_map.reorder(old_numbers)
+    except ValueError as exc:
+        raise APIBadRequest(detail=str(exc))
+
+    if len(page_edit_map) == 0:
+        raise APIBadRequest(
+            detail='Document version must have at least one page'
+        )
+
+    doc = old_version.document
+    new_version = _version_bump(doc, page_count=len(page_edit_map))
+    progress(STAGE_VERSION_BUMP)
+
+    edit_pdf_pages(
+        old_version=old_version,
+        new_version=new_version,
+        page_edit_map=page_edit_map
+    )
+    progress(STAGE_PDF)
+
+    page_map = page_edit_map.page_map
+
+    reuse_ocr_data(
+        old_version=old_version,
+        new_version=new_version,
+        page_map=page_map
+    )
+    rotate_page_images(
+        version=new_version,
+        pages_data=page_edit_map.rotated
+    )
+    progress(STAGE_OCR_DATA)
+
+    reuse_text_field(
+        old_version=old_version,
+        new_version=new_version,
+        page_map=page_map
+    )
+    progress(STAGE_TEXT)
+
+    _send_on_commit(
+        page_edit,
+        document_version=new_version
+    )
+
+    return [new_version]
+
+
+@page_operation
+def move_to_folder(user, data, progress=None):
+    """
+    Moves/extracts one or multiple pages into target folder.
+
+    Depending on ``data['single_page']`` either each page is placed into
+    newly created single page document or all pages are placed inside
+    one newly created document.
+    """
+    progress = progress or _no_progress
+    dst_folder = Folder.objects.get(
+        pk=data['dst'],
+        user=user
+    )
+    pages, src_last_version = lock_pages(
+        data['pages'],
+        data.get('expected_version')
+    )
+    first_page = pages.first()
+
+    src_old_version = first_page.document_version
+    check_last_version(src_old_version, src_last_version)
+
+    if src_old_version.pages.count() <= 1:
+        raise APIBadRequest(
+            "Extracting last page of document is not allowed"
+        )
+
+    doc = src_old_version.document
+    src_new_version = _version_bump(
+        doc,
+        src_old_version.pages.count() - pages.count()
+    )
+    progress(STAGE_VERSION_BUMP)
+
+    remove_pdf_pages(
+        old_version=src_old_version,
+        new_version=src_new_version,
+        page_numbers=[page.number for page in pages]
+    )
+    progress(STAGE_PDF)
+
+    page_recycle_map = PageRecycleMap(
+        total=src_old_version.page_count,
+        deleted=[item.number for item in pages]
+    )
+
+    page_map = list(page_recycle_map)
+
+    reuse_ocr_data(
+        old_version=src_old_version,
+        new_version=src_new_version,
+        page_map=page_map
+    )
+    progress(STAGE_OCR_DATA)
+    reuse_text_field(
+        old_version=src_old_version,
+        new_version=src_new_version,
+        page_map=page_map
+    )
+    progress(STAGE_TEXT)
+
+    if data['single_page']:
+        # insert all pages in one single document
+        dst_versions = _move_to_folder_single_paged(
+            pages=pages,
+            dst_folder=dst_folder,
+            title_format=data.get('title_format', None)
+        )
+    else:
+        # there will be one document for each page
+        dst_versions = _move_to_folder_multi_paged(
+            pages=pages,
+            first_page=first_page,
+            dst_folder=dst_folder,
+            title_format=data.get('title_format', None)
+        )
+    progress(STAGE_DOCUMENTS)
+
+    _send_on_commit(
+        page_move_to_folder,
+        document_version=src_new_version
+    )
+
+    return [src_new_version, *dst_versions]
+
+
+def _move_to_folder_multi_paged(
+        pages,
+        first_page,
+        dst_folder,
+        title_format=None
+):
+    """All extracted pages are inserted into one document"""
+    if title_format is None:
+        title = f'document-{str(uuid4())}.pdf'
+    else:
+        title = f'{title_format}.pdf'
+
+    new_doc = Document.objects.create_document(
+        title=title,
+        lang=first_page.lang,
+        user_id=dst_folder.user_id,
+        parent=dst_folder,
+        ocr_status=OCR_STATUS_SUCCEEDED
+    )
+    # create new document version which
+    # will contain mentioned pages
+    dst_version = new_doc.version_bump_from_pages(pages=pages)
+    _created(dst_version)
+    page_map = zip(
+        range(1, pages.count() + 1),
+        [page.number for page in pages.order_by('number')]
+    )
+    for src_page, dst_page in zip(
+        pages.order_by('number'),
+        dst_version.pages.order_by('number'),
+    ):
+        get_storage_instance().copy_page(
+            src=src_page.page_path,
+            dst=dst_page.page_path
+        )
+    reuse_text_field(
+        old_version=first_page.document_version,
+        new_version=dst_version,
+        page_map=page_map
+    )
+
+    _send_on_commit(
+        page_move_to_folder,
+        document_version=dst_version
+    )
+
+    return [dst_version]
+
+
+def _move_to_folder_single_paged(
+        pages,
+        dst_folder,
+        title_format=None
+):
+    """Each extracted page is inserted into a separate document"""
+
+    pages = list(
+        pages.select_related('document_version__document__user')
+    )
+    items = []
+    for page in pages:
+        if title_format is None:
+            title = f'page-{str(uuid4())}.pdf'
+        else:
+            if len(pages) > 1:
+                title = f'{title_format}-{str(uuid4())}.pdf'
+            else:
+                title = f'{title_format}.pdf'
+
+        items.append((title, [page]))
+
+    # all documents are created at once, source PDF is read once
+    doc_versions = Document.objects.bulk_create_from_pages(
+        items,
+        parent=dst_folder,
+        ocr_status=OCR_STATUS_SUCCEEDED
+    )
+    _created(*doc_versions)
+
+    _send_on_commit(
+        page_move_to_folder_batch,
+        document_versions=doc_versions
+    )
+
+    return doc_versions
+
+
+@page_operation
+def move_to_document(user, data, progress=None):
+    """
+    Moves one or multiple pages from source document to target document.
+
+    With ``data['merge']`` set, target document version is created ONLY
+    from source pages.
+    """
+    if data.get('merge', False):
+        return _merge_to_document(user, data, progress or _no_progress)
+
+    return _move_to_document(user, data, progress or _no_progress)
+
+
+def _lock_source_and_destination(src_document, dst_document, data):
+    """
+    Locks source and destination documents; returns last versions
+    of source and destination documents.
+
+    Documents are locked in order of their IDs, so that two operations
+    moving pages between the same two documents in opposite directions
+    do not deadlock.
+    """
+    items = sorted(
+        [
+            (src_document, data.get('expected_version')),
+            (dst_document, data.get('dst_expected_version'))
+        ],
+        key=lambda item: str(item[0].pk)
+    )
+    last_versions = {
+        document.pk: lock_document(document, expected_version)
+        for document, expected_version in items
+    }
+    return last_versions[src_document.pk], last_versions[dst_document.pk]
+
+
+def _merge_to_document(user, data, progress):
+    """Merge creates target document version ONLY from source pages
+
+    There is a total merge and partial merge.
+    Total merge is when ALL pages of the source are involved. During total
+    merge source document is deleted.
+    When not all pages are involved in the merge - we say it is a partial
+    merge. During partial merge source documents is NOT deleted.
+    """
+    dst_document = Document.objects.get(
+        pk=data['dst'],
+        user=user
+    )
+    src_last_version, _ = _lock_source_and_destination(
+        pages_document(data['pages']),
+        dst_document,
+        data
+    )
+    # pages are read once their document is locked
+    pages = Page.objects.filter(
+        pk__in=data['pages']
+    )
+    src_old_version = pages.first().document_version
+    check_last_version(src_old_version, src_last_version)
+    doc = src_old_version.document
+    pages_count = pages.count()
+
+    if src_old_version.pages.count() == pages_count:
+        # destination new version will have same
+        # number of pages as source document count
+        dst_new_version = _version_bump(
+            dst_document,
+            page_count=pages_count,
+            short_description=f'{pages_count} page(s) merged in'
+        )
+        progress(STAGE_VERSION_BUMP)
+        total_merge(
+            src_old_version=src_old_version,
+            dst_new_version=dst_new_version
+        )
+        progress(STAGE_PDF)
+        _send_on_commit(
+            page_move_to_document,
+            document_version=dst_new_version
+        )
+
+        return [dst_new_version]
+
+    src_new_version = _version_bump(
+        doc,
+        page_count=src_old_version.pages.count() - pages_count,
+        short_description=f'{pages_count} page(s) merged out'
+    )
+    dst_new_version = _version_bump(
+        dst_document,
+        page_count=pages_count,
+        short_description=f'{pages_count} page(s) merged in'
+    )
+    progress(STAGE_VERSION_BUMP)
+    partial_merge(
+        src_old_version=src_old_version,
+        src_new_version=src_new_version,
+        dst_new_version=dst_new_version,
+        page_numbers=[p.number for p in pages.order_by('number')]
+    )
+    progress(STAGE_PDF)
+    _send_on_commit(
+        page_move_to_document,
+        document_version=src_new_version
+    )
+    _send_on_commit(
+        page_move_to_document,
+        document_version=dst_new_version
+    )
+
+    return [src_new_version, dst_new_version]
+
+
+def _move_to_document(user, data, progress):
+    dst_document = Document.objects.get(
+        pk=data['dst'],
+        user=user
+    )
+    src_last_version, dst_old_version = _lock_source_and_destination(
+        pages_document(data['pages']),
+        dst_document,
+        data
+    )
+    # pages are read once their document is locked
+    pages = Page.objects.filter(
+        pk__in=data['pages']
+    )
+    src_old_version = pages.first().document_version
+    check_last_version(src_old_version, src_last_version)
+    pages_count = pages.count()
+    position = data['position']
+    if position < 0:
+        position = dst_old_version.pages.count()
+
+    doc = src_old_version.document
+    src_new_version = _version_bump(
+        doc,
+        page_count=src_old_version.pages.count() - pages_count,
+        short_description=f'{pages_count} page(s) moved out'
+    )
+    dst_new_version = _version_bump(
+        dst_document,
+        page_count=dst_old_version.pages.count() + pages_count,
+        short_description=f'{pages_count} page(s) moved in'
+    )
+    progress(STAGE_VERSION_BUMP)
+
+    remove_pdf_pages(
+        old_version=src_old_version,
+        new_version=src_new_version,
+        page_numbers=[page.number for page in pages]
+    )
+
+    page_recycle_map = PageRecycleMap(
+        total=src_old_version.page_count,
+        deleted=[item.number for item in pages]
+    )
+
+    page_map = list(page_recycle_map)
+
+    reuse_ocr_data(
+        old_version=src_old_version,
+        new_version=src_new_version,
+        page_map=page_map
+    )
+
+    reuse_text_field(
+        old_version=src_old_version,
+        new_version=src_new_version,
+        page_map=page_map
+    )
+
+    insert_pdf_pages(
+        src_old_version=src_old_version,
+        dst_old_version=dst_old_version,
+        dst_new_version=dst_new_version,
+        src_page_numbers=[p.number for p in pages.order_by('number')],
+        dst_position=position
+    )
+    progress(STAGE_PDF)
+
+    reuse_ocr_data_multi(
+        src_old_version=src_old_version,
+        dst_old_version=dst_old_version,
+        dst_new_version=dst_new_version,
+        position=position,
+        page_numbers=[page.number for page in pages]
+    )
+    progress(STAGE_OCR_DATA)
+
+    reuse_text_field_multi(
+        src_old_version=src_old_version,
+        dst_old_version=dst_old_version,
+        dst_new_version=dst_new_version,
+        position=position,
+        page_numbers=[page.number for page in pages]
+    )
+    progress(STAGE_TEXT)
+
+    _send_on_commit(
+        page_move_to_document,
+        document_version=src_new_version
+    )
+
+    _send_on_commit(
+        page_move_to_document,
+        document_version=dst_new_version
+    )
+
+    return [src_new_version, dst_new_version]
+
+
+PAGE_OPERATIONS = {
+    PAGE_OPERATION_DELETE: delete_pages,
+    PAGE_OPERATION_REORDER: reorder_pages,
+    PAGE_OPERATION_ROTATE: rotate_pages,
+    PAGE_OPERATION_EDIT: edit_pages,
+    PAGE_OPERATION_MOVE_TO_FOLDER: move_to_folder,
+    PAGE_OPERATION_MOVE_TO_DOCUMENT: move_to_document,
+}
+
+
+def run_page_operation(name, user, data, progress=None):
+    """Runs page operation ``name``, returns new document versions"""
+    if name not in PAGE_OPERATIONS:
+        raise ValueError(f"Unknown page operation {name}")
+
+    logger.debug(f"run_page_operation: name={name} user_id={user.pk}")
+
+    return PAGE_OPERATIONS[name](user, data, progress=progress)
@@ -1,4 +1,6 @@
+import hashlib
 import logging
+import os
 from uuid import uuid4
 
 from django.http import Http404
@@ -14,21 +16,20 @@ from rest_framework.response import Response
 from rest_framework_json_api.renderers import JSONRenderer
 from rest_framework.parsers import JSONParser
 
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 
-from papermerge.core.models import Page, Document, Folder
-from papermerge.core.lib.utils import (
-    get_reordered_list,
-    annotate_page_data
-)
+from papermerge.core.app_settings import settings
+from papermerge.core.lib.preview import PREVIEW_WIDTH
+from papermerge.core.file_response import file_response
+from papermerge.core.models import Page
 from papermerge.core.utils import clock
-
-from papermerge.core.storage import get_storage_instance
+from papermerge.core.tasks import page_operation_task
 from papermerge.core.serializers import (
     PageSerializer,
     PageDeleteSerializer,
     PagesReorderSerializer,
     PagesRotateSerializer,
+    PagesEditSerializer,
     PagesMoveToDocumentSerializer,
     PagesMoveToFolderSerializer
 )
@@ -38,42 +39,26 @@ from papermerge.core.renderers import (
     ImageSVGRenderer
 )
 from papermerge.core.exceptions import APIBadRequest
-from papermerge.core.signal_definitions import (
-    page_move_to_folder,
-    page_move_to_document,
-    page_rotate,
-    page_delete,
-    page_reorder
-)
-from .mixins import RequireAuthMixin
-from .utils import (
-    remove_pdf_pages,
-    insert_pdf_pages,
-    total_merge,
-    partial_merge,
-    reuse_ocr_data,
-    reuse_ocr_data_multi,
-    reuse_text_field,
-    reuse_text_field_multi,
-    reorder_pdf_pages,
-    rotate_pdf_pages,
-    PageRecycleMap
+from papermerge.core.storage import abs_path
+from .mixins import ConditionalGetMixin, RequireAuthMixin, content_etag
+from .page_operations import (
+    run_page_operation,
+    PAGE_OPERATION_DELETE,
+    PAGE_OPERATION_REORDER,
+    PAGE_OPERATION_ROTATE,
+    PAGE_OPERATION_EDIT,
+    PAGE_OPERATION_MOVE_TO_FOLDER,
+    PAGE_OPERATION_MOVE_TO_DOCUMENT
 )
-from ..models.utils import OCR_STATUS_SUCCEEDED
-
 logger = logging.getLogger(__name__)
 
 
-def reuse_ocr_data_after_rotate(
-    old_version,
-    new_version,
-    pages_data,
-    pages_count
+class PageView(
+    RequireAuthMixin,
+    ConditionalGetMixin,
+    RetrieveAPIView,
+    DestroyAPIView
 ):
-    pass
-
-
-class PageView(RequireAuthMixin, RetrieveAPIView, DestroyAPIView):
     serializer_class = PageSerializer
     renderer_classes = [
         PlainTextRenderer,
@@ -93,7 +78,20 @@ class PageView(RequireAuthMixin, RetrieveAPIView, DestroyAPIView):
             document_version__document__user=self.request.user
         )
 
-    @extend_schema(operation_id="Retrieve")
+    @extend_schema(
+        operation_id="Retrieve",
+        parameters=[
+            OpenApiParameter(
+                name='size',
+                description=(
+                    "Width of jpeg image (one of PREVIEW_SIZES setting,"
+                    " by default 150, 300, 900 or 1800)"
+                ),
+                required=False,
+                type=int,
+            ),
+        ]
+    )
     def get(self, request, *args, **kwargs):
         """
         Retrieves page resource
@@ -108,37 +106,51 @@ class PageView(RequireAuthMixin, RetrieveAPIView, DestroyAPIView):
         logger.debug(f"Retrieving page ID={instance.id}")
         # as plain text
         if request.accepted_renderer.format == 'txt':
-            data = instance.text
-            return Response(data)
+            return self.text_response(instance)
 
         # as html
         if request.accepted_renderer.format in ('html', 'jpeg', 'jpg'):
             logger.debug(f"Page ID={instance.id} requested as html/jpeg/jpg")
-            try:
-                jpeg_data = instance.get_jpeg()
-            except IOError as exc:
-                logger.error(exc)
-                raise Http404("Jpeg image not available")
-            return Response(jpeg_data)
+            size = self.get_preview_size()
+
+            def get_jpeg_path():
+                try:
+                    return instance.get_jpeg_path(size=size)
+                except IOError as exc:
+                    logger.error(exc)
+                    raise Http404("Jpeg image not available")
+
+            return self.file_content_response(
+                instance,
+                f'jpeg-{size or PREVIEW_WIDTH}',
+                get_jpeg_path,
+                content_type='image/jpeg'
+            )
 
         # as svg (which includes embedded jpeg and HOCRed text overlay)
         if request.accepted_renderer.format == 'svg':
             logger.debug(f"Page ID={instance.id} requested svg")
-            content_type = 'image/svg+xml'
-            try:
-                data = instance.get_svg()
-            except IOError:
-                # svg not available, try jpeg
+            if os.path.exists(abs_path(instance.page_path.svg_url)):
+                return self.file_content_response(
+                    instance,
+                    'svg',
+                    instance.get_svg_path,
+                    content_type='image/svg+xml'
+                )
+
+            # svg not available, try jpeg
+            def get_jpeg_path():
                 try:
-                    data = instance.get_jpeg()
-                    content_type = 'image/jpeg'
+                    return instance.get_jpeg_path()
                 except IOError as exc:
                     logger.error(exc)
                     raise Http404("Neither JPEG nor SVG image not available")
-            return Response(
-                data,
-                # either image/jpeg or image/svg+xml
-                content_type=content_type
+
+            return self.file_content_response(
+                instance,
+                f'jpeg-{PREVIEW_WIDTH}',
+                get_jpeg_path,
+                content_type='image/jpeg'
             )
 
         # by default render page with json serializer
@@ -147,6 +159,89 @@ class PageView(RequireAuthMixin, RetrieveAPIView, DestroyAPIView):
 
         return Response(serializer.data)
 
+    def text_response(self, page):
+        """
+        Returns response with page's text, or 304 if client's copy
+        is current.
+        """
+        immutable = page.is_archived
+        etag = content_etag(
+            page.document_version_id,
+            page.number,
+            'txt',
+            hashlib.sha1(page.text.encode('utf-8')).hexdigest()
+        )
+        not_modified = self.not_modified(etag, immutable)
+        if not_modified is not None:
+            return not_modified
+
+        return self.patch_cache_headers(
+            Response(page.text), etag, immutable
+        )
+
+    def file_content_response(self, page, artifact, get_path, content_type):
+        """
+        Returns response with content of page's ``artifact`` file (e.g.
+        'svg') whose path is returned by ``get_path``, or 304 if client's
+        copy is current. File is not read by web worker (see
+        ``papermerge.core.file_response``).
+
+        Pages of archived versions never change, thus their ETag is
+        derived from version id, page number and artifact and 304 is
+        returned without looking for the file. ETag of pages of last
+        version also includes file's size and modification time.
+        """
+        immutable = page.is_archived
+        etag_parts = [page.document_version_id, page.number, artifact]
+
+        if immutable:
+            etag = content_etag(*etag_parts)
+            not_modified = self.not_modified(etag, immutable)
+            if not_modified is not None:
+                return not_modified
+            path = get_path()
+        else:
+            path = get_path()
+            stat = os.stat(path)
+            etag = content_etag(*etag_parts, stat.st_size, stat.st_mtime_ns)
+            not_modified = self.not_modified(etag, immutable)
+            if not_modified is not None:
+                return not_modified
+
+        try:
+            response = file_response(path, content_type=content_type)
+        except OSError as exc:
+            logger.error(exc)
+            raise Http404("Image not available")
+
+        return self.patch_cache_headers(response, etag, immutable)
+
+    def get_preview_size(self):
+        value = self.request.query_params.get('size', None)
+        if value is None:
+            return None
+
+        try:
+            size = int(value)
+        except ValueError:
+            raise APIBadRequest(detail='size must be an integer')
+
+        if size not in settings.PREVIEW_SIZES:
+            sizes = ', '.join(str(item) for item in settings.PREVIEW_SIZES)
+            raise APIBadRequest(detail=f'size must be one of {sizes}')
+
+        return size
+
+    def get_expected_version(self):
+        value = self.request.query_params.get('expected_version', None)
+        if value is None:
+            return None
+
+        try:
+            return int(value)
+        except ValueError:
+            raise APIBadRequest(detail='expected_version must be an integer')
+
     @extend_schema(operation_id="Single page delete")
     def delete(self, request, *args, **kwargs):
         """
@@ -158,52 +253,69 @@ class PageView(RequireAuthMixin, RetrieveAPIView, DestroyAPIView):
         """
         Creates a new document version and copies
         all existing pages to it except current page.
-        """
-        if instance.is_archived:
-            raise APIBadRequest(detail='Deleting archived page is not allowed')
-
-        pages_to_delete = Page.objects.filter(pk__in=[instance.pk])
-        old_version = instance.document_version
-        doc = instance.document_version.document
-
-        # create new version models i.e. DocumentVersion with Page(s)
-        new_version = doc.version_bump(
-            page_count=old_version.page_count - 1
-        )
-
-        remove_pdf_pages(
-            old_version=old_version,
-            new_version=new_version,
-            page_numbers=[page.number for page in pages_to_delete]
-        )
-
-        page_recycle_map = PageRecycleMap(
-            total=old_version.page_count,
-            deleted=[item.number for item in pages_to_delete]
-        )
 
-        page_map = list(page_recycle_map)
-
-        reuse_ocr_data(
-            old_version=old_version,
-            new_version=new_version,
-            page_map=page_map
-        )
+        Optional ``expected_version`` query parameter has same meaning
+        as in other page operations.
+        """
+        run_page_operation(
+            name=PAGE_OPERATION_DELETE,
+            user=self.request.user,
+            data={
+                'pages': [instance.pk],
+                'expected_version': self.get_expected_version()
+            }
+        )
+
+
+class PageOperationMixin:
+    """
+    Runs page operation either inside HTTP request or in background.
+
+    By default page operation runs synchronously and view responds
+    with 204 No Content. When requested with ``async=true`` query parameter
+    operation is queued as ``page_operation_task`` and view responds
+    right away with 202 Accepted and the ``operation_id``; progress and
+    completion of the operation is reported via ``ws/page-operations/``
+    websocket.
+    """
+    operation = None
+
+    @property
+    def asks_for_async(self):
+        value = self.request.query_params.get('async', '')
+        return value.lower() in ('1', 'true', 'yes')
+
+    def run_operation(self, data):
+        if self.asks_for_async:
+            operation_id = str(uuid4())
+            page_operation_task.apply_async(
+                kwargs={
+                    'operation_id': operation_id,
+                    'operation': self.operation,
+                    'user_id': str(self.request.user.id),
+                    'data': data
+                },
+                task_id=operation_id
+            )
+            return Response(
+                data={'operation_id': operation_id},
+                status=status.HTTP_202_ACCEPTED
+            )
 
-        reuse_text_field(
-            old_version=old_version,
-            new_version=new_version,
-            page_map=page_map
+        run_page_operation(
+            name=self.operation,
+            user=self.request.user,
+            data=data
         )
-
-        page_delete.send(
-            sender=Page,
-            document_version=new_version
+        return Response(
+            data=data,
+            status=status.HTTP_204_NO_CONTENT
         )
 
 
-class PagesView(RequireAuthMixin, GenericAPIView):
+class PagesView(RequireAuthMixin, PageOperationMixin, GenericAPIView):
     serializer_class = PageDeleteSerializer
+    operation = PAGE_OPERATION_DELETE
 
     @extend_schema(operation_id="Multiple pages delete")
     def delete(self, request):
@@ -211,76 +323,19 @@ class PagesView(RequireAuthMixin, GenericAPIView):
 
         if serializer.is_valid():
             # delete nodes with specified IDs
-            self.delete_pages(page_ids=serializer.data['pages'])
-            return Response(
-                data=serializer.data,
-                status=status.HTTP_204_NO_CONTENT
-            )
+            return self.run_operation(serializer.data)
 
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    def delete_pages(self, page_ids):
-        pages_to_delete = Page.objects.filter(pk__in=page_ids)
-
-        first_page = pages_to_delete.first()
 
-        for page in pages_to_delete:
-            if page.is_archived:
-                raise APIBadRequest(
-                    detail='Deleting archived page is not allowed'
-                )
-
-        old_version = first_page.document_version
-
-        count = old_version.pages.count()
-        if count <= pages_to_delete.count():
-            raise APIBadRequest(
-                detail='Document version must have at least one page'
-            )
-
-        doc = old_version.document
-        new_version = doc.version_bump(
-            page_count=old_version.page_count - pages_to_delete.count()
-        )
-
-        remove_pdf_pages(
-            old_version=old_version,
-            new_version=new_version,
-            page_numbers=[page.number for page in pages_to_delete]
-        )
-
-        page_recycle_map = PageRecycleMap(
-            total=old_version.page_count,
-            deleted=[item.number for item in pages_to_delete]
-        )
-
-        page_map = list(page_recycle_map)
-
-        reuse_ocr_data(
-            old_version=old_version,
-            new_version=new_version,
-            page_map=page_map
-        )
-
-        reuse_text_field(
-            old_version=old_version,
-            new_version=new_version,
-            page_map=page_map
-        )
-
-        page_delete.send(
-            sender=Page,
-            document_version=new_version
-        )
-
-
-class PagesReorderView(RequireAuthMixin, GenericAPIView):
+class PagesReorderView(RequireAuthMixin, PageOperationMixin, GenericAPIView):
     parser_classes = [JSONParser]
     renderer_classes = (JSONRenderer,)
     serializer_class = PagesReorderSerializer
+    operation = PAGE_OPERATION_REORDER
 
     @extend_schema(operation_id="Reorder")
     def post(self, request):
@@ -290,66 +345,16 @@ class PagesReorderView(RequireAuthMixin, GenericAPIView):
         serializer = self.serializer_class(data=request.data)
 
         if serializer.is_valid():
-            # delete nodes with specified IDs
-            self.reorder_pages(pages_data=serializer.data['pages'])
-            return Response(
-                data=serializer.data,
-                status=status.HTTP_204_NO_CONTENT
-            )
+            return self.run_operation(serializer.data)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def reorder_pages(self, pages_data):
-        pages = Page.objects.filter(
-            pk__in=[item['id'] for item in pages_data]
-        )
-        old_version = pages.first().document_version
-
-        doc = old_version.document
-        new_version = doc.version_bump(
-            page_count=old_version.page_count
-        )
-
-        page_count = old_version.pages.count()
-
-        reorder_pdf_pages(
-            old_version=old_version,
-            new_version=new_version,
-            pages_data=pages_data,
-            page_count=page_count
-        )
-
-        reordered_list = get_reordered_list(
-            pages_data=pages_data,
-            page_count=page_count
-        )
-
-        reuse_ocr_data(
-            old_version=old_version,
-            new_version=new_version,
-            page_map=list(
-                zip(reordered_list, range(1, page_count + 1))
-            )
-        )
 
-        reuse_text_field(
-            old_version=old_version,
-            new_version=new_version,
-            page_map=list(
-                zip(range(1, page_count + 1), reordered_list)
-            )
-        )
-
-        page_reorder.send(
-            sender=Page,
-            document_version=new_version
-        )
-
-
-class PagesRotateView(RequireAuthMixin, GenericAPIView):
+class PagesRotateView(RequireAuthMixin, PageOperationMixin, GenericAPIView):
     parser_classes = [JSONParser]
     renderer_classes = (JSONRenderer,)
     serializer_class = PagesRotateSerializer
+    operation = PAGE_OPERATION_ROTATE
 
     @extend_schema(operation_id="Rotate")
     def post(self, request):
@@ -359,54 +364,44 @@ class PagesRotateView(RequireAuthMixin, GenericAPIView):
         serializer = self.serializer_class(data=request.data)
 
         if serializer.is_valid():
-            # delete nodes with specified IDs
-            self.rotate_pages(pages_data=serializer.data['pages'])
-            return Response(
-                data=serializer.data,
-                status=status.HTTP_204_NO_CONTENT
-            )
+            return self.run_operation(serializer.data)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def rotate_pages(self, pages_data):
-        pages = Page.objects.filter(
-            pk__in=[item['id'] for item in pages_data]
-        )
-        old_version = pages.first().document_version
-
-        doc = old_version.document
-        new_version = doc.version_bump()
 
-        rotate_pdf_pages(
-            old_version=old_version,
-            new_version=new_version,
-            pages_data=annotate_page_data(pages, pages_data, 'angle')
-        )
+class PagesEditView(RequireAuthMixin, PageOperationMixin, GenericAPIView):
+    parser_classes = [JSONParser]
+    renderer_classes = (JSONRenderer,)
+    serializer_class = PagesEditSerializer
+    operation = PAGE_OPERATION_EDIT
 
-        new_version.generate_previews()
+    @extend_schema(operation_id="Edit")
+    def post(self, request):
+        """
+        Applies an ordered list of page operations (delete, rotate,
+        reorder) at once.
 
-        # page mapping is 1 to 1 as rotation does not
-        # add/remove any page
-        page_map = [
-            (page.number, page.number)
-            for page in old_version.pages.all()
-        ]
+        All operations are composed into one page map, which means that
+        only one new document version is created (PDF file is
+        written once, OCR data is reused once).
+        Pages are referenced by their IDs in the current document version.
+        """
+        serializer = self.serializer_class(data=request.data)
 
-        reuse_text_field(
-            old_version=old_version,
-            new_version=new_version,
-            page_map=page_map
-        )
+        if serializer.is_valid():
+            return self.run_operation(serializer.data)
 
-        page_rotate.send(
-            sender=Page,
-            document_version=new_version
-        )
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PagesMoveToFolderView(RequireAuthMixin, GenericAPIView):
+class PagesMoveToFolderView(
+    RequireAuthMixin,
+    PageOperationMixin,
+    GenericAPIView
+):
     serializer_class = PagesMoveToFolderSerializer
     renderer_classes = (JSONRenderer,)
+    operation = PAGE_OPERATION_MOVE_TO_FOLDER
 
     @extend_schema(operation_id="Move to folder")
     def post(self, request):
@@ -422,171 +417,19 @@ class PagesMoveToFolderView(RequireAuthMixin, GenericAPIView):
         serializer = self.serializer_class(data=request.data)
 
         if serializer.is_valid():
-            self.move_to_folder(serializer.data)
-            return Response(
-                data=serializer.data,
-                status=status.HTTP_204_NO_CONTENT
-            )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-    def move_to_folder(self, data):
-        pages = Page.objects.filter(pk__in=data['pages'])
-        dst_folder = Folder.objects.get(
-            pk=data['dst'],
-            user=self.request.user
-        )
-        first_page = pages.first()
-
-        src_old_version = first_page.document_version
-
-        if src_old_version.pages.count() <= 1:
-            raise APIBadRequest(
-                "Extracting last page of document is not allowed"
-            )
-
-        doc = src_old_version.document
-        src_new_version = doc.version_bump(
-            src_old_version.pages.count() - pages.count()
-        )
-
-        remove_pdf_pages(
-            old_version=src_old_version,
-            new_version=src_new_version,
-            page_numbers=[page.number for page in pages]
-        )
-
-        page_recycle_map = PageRecycleMap(
-            total=src_old_version.page_count,
-            deleted=[item.number for item in pages]
-        )
-
-        page_map = list(page_recycle_map)
-
-        reuse_ocr_data(
-            old_version=src_old_version,
-            new_version=src_new_version,
-            page_map=page_map
-        )
-        reuse_text_field(
-            old_version=src_old_version,
-            new_version=src_new_version,
-            page_map=page_map
-        )
-
-        if data['single_page']:
-            # insert all pages in one single document
-            self.move_to_folder_single_paged(
-                pages=pages,
-                dst_folder=dst_folder,
-                title_format=data.get('title_format', None)
-            )
-        else:
-            # there will be one document for each page
-            self.move_to_folder_multi_paged(
-                pages=pages,
-                first_page=first_page,
-                dst_folder=dst_folder,
-                title_format=data.get('title_format', None)
-            )
-
-        page_move_to_folder.send(
-            sender=Page,
-            document_version=src_new_version
-        )
-
-    def move_to_folder_multi_paged(
-            self,
-            pages,
-            first_page,
-            dst_folder,
-            title_format=None
-    ):
-        """All extracted pages are inserted into one document"""
-        if title_format is None:
-            title = f'document-{str(uuid4())}.pdf'
-        else:
-            title = f'{title_format}.pdf'
-
-        new_doc = Document.objects.create_document(
-            title=title,
-            lang=first_page.lang,
-            user_id=dst_folder.user_id,
-            parent=dst_folder,
-            ocr_status=OCR_STATUS_SUCCEEDED
-        )
-        # create new document version which
-        # will contain mentioned pages
-        dst_version = new_doc.version_bump_from_pages(pages=pages)
-        page_map = zip(
-            range(1, pages.count() + 1),
-            [page.number for page in pages.order_by('number')]
-        )
-        for src_page, dst_page in zip(
-            pages.order_by('number'),
-            dst_version.pages.order_by('number'),
-        ):
-            get_storage_instance().copy_page(
-                src=src_page.page_path,
-                dst=dst_page.page_path
-            )
-        reuse_text_field(
-            old_version=first_page.document_version,
-            new_version=dst_version,
-            page_map=page_map
-        )
-
-        page_move_to_folder.send(
-            sender=Page,
-            document_version=dst_version
-        )
-
-    def move_to_folder_single_paged(
-            self,
-            pages,
-            dst_folder,
-            title_format=None
-    ):
-        """Each extracted page is inserted into a separate document"""
-
-        pages_count = pages.count()
-        for page in pages:
-            if title_format is None:
-                title = f'page-{str(uuid4())}.pdf'
-            else:
-                if pages_count > 1:
-                    title = f'{title_format}-{str(uuid4())}.pdf'
-                else:
-                    title = f'{title_format}.pdf'
-
-            doc = Document.objects.create_document(
-                title=title,
-                lang=page.lang,
-                user_id=dst_folder.user_id,
-                parent=dst_folder,
-                ocr_status=OCR_STATUS_SUCCEEDED
-            )
-            # create new document version
-            # with one page
-            doc_version = doc.version_bump_from_pages(pages=[page])
-            get_storage_instance().copy_page(
-                src=page.page_path,
-                dst=doc_version.pages.first().page_path
-            )
-            reuse_text_field(
-                old_version=page.document_version,
-                new_version=doc_version,
-                page_map=[(1, page.number)]
-            )
+            return self.run_operation(serializer.data)
 
-            page_move_to_folder.send(
-                sender=Page,
-                document_version=doc_version
-            )
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PagesMoveToDocumentView(RequireAuthMixin, GenericAPIView):
+class PagesMoveToDocumentView(
+    RequireAuthMixin,
+    PageOperationMixin,
+    GenericAPIView
+):
     serializer_class = PagesMoveToDocumentSerializer
     renderer_classes = (JSONRenderer,)
+    operation = PAGE_OPERATION_MOVE_TO_DOCUMENT
 
     @extend_schema(operation_id="Move to document")
     def post(self, request):
@@ -599,156 +442,6 @@ class PagesMoveToDocumentView(RequireAuthMixin, GenericAPIView):
         serializer = self.serializer_class(data=request.data)
 
         if serializer.is_valid():
-            if serializer.data.get('merge', False):
-                self.merge_to_document(serializer.data)
-            else:
-                self.move_to_document(serializer.data)
-            return Response(
-                data=serializer.data,
-                status=status.HTTP_204_NO_CONTENT
-            )
+            return self.run_operation(serializer.data)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-    def merge_to_document(self, data):
-        """Merge creates target document version ONLY from source pages
-
-        There is a total merge and partial merge.
-        Total merge is when ALL pages of the source are involved. During total
-        merge source document is deleted.
-        When not all pages are involved in the merge - we say it is a partial
-        merge. During partial merge source documents is NOT deleted.
-        """
-        pages = Page.objects.filter(
-            pk__in=data['pages']
-        )
-        dst_document = Document.objects.get(
-            pk=data['dst'],
-            user=self.request.user
-        )
-        src_old_version = pages.first().document_version
-        doc = src_old_version.document
-        pages_count = pages.count()
-
-        if src_old_version.pages.count() == pages_count:
-            # destination new version will have same
-            # number of pages as source document count
-            dst_new_version = dst_document.version_bump(
-                page_count=pages_count,
-                short_description=f'{pages_count} page(s) merged in'
-            )
-            total_merge(
-                src_old_version=src_old_version,
-                dst_new_version=dst_new_version
-            )
-            page_move_to_document.send(
-                sender=Page,
-                document_version=dst_new_version
-            )
-        else:
-            src_new_version = doc.version_bump(
-                page_count=src_old_version.pages.count() - pages_count,
-                short_description=f'{pages_count} page(s) merged out'
-            )
-            dst_new_version = dst_document.version_bump(
-                page_count=pages_count,
-                short_description=f'{pages_count} page(s) merged in'
-            )
-            partial_merge(
-                src_old_version=src_old_version,
-                src_new_version=src_new_version,
-                dst_new_version=dst_new_version,
-                page_numbers=[p.number for p in pages.order_by('number')]
-            )
-            page_move_to_document.send(
-                sender=Page,
-                document_version=src_new_version
-            )
-            page_move_to_document.send(
-                sender=Page,
-                document_version=dst_new_version
-            )
-
-    def move_to_document(self, data):
-        pages = Page.objects.filter(
-            pk__in=data['pages']
-        )
-        dst_document = Document.objects.get(
-            pk=data['dst'],
-            user=self.request.user
-        )
-        src_old_version = pages.first().document_version
-        dst_old_version = dst_document.versions.last()
-        pages_count = pages.count()
-        position = data['position']
-        if position < 0:
-            position = dst_old_version.pages.count()
-
-        doc = src_old_version.document
-        src_new_version = doc.version_bump(
-            page_count=src_old_version.pages.count() - pages_count,
-            short_description=f'{pages_count} page(s) moved out'
-        )
-        dst_new_version = dst_document.version_bump(
-            page_count=dst_old_version.pages.count() + pages_count,
-            short_description=f'{pages_count} page(s) moved in'
-        )
-
-        remove_pdf_pages(
-            old_version=src_old_version,
-            new_version=src_new_version,
-            page_numbers=[page.number for page in pages]
-        )
-
-        page_recycle_map = PageRecycleMap(
-            total=src_old_version.page_count,
-            deleted=[item.number for item in pages]
-        )
-
-        page_map = list(page_recycle_map)
-
-        reuse_ocr_data(
-            old_version=src_old_version,
-            new_version=src_new_version,
-            page_map=page_map
-        )
-
-        reuse_text_field(
-            old_version=src_old_version,
-            new_version=src_new_version,
-            page_map=page_map
-        )
-
-        insert_pdf_pages(
-            src_old_version=src_old_version,
-            dst_old_version=dst_old_version,
-            dst_new_version=dst_new_version,
-            src_page_numbers=[p.number for p in pages.order_by('number')],
-            dst_position=position
-        )
-
-        reuse_ocr_data_multi(
-            src_old_version=src_old_version,
-            dst_old_version=dst_old_version,
-            dst_new_version=dst_new_version,
-            position=position,
-            page_numbers=[page.number for page in pages]
-        )
-
-        reuse_text_field_multi(
-            src_old_version=src_old_version,
-            dst_old_version=dst_old_version,
-            dst_new_version=dst_new_version,
-            position=position,
-            page_numbers=[page.number for page in pages]
-        )
-
-        page_move_to_document.send(
-            sender=Page,
-            document_version=src_new_version
-        )
-
-        page_move_to_document.send(
-            sender=Page,
-            document_version=dst_new_version
-        )
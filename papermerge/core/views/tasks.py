@@ -1,3 +1,4 @@
+from rest_framework.renderers import JSONRenderer as rest_framework_JSONRenderer
 from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
 from rest_framework.generics import get_object_or_404
@@ -7,8 +8,10 @@ from papermerge.core.tasks import (
     ocr_document_task,
     post_ocr_document_task
 )
+from papermerge.core.app_settings import settings
+from papermerge.core.ocr.queues import queue_depths
 from papermerge.core.storage import default_storage
-from papermerge.core.serializers import OcrSerializer
+from papermerge.core.serializers import OcrSerializer, OcrQueueSerializer
 
 from .mixins import RequireAuthMixin
 
@@ -37,3 +40,30 @@ class OCRView(RequireAuthMixin, GenericAPIView):
         )
 
         return Response({"message": "OCR successfully started"})
+
+
+class OCRQueuesView(RequireAuthMixin, GenericAPIView):
+
+    serializer_class = OcrQueueSerializer
+    renderer_classes = (rest_framework_JSONRenderer,)
+    pagination_class = None
+
+    def get(self, request):
+        """
+        Lists OCR queues (see ``PAPERMERGE_OCR_QUEUES`` setting) with
+        number of tasks waiting in each of them
+        """
+        depths = queue_depths()
+        serializer = self.get_serializer(
+            [
+                {
+                    'name': name,
+                    'max_page_count': max_page_count,
+                    'depth': depths.get(name)
+                }
+                for name, max_page_count in settings.OCR_QUEUES or []
+            ],
+            many=True
+        )
+
+        return Response(serializer.data)
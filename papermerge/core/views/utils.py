@@ -1,4 +1,5 @@
 import io
+import logging
 import os
 from typing import Optional, Union
 from pikepdf import Pdf
@@ -6,10 +7,15 @@ from collections import abc, namedtuple
 
 from django.utils.html import escape
 
+from papermerge.core.app_settings import settings
+from papermerge.core.lib import manifest, rotate
 from papermerge.core.lib.path import PagePath
+from papermerge.core.lib.pdf import save_pdf
 from papermerge.core.storage import abs_path, get_storage_instance
 from papermerge.core.models import DocumentVersion
 
+logger = logging.getLogger(__name__)
+
 
 def sanitize_kvstore(kvstore_dict):
     """
@@ -165,6 +171,98 @@ class PageRecycleMap:
         )
 
 
+PageEditMapItem = namedtuple(
+    'PageEditMapItem', ['new_number', 'old_number', 'angle']
+)
+
+
+class PageEditMap:
+    """Composes ordered page operations into a single page map.
+
+    Operations (delete, rotate, reorder) refer to pages by their number in
+    the old document version; each operation is applied on top of the
+    result of preceding ones. Deletions are composed via
+    ``PageRecycleMap``.
+
+    Example: total pages = 4, delete page 1, rotate page 4 by 90 degrees,
+    then reorder remaining pages as [4, 2, 3]:
+
+    |New page number | Old page number | Angle |
+    --------------------------------------------
+    |        1       |       4         |  90   |
+    |        2       |       2         |   0   |
+    |        3       |       3         |   0   |
+    --------------------------------------------
+    """
+
+    def __init__(self, total: int):
+        self.total = total
+        # current page order, each item is [old_number, angle]
+        self._pages = [[number, 0] for number in range(1, total + 1)]
+
+    def delete(self, old_numbers: list[int]) -> None:
+        positions = self._positions(old_numbers)
+        recycle_map = PageRecycleMap(
+            total=len(self._pages),
+            deleted=positions
+        )
+        self._pages = [
+            self._pages[item.old_number - 1] for item in recycle_map
+        ]
+
+    def rotate(self, old_numbers: list[int], angle: int) -> None:
+        for position in self._positions(old_numbers):
+            page = self._pages[position - 1]
+            page[1] = (page[1] + angle) % 360
+
+    def reorder(self, old_numbers: list[int]) -> None:
+        """
+        ``old_numbers`` - all (not deleted) pages in the desired order
+        """
+        if sorted(old_numbers) != sorted(page[0] for page in self._pages):
+            raise ValueError("Reorder must list all pages exactly once")
+
+        self._pages = [
+            self._pages[position - 1]
+            for position in self._positions(old_numbers)
+        ]
+
+    def _positions(self, old_numbers: list[int]) -> list[int]:
+        index = {
+            page[0]: position
+            for position, page in enumerate(self._pages, start=1)
+        }
+        try:
+            return [index[number] for number in old_numbers]
+        except KeyError as exc:
+            raise ValueError(f"Page number {exc} was deleted") from exc
+
+    def __iter__(self):
+        for new_number, (old_number, angle) in enumerate(
+            self._pages, start=1
+        ):
+            yield PageEditMapItem(new_number, old_number, angle)
+
+    def __len__(self):
+        return len(self._pages)
+
+    @property
+    def page_map(self) -> list[tuple]:
+        """List of (new page number, old page number) pairs"""
+        return [(item.new_number, item.old_number) for item in self]
+
+    @property
+    def rotated(self) -> list[dict]:
+        """Rotated pages (numbered as in new version) and their angles"""
+        return [
+            {'number': item.new_number, 'angle': item.angle}
+            for item in self if item.angle
+        ]
+
+    def __repr__(self):
+        return f"PageEditMap(total={self.total!r}, pages={self._pages!r})"
+
+
 def collect_text_streams(
     version: DocumentVersion,
     page_numbers: list[int]
@@ -267,19 +365,80 @@ def reuse_ocr_data(
         )
 
 
-def reuse_text_field(
+def reuse_ocr_data_after_rotate(
     old_version: DocumentVersion,
     new_version: DocumentVersion,
-    page_map: list
+    pages_data: list[dict]
 ) -> None:
-    streams = collect_text_streams(
-        version=old_version,
-        # list of old_version page numbers
-        page_numbers=[item[1] for item in page_map]
+    """
+    Reuses OCR data and previews of ``old_version`` after page rotation
+
+    All sidecars are linked from the old version (rotation does not
+    add/remove any page), then images of rotated pages only (previews,
+    jpg and svg) are rotated in-process.
+
+    ``pages_data`` is a list of dictionaries. Each dictionary is expected
+    to have following keys:
+        - number
+        - angle
+    """
+    page_map = [
+        (number, number)
+        for number in range(1, old_version.page_count + 1)
+    ]
+    reuse_ocr_data(
+        old_version=old_version,
+        new_version=new_version,
+        page_map=page_map
     )
+    rotate_page_images(version=new_version, pages_data=pages_data)
 
+
+def rotate_page_images(
+    version: DocumentVersion,
+    pages_data: list[dict]
+) -> None:
+    """
+    Rotates in-process preview, jpg and svg images of given pages
+
+    ``pages_data`` is a list of dictionaries. Each dictionary is expected
+    to have following keys:
+        - number
+        - angle
+    """
+    for page_data in pages_data:
+        page_path = PagePath(
+            document_path=version.document_path,
+            page_num=page_data['number']
+        )
+        rotations = (
+            (page_path.preview_url, rotate.rotate_jpeg),
+            (page_path.jpg_url, rotate.rotate_jpeg),
+            (page_path.svg_url, rotate.rotate_svg),
+        )
+        for url, rotate_image in rotations:
+            abs_file_path = abs_path(url)
+            if not os.path.exists(abs_file_path):
+                continue
+            try:
+                rotate_image(abs_file_path, page_data['angle'])
+            except (OSError, ValueError, TypeError, SyntaxError) as exc:
+                # remove the stale image; previews are generated on demand
+                # (see ``Page.get_jpeg``)
+                logger.warning(f"Failed to rotate {abs_file_path}: {exc}")
+                os.unlink(abs_file_path)
+
+
+def reuse_text_field(
+    old_version: DocumentVersion,
+    new_version: DocumentVersion,
+    page_map: list
+) -> None:
     # updates page.text fields and document_version.text field
-    new_version.update_text_field(streams)
+    new_version.copy_text_field(
+        old_version=old_version,
+        page_map=page_map
+    )
 
 
 def reuse_text_field_multi(
@@ -308,40 +467,43 @@ def reuse_text_field_multi(
     if dst_old_version is None:
         position = 0
 
-    page_map = [(pos, pos) for pos in range(1, position + 1)]
-    streams = []
-    if len(page_map) > 0 and dst_old_version is not None:
-        streams.extend(
-            collect_text_streams(
-                version=dst_old_version,
-                page_numbers=[item[1] for item in page_map]
+    inserted = len(page_numbers)
+    sources = [(
+        src_old_version,
+        [
+            (new_number, old_number)
+            for new_number, old_number in enumerate(
+                page_numbers, start=position + 1
             )
-        )
-
-    streams.extend(
-        collect_text_streams(
-            version=src_old_version,
-            page_numbers=page_numbers
-        )
-    )
-
-    if dst_old_version is not None:
-        dst_new_total_pages = dst_new_version.pages.count()
-        _range = range(
-            position + 1 + len(page_numbers),
-            dst_new_total_pages + 1
-        )
-        page_numbers_to_collect = [
-            pos - len(page_numbers) for pos in _range
         ]
-        streams.extend(
-           collect_text_streams(
-                version=dst_old_version,
-                page_numbers=list(page_numbers_to_collect)
-           )
-        )
+    )]
 
-    dst_new_version.update_text_field(streams)
+    if dst_old_version is not None:
+        dst_old_total_pages = dst_old_version.pages.count()
+        # destination pages before and after inserted ones; each is
+        # shifted by one offset, thus copied with one statement
+        sources.append((
+            dst_old_version,
+            [(pos, pos) for pos in range(1, position + 1)]
+        ))
+        sources.append((
+            dst_old_version,
+            [
+                (pos + inserted, pos)
+                for pos in range(position + 1, dst_old_total_pages + 1)
+            ]
+        ))
+
+    # texts are copied by database (see ``DocumentVersion.copy_text_fields``)
+    dst_new_version.copy_text_fields(sources)
+
+
+def save_manifest(version: DocumentVersion, entries: list[dict]) -> None:
+    """
+    Turns ``version`` into a lazy document version described by ``entries``
+    """
+    version.manifest = entries
+    version.save(update_fields=['manifest'])
 
 
 def remove_pdf_pages(
@@ -362,9 +524,14 @@ def remove_pdf_pages(
     if len(page_numbers) < 1:
         raise ValueError("Empty page_numbers")
 
-    pdf = Pdf.open(
-        abs_path(old_version.document_path.url)
-    )
+    if settings.LAZY_PDF_VERSIONS:
+        save_manifest(
+            new_version,
+            manifest.remove_pages(old_version.get_manifest(), page_numbers)
+        )
+        return
+
+    pdf = Pdf.open(old_version.abs_file_path())
 
     if len(pdf.pages) < len(page_numbers):
         raise ValueError("Too many values in page_numbers")
@@ -378,7 +545,7 @@ def remove_pdf_pages(
         abs_path(new_version.document_path.url)
     )
     os.makedirs(dirname, exist_ok=True)
-    pdf.save(abs_path(new_version.document_path.url))
+    save_pdf(pdf, abs_path(new_version.document_path.url))
 
 
 def insert_pdf_pages(
@@ -406,18 +573,40 @@ def insert_pdf_pages(
     In `src_page_numbers` page numbering starts with 1 i.e.
     when `src_page_numbers=[1, 2]` means insert first and second pages from
     source document version.
+
+    Manifest entries may point only to versions of the same document
+    (all document's files are deleted together), thus
+    `insert_pdf_pages` creates lazy document version only when source and
+    destination belong to the same document.
     """
-    src_old_pdf = Pdf.open(
-        abs_path(src_old_version.document_path.url)
-    )
     if dst_old_version is None:
         # case of total merge
-        dst_old_pdf = Pdf.new()
         dst_position = 0
-    else:
-        dst_old_pdf = Pdf.open(
-            abs_path(dst_old_version.document_path.url)
+
+    same_document = (
+        src_old_version.document_id == dst_new_version.document_id
+    )
+    if settings.LAZY_PDF_VERSIONS and same_document:
+        if dst_old_version is None:
+            dst_old_manifest = []
+        else:
+            dst_old_manifest = dst_old_version.get_manifest()
+        save_manifest(
+            dst_new_version,
+            manifest.insert_pages(
+                src_manifest=src_old_version.get_manifest(),
+                dst_manifest=dst_old_manifest,
+                src_page_numbers=src_page_numbers,
+                dst_position=dst_position
+            )
         )
+        return
+
+    src_old_pdf = Pdf.open(src_old_version.abs_file_path())
+    if dst_old_version is None:
+        dst_old_pdf = Pdf.new()
+    else:
+        dst_old_pdf = Pdf.open(dst_old_version.abs_file_path())
 
     _inserted_count = 0
     for page_number in src_page_numbers:
@@ -429,7 +618,8 @@ def insert_pdf_pages(
         abs_path(dst_new_version.document_path.url)
     )
     os.makedirs(dirname, exist_ok=True)
-    dst_old_pdf.save(
+    save_pdf(
+        dst_old_pdf,
         abs_path(dst_new_version.document_path.url)
     )
 
@@ -549,7 +739,14 @@ def reorder_pdf_pages(
     pages_data,
     page_count
 ):
-    src = Pdf.open(abs_path(old_version.document_path.url))
+    if settings.LAZY_PDF_VERSIONS:
+        save_manifest(
+            new_version,
+            manifest.reorder_pages(old_version.get_manifest(), pages_data)
+        )
+        return
+
+    src = Pdf.open(old_version.abs_file_path())
 
     dst = Pdf.new()
     reodered_list = sorted(pages_data, key=lambda item: item['new_number'])
@@ -562,7 +759,7 @@ def reorder_pdf_pages(
         abs_path(new_version.document_path.url)
     )
     os.makedirs(dirname, exist_ok=True)
-    dst.save(abs_path(new_version.document_path.url))
+    save_pdf(dst, abs_path(new_version.document_path.url))
 
 
 def rotate_pdf_pages(
@@ -576,7 +773,14 @@ def rotate_pdf_pages(
         - number
         - angle
     """
-    src = Pdf.open(abs_path(old_version.document_path.url))
+    if settings.LAZY_PDF_VERSIONS:
+        save_manifest(
+            new_version,
+            manifest.rotate_pages(old_version.get_manifest(), pages_data)
+        )
+        return
+
+    src = Pdf.open(old_version.abs_file_path())
 
     for page_data in pages_data:
         page = src.pages.p(page_data['number'])
@@ -586,4 +790,41 @@ def rotate_pdf_pages(
         abs_path(new_version.document_path.url)
     )
     os.makedirs(dirname, exist_ok=True)
-    src.save(abs_path(new_version.document_path.url))
+    save_pdf(src, abs_path(new_version.document_path.url))
+
+
+def edit_pdf_pages(
+    old_version: DocumentVersion,
+    new_version: DocumentVersion,
+    page_edit_map: PageEditMap
+) -> None:
+    """
+    Builds ``new_version`` file from ``old_version`` pages in one pass
+
+    Page order and rotation of the new version are given by
+    ``page_edit_map``.
+    """
+    pages = [(item.old_number, item.angle) for item in page_edit_map]
+
+    if settings.LAZY_PDF_VERSIONS:
+        save_manifest(
+            new_version,
+            manifest.edit_pages(old_version.get_manifest(), pages)
+        )
+        return
+
+    src = Pdf.open(old_version.abs_file_path())
+    dst = Pdf.new()
+
+    for old_number, angle in pages:
+        dst.pages.append(src.pages.p(old_number))
+        if angle:
+            dst.pages[-1].rotate(angle, relative=True)
+
+    dirname = os.path.dirname(
+        abs_path(new_version.document_path.url)
+    )
+    os.makedirs(dirname, exist_ok=True)
+    save_pdf(dst, abs_path(new_version.document_path.url))
+    src.close()
+    dst.close()
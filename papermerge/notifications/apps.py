@@ -6,4 +6,4 @@ class NotificationsConfig(AppConfig):
     label = 'notifications'
 
     def ready(self):
-        from papermerge.core import signals  # noqa
+        from papermerge.notifications import signals  # noqa
@@ -0,0 +1,56 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import JsonWebsocketConsumer
+
+from papermerge.notifications.mixins import RequireAuth
+
+logger = logging.getLogger(__name__)
+
+
+class ExportConsumer(RequireAuth, JsonWebsocketConsumer):
+    """
+    Forwards ``export_nodes_task`` notifications to the user
+    who requested the export.
+
+    Each event contains ``export_job_id`` (as returned by
+    ``/nodes/export/`` endpoint) and ``type`` which is one of:
+
+        - exportnodestask.taskreceived
+        - exportnodestask.taskstarted
+        - exportnodestask.taskprogress (with ``entries`` key - number
+          of documents written to the archive so far)
+        - exportnodestask.tasksucceeded
+        - exportnodestask.taskfailed (with ``error`` key)
+    """
+    group_name = "export_nodes_task"
+
+    def disconnect(self, close_code):
+        async_to_sync(
+            self.channel_layer.group_discard
+        )(self.group_name, self.channel_name)
+
+    def exportnodestask_taskreceived(self, event: dict):
+        self._export_event(event)
+
+    def exportnodestask_taskstarted(self, event: dict):
+        self._export_event(event)
+
+    def exportnodestask_taskprogress(self, event: dict):
+        self._export_event(event)
+
+    def exportnodestask_tasksucceeded(self, event: dict):
+        self._export_event(event)
+
+    def exportnodestask_taskfailed(self, event: dict):
+        self._export_event(event)
+
+    def _export_event(self, event: dict):
+        if event['user_id'] != str(self.user.id):
+            # notification is intended only for user who requested export
+            return
+
+        logger.debug(
+            f"Export consumer ev={event} for user_id={self.user.id}"
+        )
+        self.send_json(event)
@@ -0,0 +1,59 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import JsonWebsocketConsumer
+
+from papermerge.notifications.mixins import RequireAuth
+
+logger = logging.getLogger(__name__)
+
+
+class PageOperationConsumer(RequireAuth, JsonWebsocketConsumer):
+    """
+    Forwards ``page_operation_task`` notifications to the user
+    who initiated the page operation.
+
+    Each event contains ``operation_id`` (as returned by page
+    operation endpoint with ``async=true``), ``operation`` and
+    ``type`` which is one of:
+
+        - pageoperationtask.taskreceived
+        - pageoperationtask.taskstarted
+        - pageoperationtask.taskprogress (with ``stage`` key)
+        - pageoperationtask.tasksucceeded
+        - pageoperationtask.taskfailed (with ``error`` key)
+    """
+    group_name = "page_operation_task"
+
+    def disconnect(self, close_code):
+        async_to_sync(
+            self.channel_layer.group_discard
+        )(self.group_name, self.channel_name)
+
+    def pageoperationtask_taskreceived(self, event: dict):
+        self._page_operation_event(event)
+
+    def pageoperationtask_taskstarted(self, event: dict):
+        self._page_operation_event(event)
+
+    def pageoperationtask_taskprogress(self, event: dict):
+        self._page_operation_event(event)
+
+    def pageoperationtask_tasksucceeded(self, event: dict):
+        self._page_operation_event(event)
+
+    def pageoperationtask_taskfailed(self, event: dict):
+        self._page_operation_event(event)
+
+    def _page_operation_event(self, event: dict):
+        if event['user_id'] != str(self.user.id):
+            # notification is intended only for user who initiated it
+            return
+
+        logger.debug(
+            f"Page operation consumer ev={event} for user_id={self.user.id}"
+        )
+        # operation's input data is not sent back to the client
+        self.send_json({
+            key: value for key, value in event.items() if key != 'data'
+        })
@@ -1,7 +1,9 @@
 from django.urls import re_path
 
 from .consumers import document as doc_consumer
+from .consumers import export as export_consumer
 from .consumers import inbox_refresh as inbox_refresh_consumer
+from .consumers import page_operation as page_operation_consumer
 from .consumers import DefaultConsumer
 
 websocket_urlpatterns = [
@@ -13,6 +15,14 @@ websocket_urlpatterns = [
         r'ws/nodes/inbox-refresh/$',
         inbox_refresh_consumer.InboxRefreshConsumer.as_asgi()
     ),
+    re_path(
+        r'ws/page-operations/$',
+        page_operation_consumer.PageOperationConsumer.as_asgi()
+    ),
+    re_path(
+        r'ws/exports/$',
+        export_consumer.ExportConsumer.as_asgi()
+    ),
     re_path(
         r'ws/',
         DefaultConsumer.as_asgi()
@@ -1,7 +1,6 @@
 import logging
 
 from django.dispatch import receiver
-from django.db.models.signals import post_save, post_delete
 
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
@@ -10,15 +9,17 @@ from papermerge.core.models import (
     Document,
     Folder
 )
+from papermerge.core.signal_definitions import page_move_to_folder_batch
 
 logger = logging.getLogger(__name__)
 
 
-@receiver([post_delete, post_save], sender=Document)
-@receiver([post_delete, post_save], sender=Folder)
 def if_inbox_then_refresh(sender, instance, **kwargs):
     """
     Inform inbox_refresh channel group that user's inbox was updated
+
+    Not connected to ``post_save``/``post_delete``: these are sent before
+    transaction is committed and for every node saved in inbox.
     """
     # Folder or Document instance was deleted/moved from//to user's Inbox folder
     try:
@@ -29,10 +30,32 @@ def if_inbox_then_refresh(sender, instance, **kwargs):
 
     try:
         if instance.parent and instance.parent.title == Folder.INBOX_TITLE:
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                "inbox_refresh",
-                {"type": "inbox.refresh", "user_id": str(instance.user.pk)}
-            )
+            inbox_refresh(instance.user.pk)
+    except Exception as ex:
+        logger.warning(ex, exc_info=True)
+
+
+@receiver(page_move_to_folder_batch)
+def if_inbox_batch_then_refresh(sender, document_versions, **kwargs):
+    """
+    Inform inbox_refresh channel group (once per batch) that documents
+    were created in user's Inbox folder. Documents created in batch
+    are inserted in bulk, without ``post_save`` signal.
+    """
+    if not document_versions:
+        return
+
+    document = document_versions[0].document
+    try:
+        if document.parent and document.parent.title == Folder.INBOX_TITLE:
+            inbox_refresh(document.user_id)
     except Exception as ex:
         logger.warning(ex, exc_info=True)
+
+
+def inbox_refresh(user_id):
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        "inbox_refresh",
+        {"type": "inbox.refresh", "user_id": str(user_id)}
+    )
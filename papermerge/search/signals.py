@@ -1,5 +1,5 @@
 import logging
-from django.db import models
+from django.db import models, transaction
 
 from haystack import signals
 from haystack.utils import get_identifier
@@ -10,7 +10,10 @@ from papermerge.core.models import (
     Folder,
     BaseTreeNode
 )
-from papermerge.core.signal_definitions import node_post_move
+from papermerge.core.signal_definitions import (
+    node_post_move,
+    page_move_to_folder_batch
+)
 from papermerge.search.tasks import update_index
 
 
@@ -30,6 +33,7 @@ class SignalProcessor(signals.BaseSignalProcessor):
         node_post_move.connect(
             self.after_node_moved, sender=BaseTreeNode
         )
+        page_move_to_folder_batch.connect(self.after_batch_created)
 
     def teardown(self):
         for klass in (DocumentVersion, Document, Folder, BaseTreeNode):
@@ -41,6 +45,15 @@ class SignalProcessor(signals.BaseSignalProcessor):
         node_post_move.disconnect(
             self.after_node_moved
         )
+        page_move_to_folder_batch.disconnect(self.after_batch_created)
+
+    def after_batch_created(self, document_versions, **kwargs):
+        """
+        Documents created in bulk do not trigger ``post_save`` signals,
+        index them here.
+        """
+        for document_version in document_versions:
+            self.enqueue('save', document_version, **kwargs)
 
     def after_node_moved(self, instance, new_parent, **kwargs):
         """
@@ -121,7 +134,11 @@ class SignalProcessor(signals.BaseSignalProcessor):
                 identifier
             )
         )
-        update_index.apply_async(kwargs={
-            'action': action,
-            'identifier': identifier
-        })
+        # otherwise worker could index data of not yet committed
+        # transaction (or miss it)
+        transaction.on_commit(
+            lambda: update_index.apply_async(kwargs={
+                'action': action,
+                'identifier': identifier
+            })
+        )
@@ -2,7 +2,6 @@ import re
 
 from pdfminer.high_level import extract_text
 from papermerge.core.models import DocumentVersion
-from papermerge.core.storage import abs_path
 
 
 def pdf_content(
@@ -15,7 +14,7 @@ def pdf_content(
 
     :return: content (as string) of pdf file associated with document version
     """
-    file_path = abs_path(document_version.document_path.url)
+    file_path = document_version.abs_file_path()
     text = extract_text(file_path)
     stripped_text = text.strip()
 
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from pikepdf import Pdf
+
+from papermerge.core.lib.fingerprint import pdf_fingerprints
+
+RESOURCES = Path(__file__).parent.parent.parent / 'resources'
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.src = str(RESOURCES / 's3.pdf')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_pages_have_different_fingerprints(self):
+        with Pdf.open(self.src) as pdf:
+            fingerprints = pdf_fingerprints(pdf)
+
+        assert len(fingerprints) == 3
+        assert len(set(fingerprints)) == 3
+
+    def test_fingerprint_does_not_depend_on_pdf_file(self):
+        """
+        Page copied into another (differently compressed) PDF file
+        has the same fingerprint
+        """
+        dst_path = os.path.join(self.tempdir.name, 'x.pdf')
+        with Pdf.open(self.src) as pdf:
+            original = pdf_fingerprints(pdf)
+            dst = Pdf.new()
+            dst.pages.extend([pdf.pages[2], pdf.pages[0]])
+            dst.save(dst_path, compress_streams=False)
+
+        with Pdf.open(dst_path) as pdf:
+            assert pdf_fingerprints(pdf) == [original[2], original[0]]
+
+    def test_rotated_page_has_different_fingerprint(self):
+        with Pdf.open(self.src) as pdf:
+            original = pdf_fingerprints(pdf)
+            pdf.pages[1].rotate(90, relative=True)
+            rotated = pdf_fingerprints(pdf)
+
+        assert rotated[0] == original[0]
+        assert rotated[1] != original[1]
+        assert rotated[2] == original[2]
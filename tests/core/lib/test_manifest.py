@@ -0,0 +1,104 @@
+import unittest
+
+from papermerge.core.lib import manifest
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.original = manifest.identity('v1', 4)
+
+    def test_identity(self):
+        assert self.original == [
+            {'version': 'v1', 'number': 1, 'angle': 0},
+            {'version': 'v1', 'number': 2, 'angle': 0},
+            {'version': 'v1', 'number': 3, 'angle': 0},
+            {'version': 'v1', 'number': 4, 'angle': 0},
+        ]
+
+    def test_remove_pages(self):
+        result = manifest.remove_pages(self.original, [1, 3])
+
+        assert [item['number'] for item in result] == [2, 4]
+        # input manifest is left untouched
+        assert len(self.original) == 4
+
+    def test_remove_pages_invalid_input(self):
+        with self.assertRaises(ValueError):
+            manifest.remove_pages(self.original, [])
+
+        with self.assertRaises(ValueError):
+            manifest.remove_pages(self.original, [1, 2, 3, 4, 5])
+
+    def test_reorder_pages(self):
+        pages_data = [
+            {'old_number': 1, 'new_number': 3},
+            {'old_number': 2, 'new_number': 2},
+            {'old_number': 3, 'new_number': 1},
+            {'old_number': 4, 'new_number': 4},
+        ]
+        result = manifest.reorder_pages(self.original, pages_data)
+
+        assert [item['number'] for item in result] == [3, 2, 1, 4]
+
+    def test_rotate_pages_accumulates_angle(self):
+        result = manifest.rotate_pages(
+            self.original,
+            [{'number': 2, 'angle': 90}]
+        )
+        result = manifest.rotate_pages(
+            result,
+            [{'number': 2, 'angle': 270}, {'number': 3, 'angle': -90}]
+        )
+
+        assert [item['angle'] for item in result] == [0, 0, 270, 0]
+        assert self.original[1]['angle'] == 0
+
+    def test_chained_operations(self):
+        """
+        Rotate page 4, then delete first page, then move (rotated)
+        page to the front: every entry still points to the original pages
+        """
+        result = manifest.rotate_pages(
+            self.original,
+            [{'number': 4, 'angle': 90}]
+        )
+        result = manifest.remove_pages(result, [1])
+        result = manifest.reorder_pages(
+            result,
+            [
+                {'old_number': 3, 'new_number': 1},
+                {'old_number': 1, 'new_number': 2},
+                {'old_number': 2, 'new_number': 3},
+            ]
+        )
+
+        assert result == [
+            {'version': 'v1', 'number': 4, 'angle': 90},
+            {'version': 'v1', 'number': 2, 'angle': 0},
+            {'version': 'v1', 'number': 3, 'angle': 0},
+        ]
+
+    def test_insert_pages(self):
+        src = manifest.identity('v2', 3)
+        result = manifest.insert_pages(
+            src_manifest=src,
+            dst_manifest=manifest.identity('v1', 2),
+            src_page_numbers=[1, 3],
+            dst_position=1
+        )
+
+        assert [(item['version'], item['number']) for item in result] == [
+            ('v1', 1), ('v2', 1), ('v2', 3), ('v1', 2)
+        ]
+
+    def test_edit_pages(self):
+        rotated = manifest.rotate_pages(
+            self.original,
+            [{'number': 2, 'angle': 90}]
+        )
+        result = manifest.edit_pages(rotated, [(2, 90), (1, 0)])
+
+        assert [(item['number'], item['angle']) for item in result] == [
+            (2, 180), (1, 0)
+        ]
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from PIL import Image
+
+from papermerge.core.lib import mime
+from papermerge.core.lib.mime import Mime
+
+RESOURCES = Path(__file__).parent.parent.parent / 'resources'
+
+
+class TestMime(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _image(self, name, format):
+        path = os.path.join(self.tempdir.name, name)
+        Image.new('RGB', (10, 10)).save(path, format=format)
+        return path
+
+    def test_pdf(self):
+        file_mime = Mime(str(RESOURCES / 's3.pdf'))
+
+        assert file_mime.is_pdf()
+        assert not file_mime.is_image()
+        assert not file_mime.is_tiff()
+
+    def test_images(self):
+        assert Mime(self._image('x.png', 'PNG')).is_image()
+        assert Mime(self._image('x.jpg', 'JPEG')).is_image()
+        assert Mime(self._image('x.tiff', 'TIFF')).is_tiff()
+
+    def test_other_types_are_detected_by_libmagic(self):
+        path = os.path.join(self.tempdir.name, 'x.txt')
+        with open(path, 'w') as f:
+            f.write('hello')
+
+        assert mime.guess(path) == 'text/plain'
+
+    def test_guess_is_cached(self):
+        path = os.path.join(self.tempdir.name, 'x.txt')
+        with open(path, 'w') as f:
+            f.write('hello')
+
+        with patch(
+            'papermerge.core.lib.mime.magic.from_file',
+            return_value='text/plain'
+        ) as from_file:
+            file_mime = Mime(path)
+            file_mime.is_pdf()
+            file_mime.is_image()
+            file_mime.is_tiff()
+
+        from_file.assert_called_once()
+
+    def test_changed_file_is_sniffed_again(self):
+        path = os.path.join(self.tempdir.name, 'x')
+        with open(path, 'w') as f:
+            f.write('hello')
+        assert not mime.guess(path) == mime.PDF
+
+        with open(path, 'wb') as f:
+            f.write(b'%PDF-1.7\n')
+
+        assert mime.guess(path) == mime.PDF
+
+    def test_pdf_header_after_junk(self):
+        assert mime.sniff(b'\x00' * 100 + b'%PDF-1.4') == mime.PDF
+        assert mime.sniff(b'\x00' * 2000 + b'%PDF-1.4') is None
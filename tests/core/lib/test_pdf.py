@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from django.test import override_settings
+from pikepdf import Pdf
+
+from papermerge.core.lib.pdf import save_pdf
+
+RESOURCES = Path(__file__).parent.parent.parent / 'resources'
+
+
+class TestSavePdf(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.dst = os.path.join(self.tempdir.name, 'x.pdf')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    @override_settings(PAPERMERGE_LINEARIZE_PDF_VERSIONS=True)
+    def test_save_pdf_linearized(self):
+        with Pdf.open(RESOURCES / 'three-pages.pdf') as pdf:
+            save_pdf(pdf, self.dst)
+
+        with Pdf.open(self.dst) as pdf:
+            assert pdf.is_linearized
+            assert len(pdf.pages) == 3
+
+    def test_save_pdf(self):
+        with Pdf.open(RESOURCES / 'three-pages.pdf') as pdf:
+            save_pdf(pdf, self.dst)
+
+        with Pdf.open(self.dst) as pdf:
+            assert not pdf.is_linearized
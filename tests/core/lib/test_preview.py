@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from django.test import override_settings
+from PIL import Image
+
+from papermerge.core.lib.preview import (
+    evict_previews,
+    max_workers,
+    page_chunks,
+    render_previews,
+    resize_preview
+)
+
+
+def fake_pdftoppm(cmd):
+    """Writes empty files named the way pdftoppm names its output"""
+    first, last = int(cmd[3]), int(cmd[5])
+    root = cmd[-1]
+    for number in range(first, last + 1):
+        with open(f"{root}-{number:03d}.jpg", 'w'):
+            pass
+
+
+class TestPreview(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_page_chunks(self):
+        assert page_chunks(range(1, 6), chunk_size=2) == [
+            (1, 2), (3, 4), (5, 5)
+        ]
+        assert page_chunks([7, 1, 2, 5]) == [(1, 2), (5, 5), (7, 7)]
+        assert page_chunks([]) == []
+
+    @override_settings(
+        PAPERMERGE_PREVIEW_WORKERS=8,
+        PAPERMERGE_PREVIEW_MAX_MEMORY=3 * 900 * 900 * 8
+    )
+    def test_max_workers_is_limited_by_memory(self):
+        assert max_workers(900) == 3
+        assert max_workers(9000) == 1
+
+    @override_settings(
+        PAPERMERGE_PREVIEW_WORKERS=2,
+        PAPERMERGE_PREVIEW_MAX_MEMORY=None
+    )
+    def test_max_workers_without_memory_limit(self):
+        assert max_workers(900) == 2
+
+    @override_settings(PAPERMERGE_PREVIEW_WORKERS=4)
+    @patch('papermerge.core.lib.preview.run', side_effect=fake_pdftoppm)
+    def test_render_previews(self, run):
+        output_dir = os.path.join(self.tempdir.name, 'pages')
+
+        render_previews('doc.pdf', output_dir, pages=range(1, 46))
+
+        assert run.call_count == 3  # 45 pages in chunks of 20 pages
+        assert sorted(os.listdir(output_dir)) == sorted(
+            f"001-{number}.jpg" for number in range(1, 46)
+        )
+
+    @patch('papermerge.core.lib.preview.run', side_effect=fake_pdftoppm)
+    def test_render_previews_does_not_write_to_hardlinks(self, _):
+        output_dir = self.tempdir.name
+        preview = os.path.join(output_dir, '001-2.jpg')
+        shared = os.path.join(output_dir, 'shared.jpg')
+        with open(shared, 'w') as f:
+            f.write('other version')
+        os.link(shared, preview)
+
+        render_previews('doc.pdf', output_dir, pages=[2])
+
+        with open(shared) as f:
+            assert f.read() == 'other version'
+        assert os.stat(preview).st_size == 0
+
+    def test_resize_preview(self):
+        src = os.path.join(self.tempdir.name, '001-1.jpg')
+        dst = os.path.join(self.tempdir.name, 'previews', '300', '001-1.jpg')
+        Image.new('RGB', (900, 1273), 'white').save(src)
+
+        resize_preview(src, dst, 300)
+
+        with Image.open(dst) as image:
+            assert image.size == (300, 424)
+
+    def test_evict_previews_least_recently_used(self):
+        for index, name in enumerate(['001-1.jpg', '001-2.jpg', '001-3.jpg']):
+            path = os.path.join(self.tempdir.name, '150', name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'x' * 100)
+            os.utime(path, ns=(index, index))
+        # page 1 was used most recently
+        os.utime(os.path.join(self.tempdir.name, '150', '001-1.jpg'))
+
+        deleted = evict_previews(self.tempdir.name, max_size=150)
+
+        assert [os.path.basename(path) for path in deleted] == [
+            '001-2.jpg', '001-3.jpg'
+        ]
+        assert os.listdir(os.path.join(self.tempdir.name, '150')) == [
+            '001-1.jpg'
+        ]
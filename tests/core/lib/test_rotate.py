@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from django.test import override_settings
+from lxml import etree
+from PIL import Image, ImageChops
+
+from papermerge.core.lib.rotate import rotate_jpeg, rotate_svg
+
+SVG = """<svg viewBox="0 0 40 20" xmlns="http://www.w3.org/2000/svg">
+  <g id="image"><image width="40" href="data:image/jpeg;base64,"/></g>
+  <g id="text"><text x="1" y="2">Hello</text></g>
+</svg>
+"""
+
+
+class TestRotate(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.jpeg = os.path.join(self.tempdir.name, '001-1.jpg')
+        # left half is white, right half is black
+        image = Image.new('RGB', (40, 20), 'white')
+        image.paste((0, 0, 0), (20, 0, 40, 20))
+        image.save(self.jpeg, format='JPEG')
+        self.svg = os.path.join(self.tempdir.name, '1_ocr.svg')
+        with open(self.svg, 'w') as f:
+            f.write(SVG)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_rotate_jpeg_clockwise(self):
+        rotate_jpeg(self.jpeg, 90)
+
+        with Image.open(self.jpeg) as image:
+            assert image.format == 'JPEG'
+            assert image.size == (20, 40)
+            # right (black) half is now at the bottom
+            assert image.convert('L').getpixel((10, 35)) < 50
+            assert image.convert('L').getpixel((10, 5)) > 200
+
+    def test_rotate_jpeg_breaks_hardlink(self):
+        other = os.path.join(self.tempdir.name, 'other.jpg')
+        os.link(self.jpeg, other)
+
+        rotate_jpeg(self.jpeg, 180)
+
+        assert not os.path.samefile(self.jpeg, other)
+        with Image.open(other) as image:
+            # linked file is left untouched
+            assert image.convert('L').getpixel((35, 10)) < 50
+
+    def _aligned_jpeg(self):
+        # 4:2:0 subsampling, thus 16x16 MCU
+        path = os.path.join(self.tempdir.name, 'aligned.jpg')
+        image = Image.new('RGB', (32, 16), 'white')
+        image.paste((0, 0, 0), (16, 0, 32, 16))
+        image.save(path, format='JPEG', subsampling=2)
+
+        return path
+
+    def test_rotate_jpeg_uses_jpegtran_when_aligned(self):
+        path = self._aligned_jpeg()
+
+        def jpegtran(cmd, **kwargs):
+            shutil.copy(cmd[-1], cmd[-2])
+
+        with patch(
+            'papermerge.core.lib.rotate.subprocess.run',
+            side_effect=jpegtran
+        ) as run:
+            rotate_jpeg(path, 270)
+
+        cmd = run.call_args.args[0]
+        assert '-perfect' in cmd
+        assert cmd[cmd.index('-rotate') + 1] == '270'
+
+    def test_rotate_jpeg_not_aligned_is_reencoded(self):
+        with patch('papermerge.core.lib.rotate.subprocess.run') as run:
+            rotate_jpeg(self.jpeg, 90)
+
+        run.assert_not_called()
+        with Image.open(self.jpeg) as image:
+            assert image.size == (20, 40)
+
+    @override_settings(PAPERMERGE_BINARY_JPEGTRAN='/nonexistent/jpegtran')
+    def test_rotate_jpeg_without_jpegtran(self):
+        path = self._aligned_jpeg()
+
+        rotate_jpeg(path, 90)
+
+        with Image.open(path) as image:
+            assert image.size == (16, 32)
+            assert image.convert('L').getpixel((8, 28)) < 50
+
+    @unittest.skipUnless(shutil.which('jpegtran'), 'jpegtran not found')
+    @override_settings(PAPERMERGE_BINARY_JPEGTRAN=shutil.which('jpegtran'))
+    def test_rotate_jpeg_is_lossless(self):
+        path = self._aligned_jpeg()
+        with Image.open(path) as image:
+            original = image.convert('RGB')
+
+        for _ in range(4):
+            rotate_jpeg(path, 90)
+
+        with Image.open(path) as image:
+            diff = ImageChops.difference(original, image.convert('RGB'))
+            assert diff.getbbox() is None
+
+    def test_rotate_jpeg_invalid_angle(self):
+        with self.assertRaises(ValueError):
+            rotate_jpeg(self.jpeg, 45)
+
+    def test_rotate_svg(self):
+        rotate_svg(self.svg, -90)
+
+        root = etree.parse(self.svg).getroot()
+        assert root.get('viewBox') == '0 0 20 40'
+        # original content is wrapped in a rotated group
+        assert len(root) == 1
+        group = root[0]
+        assert group.get('transform').startswith(
+            'translate(0 40) rotate(270)'
+        )
+        assert [child.get('id') for child in group] == ['image', 'text']
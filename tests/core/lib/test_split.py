@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from pikepdf import Pdf
+from unittest.mock import patch
+
+from papermerge.core.lib.split import split_pdf
+
+RESOURCES = Path(__file__).parent.parent.parent / 'resources'
+
+
+class TestSplitPdf(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.src = str(RESOURCES / 's3.pdf')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _outputs(self, *page_numbers_list):
+        return [
+            (page_numbers, os.path.join(self.tempdir.name, str(index), 'x.pdf'))
+            for index, page_numbers in enumerate(page_numbers_list)
+        ]
+
+    def test_split_pdf(self):
+        outputs = self._outputs([1], [2, 3], [3, 1])
+
+        split_pdf(self.src, outputs, workers=2)
+
+        for page_numbers, dst_path in outputs:
+            with Pdf.open(dst_path) as pdf:
+                assert len(pdf.pages) == len(page_numbers)
+
+    def test_split_pdf_opens_source_once_per_worker(self):
+        outputs = self._outputs([1], [2], [3], [1, 2])
+
+        with patch(
+            'papermerge.core.lib.split.Pdf.open',
+            wraps=Pdf.open
+        ) as pdf_open:
+            split_pdf(self.src, outputs, workers=2)
+
+        assert pdf_open.call_count == 2
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from papermerge.core.lib.path import DocumentPath, PagePath
+from papermerge.core.lib.storage import FileSystemStorage
+
+
+def _write(abs_file_path, content):
+    os.makedirs(os.path.dirname(abs_file_path), exist_ok=True)
+    with open(abs_file_path, 'w') as f:
+        f.write(content)
+
+
+class TestStorageCopyPage(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.storage = FileSystemStorage(location=self.tempdir.name)
+        doc_path = DocumentPath(user_id=1, document_id=2, file_name='x.pdf')
+        self.src = PagePath(
+            document_path=DocumentPath.copy_from(doc_path, version=1),
+            page_num=1
+        )
+        self.dst = PagePath(
+            document_path=DocumentPath.copy_from(
+                doc_path, document_id=3, version=2
+            ),
+            page_num=3
+        )
+        _write(self.storage.abspath(self.src.txt_url), 'page text')
+        _write(self.storage.abspath(self.src.hocr_url), 'page hocr')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_copy_page_creates_hardlinks(self):
+        self.storage.copy_page(src=self.src, dst=self.dst)
+
+        src_txt = self.storage.abspath(self.src.txt_url)
+        dst_txt = self.storage.abspath(self.dst.txt_url)
+
+        assert os.path.samefile(src_txt, dst_txt)
+        # source, destination and the blob
+        assert os.stat(dst_txt).st_nlink == 3
+        with open(dst_txt) as f:
+            assert f.read() == 'page text'
+
+    def test_copy_page_deduplicates_identical_content(self):
+        other = PagePath(
+            document_path=DocumentPath(
+                user_id=1, document_id=5, file_name='y.pdf', version=1
+            ),
+            page_num=1
+        )
+        _write(self.storage.abspath(other.txt_url), 'page text')
+
+        self.storage.copy_page(src=self.src, dst=self.dst)
+        self.storage.copy_page(src=other, dst=self.src)
+
+        assert os.path.samefile(
+            self.storage.abspath(other.txt_url),
+            self.storage.abspath(self.dst.txt_url)
+        )
+
+    def test_collect_garbage_removes_only_unreferenced_blobs(self):
+        self.storage.copy_page(src=self.src, dst=self.dst)
+
+        # both versions still reference the blobs
+        assert self.storage.collect_garbage() == (0, 0)
+
+        self.storage.delete_doc(self.src.document_path)
+        os.unlink(self.storage.abspath(self.dst.txt_url))
+        os.unlink(self.storage.abspath(self.dst.hocr_url))
+
+        removed_count, reclaimed_bytes = self.storage.collect_garbage()
+
+        assert removed_count == 2
+        assert reclaimed_bytes == len('page text') + len('page hocr')
+
+    def test_delete_version(self):
+        doc_path = self.dst.document_path
+        _write(self.storage.abspath(doc_path), 'pdf content')
+        self.storage.copy_page(src=self.src, dst=self.dst)
+        _write(self.storage.abspath(self.dst.jpg_url), 'jpeg')
+
+        reclaimed_bytes = self.storage.delete_version(doc_path)
+
+        # shared (hardlinked) sidecars are not reclaimed
+        assert reclaimed_bytes == len('pdf content') + len('jpeg')
+        assert not os.path.exists(self.storage.abspath(doc_path))
+        assert not os.path.exists(self.storage.abspath(self.dst.txt_url))
+        # other version's sidecars are left untouched
+        assert os.path.exists(self.storage.abspath(self.src.txt_url))
+
+    def test_delete_version_requires_version(self):
+        doc_path = DocumentPath(user_id=1, document_id=2, file_name='x.pdf')
+
+        with self.assertRaises(ValueError):
+            self.storage.delete_version(doc_path)
+
+    def test_copy_page_falls_back_to_copy(self):
+        with patch('papermerge.core.lib.storage.os.link') as link:
+            link.side_effect = OSError('Invalid cross-device link')
+            self.storage.copy_page(src=self.src, dst=self.dst)
+
+        dst_txt = self.storage.abspath(self.dst.txt_url)
+        assert not os.path.samefile(
+            self.storage.abspath(self.src.txt_url),
+            dst_txt
+        )
+        with open(dst_txt) as f:
+            assert f.read() == 'page text'
@@ -0,0 +1,173 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import img2pdf
+from pikepdf import Pdf
+from PIL import Image
+
+from papermerge.core.lib.pagecount import get_pagecount
+from papermerge.core.lib.tiff import get_tiff_pagecount, tiff2pdf
+
+
+class TestTiff(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def _tiff(self, page_count, mode='1', **kwargs):
+        path = os.path.join(self.tempdir.name, 'x.tiff')
+        images = [
+            Image.new(mode, (100 + index, 50), 0)
+            for index in range(page_count)
+        ]
+        images[0].save(
+            path,
+            format='TIFF',
+            save_all=True,
+            append_images=images[1:],
+            **kwargs
+        )
+        return path
+
+    def test_get_tiff_pagecount(self):
+        assert get_tiff_pagecount(self._tiff(3)) == 3
+        assert get_tiff_pagecount(self._tiff(1)) == 1
+
+    def test_get_bigtiff_pagecount(self):
+        """Big endian BigTIFF with two (empty) image file directories"""
+        path = os.path.join(self.tempdir.name, 'x.tiff')
+        with open(path, 'wb') as f:
+            # header: byte order, version, offset size, first IFD offset
+            f.write(b'MM' + struct.pack('>HHHQ', 43, 8, 0, 16))
+            # IFDs: number of entries, next IFD offset
+            f.write(struct.pack('>QQ', 0, 32))
+            f.write(struct.pack('>QQ', 0, 0))
+
+        assert get_tiff_pagecount(path) == 2
+
+    def test_get_tiff_pagecount_does_not_decode_images(self):
+        path = self._tiff(2)
+
+        with patch('PIL.Image.open') as image_open:
+            assert get_pagecount(path) == 2
+
+        image_open.assert_not_called()
+
+    def test_not_a_tiff(self):
+        path = os.path.join(self.tempdir.name, 'x.txt')
+        with open(path, 'w') as f:
+            f.write('hello')
+
+        with self.assertRaises(ValueError):
+            get_tiff_pagecount(path)
+
+    def test_tiff2pdf(self):
+        src = self._tiff(3, compression='group4')
+        dst = os.path.join(self.tempdir.name, 'x.pdf')
+
+        tiff2pdf(src, dst)
+
+        with Pdf.open(dst) as pdf:
+            assert len(pdf.pages) == 3
+            image, = pdf.pages[0].images.values()
+            # group4 compressed image is embedded as is
+            assert list(image.Filter) == ['/CCITTFaxDecode']
+
+    def test_tiff2pdf_embeds_ccitt_strip_as_is(self):
+        src = self._tiff(1, compression='group4', dpi=(200, 200))
+        dst = os.path.join(self.tempdir.name, 'x.pdf')
+        with Image.open(src) as image:
+            offset, = image.tag_v2[273]
+            length, = image.tag_v2[279]
+        with open(src, 'rb') as f:
+            f.seek(offset)
+            strip = f.read(length)
+
+        with patch('papermerge.core.lib.tiff._encoded_image') as encode:
+            tiff2pdf(src, dst)
+
+        # page image is not decoded
+        encode.assert_not_called()
+        with Pdf.open(dst) as pdf:
+            page = pdf.pages[0]
+            image, = page.images.values()
+            assert image.read_raw_bytes() == strip
+            # 100px at 200 dpi
+            assert float(page.mediabox[2]) == 36
+
+    def test_tiff2pdf_embeds_jpeg_as_is(self):
+        path = os.path.join(self.tempdir.name, 'x.tiff')
+        Image.new('RGB', (100, 50), (200, 30, 30)).convert('YCbCr').save(
+            path,
+            format='TIFF',
+            compression='jpeg'
+        )
+        dst = os.path.join(self.tempdir.name, 'x.pdf')
+
+        with patch('papermerge.core.lib.tiff._encoded_image') as encode:
+            tiff2pdf(path, dst)
+
+        encode.assert_not_called()
+        with Pdf.open(dst) as pdf:
+            image, = pdf.pages[0].images.values()
+            assert image.Filter == '/DCTDecode'
+            raw = image.read_raw_bytes()
+        # JPEG tables and strip are joined into one JPEG stream
+        with Image.open(io.BytesIO(raw)) as jpeg:
+            assert jpeg.format == 'JPEG'
+            r, g, b = jpeg.convert('RGB').getpixel((10, 10))
+            assert r > 150 and g < 80 and b < 80
+
+    def test_tiff2pdf_reencodes_lzw_pages(self):
+        src = self._tiff(2, mode='L', compression='tiff_lzw')
+        dst = os.path.join(self.tempdir.name, 'x.pdf')
+
+        tiff2pdf(src, dst)
+
+        with Pdf.open(dst) as pdf:
+            image, = pdf.pages[0].images.values()
+            assert image.Filter == '/FlateDecode'
+
+    @patch('papermerge.core.lib.tiff.PAGES_PER_PART', 2)
+    def test_tiff2pdf_joins_pages_in_parts(self):
+        src = self._tiff(5, compression='group4')
+        dst = os.path.join(self.tempdir.name, 'x.pdf')
+
+        tiff2pdf(src, dst)
+
+        with Pdf.open(dst) as pdf:
+            widths = [
+                image.Width
+                for page in pdf.pages
+                for image in page.images.values()
+            ]
+        assert widths == [100, 101, 102, 103, 104]
+        # no page PDFs are left behind
+        assert sorted(os.listdir(self.tempdir.name)) == ['x.pdf', 'x.tiff']
+
+    def test_tiff2pdf_converts_one_page_at_a_time(self):
+        src = self._tiff(3, mode='L')
+        dst = os.path.join(self.tempdir.name, 'x.pdf')
+        convert = img2pdf.convert
+        inputs = []
+
+        def convert_page(data, **kwargs):
+            inputs.append(data)
+            return convert(data, **kwargs)
+
+        with patch('papermerge.core.lib.tiff.img2pdf.convert', convert_page):
+            tiff2pdf(src, dst)
+
+        # each call gets one decoded page only
+        assert [Image.open(io.BytesIO(data)).size for data in inputs] == [
+            (100, 50), (101, 50), (102, 50)
+        ]
+        with Pdf.open(dst) as pdf:
+            assert len(pdf.pages) == 3
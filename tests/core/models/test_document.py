@@ -4,12 +4,14 @@ from pathlib import Path
 from unittest.mock import patch
 
 import pytest
+from pikepdf import Pdf
+from PIL import Image
 from django.db.utils import IntegrityError
 from django.db import transaction
 
 from papermerge.core.storage import abs_path
 from papermerge.test import TestCase
-from papermerge.core.models import (User, Document)
+from papermerge.core.models import (User, Document, Folder)
 from papermerge.test.baker_recipes import user_recipe, folder_recipe, \
     document_recipe
 
@@ -86,6 +88,30 @@ class TestDocumentModel(TestCase):
             3
         )
 
+    def test_version_bump_query_count_does_not_depend_on_pages(self):
+        """
+        Pages of the new document version are created in bulk i.e.
+        ``doc.version_bump`` performs same number of queries
+        regardless of page count.
+        """
+        doc = Document.objects.create_document(
+            title="invoice.pdf",
+            lang="deu",
+            user_id=self.user.pk,
+            parent=self.user.home_folder
+        )
+        doc.versions.last().create_pages(page_count=3)
+        doc.version_bump()
+        # savepoint, document lock, last version, version insert,
+        # pages bulk insert, savepoint release
+        with self.assertNumQueries(6):
+            doc.version_bump()
+
+        with self.assertNumQueries(6):
+            doc.version_bump(page_count=50)
+
+        self.assertEqual(doc.versions.last().pages.count(), 50)
+
     def test_idified_title_one_dot_in_title(self):
         doc = Document.objects.create_document(
             title="invoice.pdf",
@@ -152,6 +178,42 @@ class TestDocumentModel(TestCase):
 
         payload.close()
 
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_upload_tiff(self, _1, _2):
+        """
+        Uploaded TIFF file is stored as PDF
+        """
+        doc = Document.objects.create_document(
+            title="fax.tiff",
+            lang="deu",
+            user_id=self.user.pk,
+            parent=self.user.home_folder
+        )
+        tiff_path = self.media / 'fax.tiff'
+        images = [Image.new('1', (100, 50)) for _ in range(2)]
+        images[0].save(
+            tiff_path,
+            format='TIFF',
+            save_all=True,
+            append_images=images[1:]
+        )
+
+        with open(tiff_path, 'rb') as payload:
+            doc.upload(
+                payload=payload,
+                file_path=tiff_path,
+                file_name='fax.tiff'
+            )
+        os.remove(tiff_path)
+
+        last_version = doc.versions.last()
+        assert last_version.file_name == 'fax.pdf'
+        assert last_version.page_count == 2
+        assert last_version.pages.count() == 2
+        with Pdf.open(last_version.abs_file_path()) as pdf:
+            assert len(pdf.pages) == 2
+
     @patch('papermerge.core.signals.ocr_document_task')
     @patch('papermerge.core.signals.generate_page_previews_task')
     def test_version_bump_from_pages(self, _1, _2):
@@ -187,6 +249,93 @@ class TestDocumentModel(TestCase):
         dst_doc_version = dst_doc.versions.last()
         assert dst_doc_version.pages.count() == 2
 
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_bulk_create_from_pages(self, _1, _2):
+        """
+        Extract each page of the source document into its own document
+        """
+        source_doc = Document.objects.create_document(
+            title="three-pages.pdf",
+            lang="deu",
+            user_id=self.user.pk,
+            parent=self.user.home_folder
+        )
+        payload = open(self.resources / 'three-pages.pdf', 'rb')
+        source_doc.upload(
+            payload=payload,
+            file_path=self.resources / 'three-pages.pdf',
+            file_name='three-pages.pdf'
+        )
+        payload.close()
+        src_pages = list(source_doc.versions.last().pages.all())
+        for page, text in zip(src_pages, ['one', 'two', 'three']):
+            page.text = text
+            page.save()
+
+        versions = Document.objects.bulk_create_from_pages(
+            [
+                ('first.pdf', [src_pages[0]]),
+                ('last-two.pdf', src_pages[1:]),
+            ],
+            parent=self.user.inbox_folder
+        )
+
+        assert len(versions) == 2
+        first_doc = Document.objects.get(title='first.pdf')
+        assert first_doc.parent_id == self.user.inbox_folder.pk
+        assert first_doc.ctype == 'document'
+        assert first_doc.versions.count() == 1
+        last_two = Document.objects.get(title='last-two.pdf')
+        last_two_version = last_two.versions.last()
+        assert last_two_version.text == 'two three'
+        assert [page.text for page in last_two_version.pages.all()] == [
+            'two', 'three'
+        ]
+        with Pdf.open(last_two_version.abs_file_path()) as pdf:
+            assert len(pdf.pages) == 2
+        assert last_two_version.size > 0
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_bulk_create_from_pages_query_count(self, _1, _2):
+        """
+        Number of queries does not depend on number of created documents
+        """
+        source_doc = Document.objects.create_document(
+            title="three-pages.pdf",
+            lang="deu",
+            user_id=self.user.pk,
+            parent=self.user.home_folder
+        )
+        payload = open(self.resources / 'three-pages.pdf', 'rb')
+        source_doc.upload(
+            payload=payload,
+            file_path=self.resources / 'three-pages.pdf',
+            file_name='three-pages.pdf'
+        )
+        payload.close()
+        src_pages = list(
+            source_doc.versions.last().pages.select_related(
+                'document_version__document__user'
+            )
+        )
+        inbox = Folder.objects.select_related('user').get(
+            pk=self.user.inbox_folder_id
+        )
+
+        with self.assertNumQueries(6):
+            Document.objects.bulk_create_from_pages(
+                [('a.pdf', [src_pages[0]])],
+                parent=inbox
+            )
+
+        with self.assertNumQueries(6):
+            Document.objects.bulk_create_from_pages(
+                [(f'{page.number}.pdf', [page]) for page in src_pages],
+                parent=inbox
+            )
+
     def test_two_documents_with_same_title_under_same_parent(self):
         """It should not be possible to create two documents with
         same (parent, title) pair i.e. we cannot have documents with same
@@ -1,8 +1,15 @@
 import io
+import os
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.utils import timezone
 
 from papermerge.test import TestCase
-from papermerge.core.models import (User, Document)
+from papermerge.core.models import (User, Document, DocumentVersion)
 from papermerge.test import maker
+from papermerge.core.storage import abs_path
+from papermerge.core.tasks import increment_document_version
 
 
 class TestDocumentVersionModel(TestCase):
@@ -140,6 +147,19 @@ class TestDocumentVersionModel(TestCase):
             'Page 1 Page 2 Page 3'
         )
 
+    def test_update_pages_text_in_constant_number_of_queries(self):
+        self.doc_version.create_pages(page_count=50)
+        texts = [f'Page {number}' for number in range(1, 51)]
+
+        # select pages, bulk update, save version, ``has_combined_text``
+        # plus savepoint and its release
+        with self.assertNumQueries(6):
+            self.doc_version.update_pages_text(texts)
+
+        self.doc_version.refresh_from_db()
+        assert self.doc_version.text == ' '.join(texts)
+        assert self.doc_version.pages.get(number=50).text == 'Page 50'
+
     def test_document_version_is_archived(self):
         """
         Document version is considered archived if it is NOT last version
@@ -156,6 +176,47 @@ class TestDocumentVersionModel(TestCase):
         # is not last version anymore, thus it is considered archived
         self.assertTrue(doc_version.is_archived)
 
+    def test_prunable_keep_last(self):
+        for _ in range(3):
+            self.doc.version_bump()
+
+        prunable = DocumentVersion.objects.prunable(keep_last=2)
+        assert sorted(v.number for v in prunable) == [1, 2]
+
+        prunable = DocumentVersion.objects.prunable(keep_last=10)
+        assert prunable.count() == 0
+
+    def test_prunable_older_than(self):
+        for _ in range(2):
+            self.doc.version_bump()
+        self.doc.versions.filter(number__lte=2).update(
+            created_at=timezone.now() - timedelta(days=30)
+        )
+        older_than = timezone.now() - timedelta(days=7)
+
+        prunable = DocumentVersion.objects.prunable(older_than=older_than)
+        assert sorted(v.number for v in prunable) == [1, 2]
+
+        # version is kept if any of the retention rules says so
+        prunable = DocumentVersion.objects.prunable(
+            keep_last=2,
+            older_than=older_than
+        )
+        assert [v.number for v in prunable] == [1]
+
+    def test_last_version_is_never_prunable(self):
+        self.doc.versions.update(
+            created_at=timezone.now() - timedelta(days=30)
+        )
+
+        prunable = DocumentVersion.objects.prunable(
+            keep_last=0,
+            older_than=timezone.now()
+        )
+        assert prunable.count() == 0
+        # no retention policy - nothing is pruned
+        assert DocumentVersion.objects.prunable().count() == 0
+
     def test_get_ocred_text_1_filter_by_page_numbers(self):
         doc_ver = maker.document_version(
             page_count=3,
@@ -227,3 +288,38 @@ class TestDocumentVersionModel(TestCase):
         # string as result
         expected = ""
         assert expected == actual
+
+
+class TestDocumentVersionOcrReuse(TestCase):
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_upload_sets_page_fingerprints(self, _, _x):
+        document = maker.document("s3.pdf", user=self.user)
+        fingerprints = [
+            page.fingerprint
+            for page in document.versions.last().pages.order_by('number')
+        ]
+
+        assert all(fingerprints)
+        assert len(set(fingerprints)) == 3
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_ocr_reuse_map(self, _, _x):
+        """
+        Only pages of previous version which were already OCRed
+        (i.e. have txt sidecar) can be reused
+        """
+        document = maker.document("s3.pdf", user=self.user)
+        version_1 = document.versions.last()
+        increment_document_version(document.pk)
+        version_2 = document.versions.last()
+        page_2 = version_1.pages.get(number=2)
+        txt_path = abs_path(page_2.txt_url)
+        os.makedirs(os.path.dirname(txt_path), exist_ok=True)
+        with open(txt_path, 'w') as f:
+            f.write('S2')
+
+        assert version_1.ocr_reuse_map() == {}
+        assert version_2.ocr_reuse_map() == {2: page_2}
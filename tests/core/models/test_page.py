@@ -1,7 +1,12 @@
 import io
+import os
+import threading
+from unittest.mock import patch
+
+from django.core.cache import cache
 
 from papermerge.test import TestCase
-from papermerge.core.models import (User, Document)
+from papermerge.core.models import (User, Document, Page)
 
 
 class TestDocumentModel(TestCase):
@@ -62,3 +67,55 @@ class TestDocumentModel(TestCase):
         # previously non-archived pages now are archived.
         self.assertTrue(pages[0].is_archived)  # belongs to non-last doc version
         self.assertTrue(pages[1].is_archived)  # belongs to non-last doc version
+
+    @patch('papermerge.core.models.page.page_previews_prefetch')
+    def test_get_jpeg_prefetches_missing_previews_of_next_pages(
+        self, prefetch
+    ):
+        self.doc_version.create_pages(page_count=4)
+        page_1, page_2, page_3, _ = self.doc_version.pages.all()
+        for page in (page_1, page_3):
+            self._preview(page)
+
+        page_1.get_jpeg()
+
+        prefetch.send.assert_called_once_with(
+            sender=Page,
+            document_version=page_1.document_version,
+            page_numbers=[2],
+            size=None
+        )
+
+    @patch('papermerge.core.models.page.page_previews_prefetch')
+    def test_get_jpeg_does_not_prefetch_past_last_page(self, prefetch):
+        self.doc_version.create_pages(page_count=1)
+        page = self.doc_version.pages.first()
+        self._preview(page)
+
+        page.get_jpeg()
+
+        prefetch.send.assert_not_called()
+
+    @patch('papermerge.core.models.page.Page._render_preview')
+    def test_generate_preview_waits_for_concurrent_render(self, render):
+        self.doc_version.create_pages(page_count=1)
+        page = self.doc_version.pages.first()
+        preview_path = page.preview_abs_path()
+
+        # another request is rendering the same preview
+        cache.add(f"preview-render:{preview_path}", 1)
+        timer = threading.Timer(0.2, self._preview, args=(page,))
+        timer.start()
+        try:
+            assert page.generate_preview() == preview_path
+        finally:
+            timer.join()
+            cache.delete(f"preview-render:{preview_path}")
+
+        render.assert_not_called()
+
+    def _preview(self, page):
+        path = page.preview_abs_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'jpeg')
@@ -2,6 +2,7 @@ import uuid
 import pytest
 
 from papermerge.core.models.utils import (
+    bulk_insert_child_rows,
     uuid2raw_str,
     get_by_breadcrumb
 )
@@ -61,3 +62,32 @@ def test_get_by_breadcrumb_document():
     found = get_by_breadcrumb(Document, '.home/document.pdf', user)
     assert found is not None
     assert found.title == 'document.pdf'
+
+
+@pytest.mark.django_db
+def test_bulk_insert_child_rows():
+    """
+    Inserts child table rows of documents whose node rows already exist
+    """
+    user = user_recipe.make()
+    doc = Document(
+        title='invoice.pdf',
+        parent=user.home_folder,
+        user=user,
+        ctype='document'
+    )
+    doc.basetreenode_ptr_id = doc.id
+    BaseTreeNode.objects.bulk_create([
+        BaseTreeNode(**{
+            field.attname: getattr(doc, field.attname)
+            for field in BaseTreeNode._meta.concrete_fields
+        })
+    ])
+
+    bulk_insert_child_rows(Document, [doc])
+
+    assert not doc._state.adding
+    found = Document.objects.get(pk=doc.pk)
+    assert found.title == 'invoice.pdf'
+    assert found.ocr == doc.ocr
+    assert found.ocr_status == doc.ocr_status
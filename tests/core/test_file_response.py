@@ -0,0 +1,116 @@
+import os
+import tempfile
+
+from django.conf import settings as django_settings
+from django.http import FileResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from papermerge.core.file_response import (
+    RangeNotSatisfiable,
+    byte_range,
+    file_response
+)
+
+
+class TestFileResponse(SimpleTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory(
+            dir=django_settings.MEDIA_ROOT
+        )
+        self.path = os.path.join(self.tempdir.name, 'invoice.pdf')
+        with open(self.path, 'wb') as f:
+            f.write(b'%PDF-1.7')
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_file_response_streams_file(self):
+        response = file_response(
+            self.path, content_type='application/pdf', filename='invoice.pdf'
+        )
+
+        assert isinstance(response, FileResponse)
+        assert response.getvalue() == b'%PDF-1.7'
+        assert response['Content-Disposition'] == (
+            'attachment; filename="invoice.pdf"'
+        )
+
+    @override_settings(
+        PAPERMERGE_SENDFILE_BACKEND='x-accel-redirect',
+        PAPERMERGE_SENDFILE_URL='/_protected/'
+    )
+    def test_file_response_x_accel_redirect(self):
+        response = file_response(self.path, content_type='application/pdf')
+        relative_path = os.path.relpath(
+            self.path, django_settings.MEDIA_ROOT
+        )
+
+        assert response['X-Accel-Redirect'] == f'/_protected/{relative_path}'
+        assert response.content == b''
+
+    @override_settings(PAPERMERGE_SENDFILE_BACKEND='x-sendfile')
+    def test_file_response_x_sendfile(self):
+        response = file_response(
+            self.path, content_type='application/pdf', filename='ä.pdf'
+        )
+
+        assert response['X-Sendfile'] == self.path
+        assert response['Content-Disposition'] == (
+            "attachment; filename*=utf-8''%C3%A4.pdf"
+        )
+
+    @override_settings(PAPERMERGE_SENDFILE_BACKEND='x-sendfile')
+    def test_file_response_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            file_response('/no/such/file.pdf', content_type='application/pdf')
+
+    def test_byte_range(self):
+        assert byte_range('bytes=0-3', 8) == (0, 3)
+        assert byte_range('bytes=5-', 8) == (5, 7)
+        assert byte_range('bytes=-2', 8) == (6, 7)
+        assert byte_range('bytes=2-100', 8) == (2, 7)
+        # multiple ranges and invalid values are ignored
+        assert byte_range('bytes=0-1,4-5', 8) is None
+        assert byte_range('bytes=3-1', 8) is None
+        assert byte_range('items=0-1', 8) is None
+        with self.assertRaises(RangeNotSatisfiable):
+            byte_range('bytes=8-', 8)
+
+    def test_file_response_range(self):
+        request = self.factory.get('/', HTTP_RANGE='bytes=1-3')
+
+        response = file_response(
+            self.path, content_type='application/pdf', request=request
+        )
+
+        assert response.status_code == 206
+        assert response.getvalue() == b'PDF'
+        assert response['Content-Range'] == 'bytes 1-3/8'
+        assert response['Content-Length'] == '3'
+
+    def test_file_response_range_not_satisfiable(self):
+        request = self.factory.get('/', HTTP_RANGE='bytes=100-')
+
+        response = file_response(
+            self.path, content_type='application/pdf', request=request
+        )
+
+        assert response.status_code == 416
+        assert response['Content-Range'] == 'bytes */8'
+
+    def test_file_response_range_if_range_mismatch(self):
+        request = self.factory.get(
+            '/', HTTP_RANGE='bytes=1-3', HTTP_IF_RANGE='"old"'
+        )
+
+        response = file_response(
+            self.path,
+            content_type='application/pdf',
+            request=request,
+            etag='"new"'
+        )
+
+        assert response.status_code == 200
+        assert response.getvalue() == b'%PDF-1.7'
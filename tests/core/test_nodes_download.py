@@ -1,10 +1,17 @@
+import io
+import tarfile
+import zipfile
+from unittest.mock import patch
+
 from django.test import TestCase
 
-from papermerge.core.models import Document, User
+from papermerge.test import maker
+from papermerge.core.models import Document, Folder, User
 from papermerge.core.serializers.node import (
     NodesDownloadSerializer,
     TARGZ
 )
+from papermerge.core.storage import abs_path
 from papermerge.core.nodes_download import (
     get_nodes_download,
     NodesDownloadDocument,
@@ -83,3 +90,89 @@ class TestNodesDownload(TestCase):
             # should never reach this place as serialized data is
             # expected to be valid
             self.assertTrue(False)
+
+
+class TestNodesDownloadArchives(TestCase):
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def setUp(self, _, _x):
+        self.user = User.objects.create_user(username="user1")
+        self.folder = Folder.objects.create(
+            title="My Invoices",
+            user=self.user,
+            parent=self.user.home_folder
+        )
+        self.doc_1 = maker.document("s3.pdf", user=self.user)
+        self.doc_2 = maker.document("three-pages.pdf", user=self.user)
+        self.doc_2.parent = self.folder
+        self.doc_2.save()
+        self.expected = {
+            self.doc_1.idified_title: self._file_content(self.doc_1),
+            f'{self.folder.idified_title}/{self.doc_2.idified_title}':
+                self._file_content(self.doc_2)
+        }
+
+    def _file_content(self, doc):
+        with open(abs_path(doc.versions.last().document_path), 'rb') as f:
+            return f.read()
+
+    def test_zip_streaming_content(self):
+        download = NodesDownloadZip(node_ids=[self.doc_1.id, self.folder.id])
+
+        data = b''.join(download.streaming_content())
+
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            assert {
+                name: archive.read(name) for name in archive.namelist()
+            } == self.expected
+
+    def test_targz_streaming_content(self):
+        download = NodesDownloadTarGz(
+            node_ids=[self.doc_1.id, self.folder.id]
+        )
+
+        data = b''.join(download.streaming_content())
+
+        with tarfile.open(fileobj=io.BytesIO(data), mode='r:gz') as archive:
+            assert {
+                member.name: archive.extractfile(member).read()
+                for member in archive.getmembers()
+            } == self.expected
+
+    def test_progress_is_reported_per_document(self):
+        progress = []
+        download = NodesDownloadZip(
+            node_ids=[self.doc_1.id, self.folder.id],
+            progress=progress.append
+        )
+
+        b''.join(download.streaming_content())
+
+        assert progress == [1, 2]
+        assert download.entries_count == 2
+
+    def test_archive_entries_use_constant_number_of_queries(self):
+        subfolder = Folder.objects.create(
+            title="2023",
+            user=self.user,
+            parent=self.folder
+        )
+        for number in range(3):
+            Document.objects.create_document(
+                title=f"scan-{number}.pdf",
+                lang="deu",
+                user_id=self.user.pk,
+                parent=subfolder
+            )
+        self.doc_2.versions.create(number=2, file_name="three-pages.pdf")
+        download = NodesDownloadZip(node_ids=[self.doc_1.id, self.folder.id])
+
+        with self.assertNumQueries(1):
+            entries = list(download.archive_entries())
+
+        assert len(entries) == 5
+        assert (
+            self.doc_2.versions.last().abs_file_path(),
+            f'{self.folder.idified_title}/{self.doc_2.idified_title}'
+        ) in entries
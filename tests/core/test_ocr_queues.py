@@ -0,0 +1,180 @@
+import threading
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from celery.exceptions import Retry
+
+from papermerge.test import TestCase
+from papermerge.test import maker
+from papermerge.core.checks import ocr_user_slots_check
+from papermerge.core.ocr.queues import (
+    USER_SLOT_TIMEOUT,
+    _user_slot_key,
+    acquire_user_slot,
+    ocr_queue,
+    release_user_slot,
+    route_ocr_task,
+    user_slot
+)
+from papermerge.core.tasks import ocr_document_task
+
+OCR_QUEUES = [
+    ('ocr_small', 1),
+    ('ocr_large', 10),
+    ('ocr_bulk', None)
+]
+
+
+@override_settings(PAPERMERGE_OCR_QUEUES=OCR_QUEUES)
+class TestOcrQueues(TestCase):
+
+    def test_ocr_queue(self):
+        assert ocr_queue(1) == 'ocr_small'
+        assert ocr_queue(2) == 'ocr_large'
+        assert ocr_queue(10) == 'ocr_large'
+        assert ocr_queue(600) == 'ocr_bulk'
+
+    @override_settings(PAPERMERGE_OCR_QUEUES=None)
+    def test_ocr_queue_not_configured(self):
+        assert ocr_queue(1) is None
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_route_ocr_document_task(self, _, _x):
+        document = maker.document("s3.pdf", user=self.user)
+
+        route = route_ocr_task(
+            ocr_document_task.name,
+            args=(),
+            kwargs={'document_id': str(document.pk)},
+            options={}
+        )
+
+        assert route == {'queue': 'ocr_large'}
+
+    def test_route_ocr_page_range_task(self):
+        route = route_ocr_task(
+            'papermerge.core.tasks.ocr_page_range_task',
+            args=(),
+            kwargs={'first': 3, 'last': 3},
+            options={}
+        )
+
+        assert route == {'queue': 'ocr_small'}
+
+    def test_other_tasks_are_not_routed(self):
+        route = route_ocr_task(
+            'papermerge.core.tasks.delete_user_data',
+            args=(),
+            kwargs={},
+            options={}
+        )
+
+        assert route is None
+
+
+@override_settings(PAPERMERGE_OCR_USER_MAX_CONCURRENCY=2)
+class TestUserSlots(TestCase):
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_acquire_user_slot(self):
+        assert acquire_user_slot(self.user.pk)
+        assert acquire_user_slot(self.user.pk)
+        assert not acquire_user_slot(self.user.pk)
+        # slots are per user
+        assert acquire_user_slot('other-user')
+
+        release_user_slot(self.user.pk)
+        assert acquire_user_slot(self.user.pk)
+
+    def test_acquire_user_slot_when_counter_expires(self):
+        key = _user_slot_key(self.user.pk)
+        add = cache.add
+
+        def expiring_add(*args, **kwargs):
+            # slot counter expires right after (failed) ``cache.add``
+            if cache.delete(key):
+                return False
+            return add(*args, **kwargs)
+
+        acquire_user_slot(self.user.pk)
+        with patch.object(cache, 'add', side_effect=expiring_add):
+            assert acquire_user_slot(self.user.pk)
+
+        assert cache.get(key) == 1
+
+    @override_settings(PAPERMERGE_OCR_USER_MAX_CONCURRENCY=None)
+    def test_no_limit(self):
+        for _ in range(10):
+            assert acquire_user_slot(self.user.pk)
+
+    def test_user_slot_retries_task(self):
+        acquire_user_slot(self.user.pk)
+        acquire_user_slot(self.user.pk)
+
+        with patch.object(
+            ocr_document_task,
+            'retry',
+            return_value=Retry()
+        ) as retry:
+            with self.assertRaises(Retry):
+                with user_slot(ocr_document_task, self.user.pk):
+                    pass
+
+        retry.assert_called_once()
+
+    def test_user_slot_is_released(self):
+        with self.assertRaises(ValueError):
+            with user_slot(ocr_document_task, self.user.pk):
+                raise ValueError()
+
+        assert acquire_user_slot(self.user.pk)
+        assert acquire_user_slot(self.user.pk)
+
+    def test_acquire_user_slot_refreshes_counter(self):
+        with patch.object(cache, 'touch') as touch:
+            acquire_user_slot(self.user.pk)
+
+        touch.assert_called_once_with(
+            _user_slot_key(self.user.pk),
+            timeout=USER_SLOT_TIMEOUT
+        )
+
+    def test_user_slot_refreshes_counter_while_taken(self):
+        touched = threading.Event()
+
+        with patch(
+            'papermerge.core.ocr.queues.USER_SLOT_REFRESH_INTERVAL',
+            0.01
+        ), patch.object(
+            cache,
+            'touch',
+            side_effect=lambda *args, **kwargs: touched.set()
+        ):
+            with user_slot(ocr_document_task, self.user.pk):
+                assert touched.wait(1)
+
+    def test_release_user_slot_is_clamped_at_zero(self):
+        key = _user_slot_key(self.user.pk)
+        cache.set(key, 0)
+
+        release_user_slot(self.user.pk)
+
+        assert cache.get(key) == 0
+
+    def test_ocr_user_slots_check(self):
+        assert len(ocr_user_slots_check(None)) == 1
+
+        with override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': 'redis://127.0.0.1:6379',
+            }
+        }):
+            assert ocr_user_slots_check(None) == []
+
+        with override_settings(PAPERMERGE_OCR_USER_MAX_CONCURRENCY=None):
+            assert ocr_user_slots_check(None) == []
@@ -0,0 +1,366 @@
+import os
+from unittest.mock import patch
+
+from django.test import override_settings
+from pikepdf import Pdf
+
+from papermerge.test import TestCase
+from papermerge.test import maker
+from papermerge.test.utils import pdf_content
+from papermerge.core.lib.path import DocumentPath
+from papermerge.core.models import DocumentVersion
+from papermerge.core.ocr.document import (
+    merge_page_ranges,
+    ocr_page_range,
+    page_range_paths,
+    page_ranges
+)
+from papermerge.core.storage import abs_path
+from papermerge.core.tasks import (
+    compact_document_versions,
+    compact_document_versions_task,
+    increment_document_version,
+    ocr_document_task,
+    ocr_page_ranges_complete_task,
+    reuse_ocr_sidecars,
+    update_document_pages
+)
+from papermerge.core.views.utils import remove_pdf_pages
+
+
+class TestCompactDocumentVersions(TestCase):
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_compact_document_versions(self, _, _x):
+        document = maker.document("s3.pdf", user=self.user)
+        version_1 = document.versions.last()
+        version_2 = document.version_bump(page_count=2)
+        remove_pdf_pages(
+            old_version=version_1,
+            new_version=version_2,
+            page_numbers=[1]
+        )
+        version_3 = document.version_bump(page_count=1)
+        remove_pdf_pages(
+            old_version=version_2,
+            new_version=version_3,
+            page_numbers=[2]
+        )
+
+        pruned_count, reclaimed_bytes = compact_document_versions(
+            keep_last=1,
+            batch_size=1
+        )
+
+        assert pruned_count == 2
+        assert reclaimed_bytes > 0
+        assert list(document.versions.all()) == [version_3]
+        for version in (version_1, version_2):
+            assert not os.path.exists(
+                abs_path(version.document_path.url)
+            )
+        assert pdf_content(version_3, clean=True) == "S2"
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    @override_settings(PAPERMERGE_LAZY_PDF_VERSIONS=True)
+    def test_compact_materializes_lazy_versions(self, _, _x):
+        """
+        Kept lazy version whose manifest references pruned
+        version is materialized before pruned version is deleted
+        """
+        document = maker.document("s3.pdf", user=self.user)
+        version_1 = document.versions.last()
+        version_2 = document.version_bump(page_count=2)
+        remove_pdf_pages(
+            old_version=version_1,
+            new_version=version_2,
+            page_numbers=[1]
+        )
+        version_2.refresh_from_db()
+        assert version_2.is_lazy
+
+        pruned_count, _ = compact_document_versions(keep_last=1)
+
+        assert pruned_count == 1
+        assert not DocumentVersion.objects.filter(pk=version_1.pk).exists()
+        version_2.refresh_from_db()
+        assert not version_2.is_lazy
+        assert pdf_content(version_2, clean=True) == "S2 S3"
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_compact_task_keeps_everything_by_default(self, _, _x):
+        document = maker.document("s3.pdf", user=self.user)
+        document.version_bump()
+
+        compact_document_versions_task()
+
+        assert document.versions.count() == 2
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    @override_settings(PAPERMERGE_VERSION_RETENTION_MAX_AGE=0)
+    def test_compact_task_max_age(self, _, _x):
+        document = maker.document("s3.pdf", user=self.user)
+        document.version_bump()
+        document.version_bump()
+
+        compact_document_versions_task()
+
+        assert [v.number for v in document.versions.all()] == [3]
+
+
+class TestIncrementalOcr(TestCase):
+
+    def _ocr_page(self, page, text):
+        txt_path = abs_path(page.txt_url)
+        os.makedirs(os.path.dirname(txt_path), exist_ok=True)
+        with open(txt_path, 'w') as f:
+            f.write(text)
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    @patch('papermerge.core.tasks.ocr_document')
+    def test_ocr_document_task_skips_reused_pages(self, ocr_document, _, _x):
+        document = maker.document("s3.pdf", user=self.user)
+        version_1 = document.versions.last()
+        increment_document_version(document.pk)
+        self._ocr_page(version_1.pages.get(number=2), 'S2')
+
+        ocr_document_task(document.pk, lang='deu', user_id=self.user.pk)
+
+        kwargs = ocr_document.call_args.kwargs
+        assert kwargs['pages'] == [1, 3]
+        assert kwargs['reused_pages'] == [
+            (2, version_1.abs_file_path(), 2)
+        ]
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    @patch('papermerge.core.tasks.ocr_document')
+    def test_ocr_document_task_without_previous_version(
+        self, ocr_document, _, _x
+    ):
+        document = maker.document("s3.pdf", user=self.user)
+
+        ocr_document_task(document.pk, lang='deu', user_id=self.user.pk)
+
+        kwargs = ocr_document.call_args.kwargs
+        assert kwargs['pages'] is None
+        assert kwargs['reused_pages'] is None
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_reuse_ocr_sidecars(self, _, _x):
+        document = maker.document("s3.pdf", user=self.user)
+        version_1 = document.versions.last()
+        self._ocr_page(version_1.pages.get(number=3), 'S3')
+        increment_document_version(document.pk)
+        version_2 = document.versions.last()
+        reuse_map = {3: version_1.pages.get(number=3)}
+
+        reuse_ocr_sidecars(document.pk, reuse_map)
+        update_document_pages(document.pk)
+
+        version_2.refresh_from_db()
+        assert version_2.pages.get(number=3).text == 'S3'
+        assert version_2.pages.get(number=1).text == ''
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_update_document_pages(self, _, _x):
+        document = maker.document("s3.pdf", user=self.user)
+        version = document.versions.last()
+        self._ocr_page(version.pages.get(number=1), 'S1')
+        self._ocr_page(version.pages.get(number=2), 'S2')
+
+        update_document_pages(document.pk)
+
+        version.refresh_from_db()
+        assert version.text == 'S1 S2'
+        assert [page.text for page in version.pages.all()] == [
+            'S1', 'S2', ''
+        ]
+
+
+class TestOcrFanOut(TestCase):
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    @override_settings(PAPERMERGE_OCR_FAN_OUT_PAGE_COUNT=2)
+    def test_ocr_document_task_fans_out(self, _, _x):
+        document = maker.document("s3.pdf", user=self.user)
+
+        with patch.object(ocr_document_task, 'replace') as replace:
+            ocr_document_task(document.pk, lang='deu', user_id=self.user.pk)
+
+        sig = replace.call_args.args[0]
+        assert [
+            (task.kwargs['first'], task.kwargs['last'], task.kwargs['pages'])
+            for task in sig.tasks
+        ] == [(1, 2, [1, 2]), (3, 3, [3])]
+        assert sig.body.task == ocr_page_ranges_complete_task.name
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    @patch('papermerge.core.tasks.ocr_document')
+    @override_settings(PAPERMERGE_OCR_FAN_OUT_PAGE_COUNT=2)
+    def test_ocr_document_task_small_document(self, ocr_document, _, _x):
+        """
+        Document with reused pages is fanned out only if number
+        of pages to OCR exceeds the threshold
+        """
+        document = maker.document("s3.pdf", user=self.user)
+        version_1 = document.versions.last()
+        increment_document_version(document.pk)
+        page_2 = version_1.pages.get(number=2)
+        txt_path = abs_path(page_2.txt_url)
+        os.makedirs(os.path.dirname(txt_path), exist_ok=True)
+        with open(txt_path, 'w') as f:
+            f.write('S2')
+
+        with patch.object(ocr_document_task, 'replace') as replace:
+            ocr_document_task(document.pk, lang='deu', user_id=self.user.pk)
+
+        replace.assert_not_called()
+        assert ocr_document.call_args.kwargs['pages'] == [1, 3]
+
+    def _page_range_outputs(self, version):
+        """
+        Writes outputs of two OCRed page ranges (1-1 and 2-3) of
+        ``version``; pages of the second range are in reversed order
+        """
+        target_doc_path = DocumentPath.copy_from(
+            version.document_path,
+            version=version.number + 1
+        )
+        for (first, last), reverse in (((1, 1), False), ((2, 3), True)):
+            output_document, sidecars_dir = page_range_paths(
+                target_doc_path, first, last
+            )
+            os.makedirs(os.path.dirname(output_document))
+            with Pdf.open(version.abs_file_path()) as pdf, \
+                    Pdf.new() as range_pdf:
+                # range output contains pages of the range only
+                range_pdf.pages.extend(pdf.pages[first - 1:last])
+                if reverse:
+                    range_pdf.pages.reverse()
+                range_pdf.save(output_document)
+            for number in range(first, last + 1):
+                os.makedirs(os.path.join(sidecars_dir, f"{number:06d}"))
+
+        return target_doc_path, output_document
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_merge_page_ranges(self, _, _x):
+        document = maker.document("s3.pdf", user=self.user)
+        version = document.versions.last()
+        target_doc_path, output_document = self._page_range_outputs(version)
+
+        merged = merge_page_ranges(
+            user_id=self.user.pk,
+            document_id=document.pk,
+            file_name=version.file_name,
+            version=version.number,
+            target_version=version.number + 1
+        )
+        increment_document_version(document.pk)
+
+        assert merged
+        assert pdf_content(document.versions.last(), clean=True) == "S1 S3 S2"
+        sidecars_dir = abs_path(target_doc_path.dirname_sidecars())
+        assert sorted(os.listdir(sidecars_dir)) == [
+            '000001', '000002', '000003'
+        ]
+        assert not os.path.exists(
+            os.path.dirname(os.path.dirname(output_document))
+        )
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_merge_page_ranges_keeps_reused_pages(self, _, _x):
+        """
+        Reused page inside of second range is taken from its source,
+        not from range output (which has it not OCRed)
+        """
+        document = maker.document("s3.pdf", user=self.user)
+        version = document.versions.last()
+        self._page_range_outputs(version)
+
+        merge_page_ranges(
+            user_id=self.user.pk,
+            document_id=document.pk,
+            file_name=version.file_name,
+            version=version.number,
+            target_version=version.number + 1,
+            # page 3 is reused from page 1 of the current version
+            reused_pages=[(3, version.abs_file_path(), 1)]
+        )
+        increment_document_version(document.pk)
+
+        assert pdf_content(document.versions.last(), clean=True) == "S1 S3 S1"
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    @patch('papermerge.core.ocr.document.ocrmypdf.ocr')
+    def test_ocr_page_range(self, ocr, _, _x):
+        """
+        Only pages of the range are OCRed; sidecars are named after
+        page numbers of the document
+        """
+        document = maker.document("s3.pdf", user=self.user)
+        version = document.versions.last()
+        inputs = []
+
+        def fake_ocr(input_document, output_document, **kwargs):
+            with Pdf.open(input_document) as pdf:
+                inputs.append((len(pdf.pages), kwargs['pages']))
+                pdf.save(output_document)
+            for number in kwargs['pages'].split(','):
+                page_dir = os.path.join(
+                    kwargs['sidecar_dir'], f"{int(number):06d}"
+                )
+                os.makedirs(page_dir)
+                open(
+                    os.path.join(page_dir, f"{int(number):06d}_ocr.svg"), 'w'
+                ).close()
+
+        ocr.side_effect = fake_ocr
+
+        ocr_page_range(
+            user_id=self.user.pk,
+            document_id=document.pk,
+            file_name=version.file_name,
+            lang='deu',
+            version=version.number,
+            target_version=version.number + 1,
+            first=2,
+            last=3,
+            pages=[3]
+        )
+
+        # pages 2 and 3 are extracted, page 3 is the second one
+        assert inputs == [(2, '2')]
+        target_doc_path = DocumentPath.copy_from(
+            version.document_path,
+            version=version.number + 1
+        )
+        output_document, sidecars_dir = page_range_paths(
+            target_doc_path, 2, 3
+        )
+        with Pdf.open(output_document) as pdf:
+            assert len(pdf.pages) == 2
+        assert os.listdir(os.path.dirname(output_document)) == [
+            os.path.basename(output_document)
+        ]
+        assert os.listdir(sidecars_dir) == ['000003']
+        assert os.listdir(os.path.join(sidecars_dir, '000003')) == [
+            '000003_ocr.svg'
+        ]
+
+    def test_page_ranges(self):
+        assert page_ranges(5, 2) == [(1, 2), (3, 4), (5, 5)]
+        assert page_ranges(4, 4) == [(1, 4)]
@@ -0,0 +1,122 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from papermerge.core.ocr.document import _ocrmypdf
+from papermerge.core.ocr.text_layer import (
+    TextLayerPage,
+    text_layer_pages,
+    write_sidecars
+)
+
+RESOURCES = Path(__file__).parent.parent / 'resources'
+
+
+class TestTextLayer(SimpleTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.s3 = str(RESOURCES / 's3.pdf')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    @override_settings(PAPERMERGE_OCR_TEXT_LAYER_MIN_CHARS=2)
+    def test_text_layer_pages(self):
+        pages = text_layer_pages(self.s3)
+
+        assert sorted(pages) == [1, 2, 3]
+        assert pages[1].text == 'S1'
+        word, = pages[1].lines[0]
+        # word is in the top left corner of A4 page (150 DPI)
+        assert 0 < word.x1 < word.x2 < pages[1].width / 2
+        assert 0 < word.y1 < word.y2 < pages[1].height / 2
+
+    @override_settings(PAPERMERGE_OCR_TEXT_LAYER_MIN_CHARS=2)
+    def test_text_layer_pages_subset(self):
+        pages = text_layer_pages(self.s3, pages=[3])
+
+        assert list(pages) == [3]
+        assert pages[3].text == 'S3'
+
+    def test_too_little_text(self):
+        assert text_layer_pages(self.s3) == {}
+
+    def test_scans_are_not_text_layer_pages(self):
+        """Text layer of scanned pages was created by OCR, they are OCRed"""
+        pages = text_layer_pages(str(RESOURCES / 'three-pages.pdf'))
+
+        assert pages == {}
+
+    @override_settings(PAPERMERGE_OCR_TEXT_LAYER_MIN_CHARS=None)
+    def test_disabled(self):
+        assert text_layer_pages(self.s3) == {}
+
+    @override_settings(PAPERMERGE_OCR_TEXT_LAYER_MIN_CHARS=2)
+    @patch('papermerge.core.ocr.text_layer.convert_from_path')
+    def test_write_sidecars(self, convert_from_path):
+        convert_from_path.return_value = [Image.new('RGB', (1240, 1754))]
+        page = text_layer_pages(self.s3, pages=[2])[2]
+
+        write_sidecars(
+            file_path=self.s3,
+            page=page,
+            sidecars_dir=self.tempdir.name,
+            preview_width=300
+        )
+
+        page_dir = os.path.join(self.tempdir.name, '000002')
+        with open(os.path.join(page_dir, '000002_ocr_hocr.txt')) as f:
+            assert f.read() == 'S2'
+        with open(os.path.join(page_dir, '000002_ocr_hocr.hocr')) as f:
+            assert "class=\"ocrx_word\"" in f.read()
+        with open(os.path.join(page_dir, '000002_ocr.svg')) as f:
+            assert 'S2</text>' in f.read()
+        with Image.open(os.path.join(page_dir, '000002_ocr.jpg')) as image:
+            assert image.size[0] == 300
+
+    @patch('papermerge.core.ocr.document.ocrmypdf.ocr')
+    @patch('papermerge.core.ocr.document.write_sidecars')
+    @patch('papermerge.core.ocr.document.text_layer_pages')
+    def test_ocrmypdf_skips_text_layer_pages(
+        self,
+        text_layer_pages,
+        write_sidecars,
+        ocr
+    ):
+        text_layer_pages.return_value = {
+            2: TextLayerPage(number=2, width=10, height=10, lines=[])
+        }
+
+        _ocrmypdf(
+            input_document=self.s3,
+            output_document=os.path.join(self.tempdir.name, 'x.pdf'),
+            sidecars_dir=self.tempdir.name,
+            lang='deu',
+            preview_width=300
+        )
+
+        write_sidecars.assert_called_once()
+        assert ocr.call_args.kwargs['pages'] == '1,3'
+
+    @override_settings(PAPERMERGE_OCR_TEXT_LAYER_MIN_CHARS=2)
+    @patch('papermerge.core.ocr.document.ocrmypdf.ocr')
+    @patch('papermerge.core.ocr.document.write_sidecars')
+    def test_ocrmypdf_born_digital_document(self, write_sidecars, ocr):
+        output_document = os.path.join(self.tempdir.name, 'x.pdf')
+
+        _ocrmypdf(
+            input_document=self.s3,
+            output_document=output_document,
+            sidecars_dir=self.tempdir.name,
+            lang='deu',
+            preview_width=300
+        )
+
+        ocr.assert_not_called()
+        assert write_sidecars.call_count == 3
+        assert os.path.exists(output_document)
@@ -9,6 +9,7 @@ from model_bakery import baker
 
 from papermerge.test import maker
 from papermerge.core.storage import abs_path
+from papermerge.core.tasks import increment_document_version
 
 
 class DownloadDocumentVersionAnonymousAccess(TestCase):
@@ -83,4 +84,39 @@ class DownloadDocumentVersionOnlyOwner(TestCase):
         with open(abs_path(doc_ver.document_path.path), 'rb') as file:
             expected_content = file.read()
             # entire document was downloaded
-            assert len(response.content) == len(expected_content)
+            assert len(response.getvalue()) == len(expected_content)
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_download_document_version_conditional_get(self, _1, _2):
+        doc = maker.document(
+            "s3.pdf",
+            user=self.owner
+        )
+        doc_ver = doc.versions.last()
+        url = reverse('download-document-version', args=(doc_ver.pk,))
+
+        response = self.client_owner.get(url)
+        assert response['Cache-Control'] == 'private, no-cache'
+
+        response = self.client_owner.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        assert response.status_code == 304
+        assert response.content == b''
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_download_archived_document_version_is_immutable(self, _1, _2):
+        doc = maker.document(
+            "s3.pdf",
+            user=self.owner
+        )
+        doc_ver = doc.versions.last()
+        increment_document_version(doc.pk)
+        url = reverse('download-document-version', args=(doc_ver.pk,))
+
+        response = self.client_owner.get(url)
+
+        assert response.status_code == 200
+        assert 'immutable' in response['Cache-Control']
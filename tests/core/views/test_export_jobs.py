@@ -0,0 +1,220 @@
+import io
+import os
+import zipfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from papermerge.test import maker
+from papermerge.core.models import ExportJob, Folder, User
+from papermerge.core.models.export_job import (
+    EXPORT_STATUS_FAILED,
+    EXPORT_STATUS_SUCCEEDED
+)
+from papermerge.core.tasks import (
+    delete_expired_export_jobs_task,
+    export_nodes_task
+)
+
+
+class TestExportJobs(TestCase):
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def setUp(self, _, _x):
+        self.user = User.objects.create_user(username="user1")
+        self.folder = Folder.objects.create(
+            title="My Invoices",
+            user=self.user,
+            parent=self.user.home_folder
+        )
+        self.doc_1 = maker.document("s3.pdf", user=self.user)
+        self.doc_2 = maker.document("three-pages.pdf", user=self.user)
+        self.doc_2.parent = self.folder
+        self.doc_2.save()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _export(self, **data):
+        return self.client.post(
+            reverse('nodes-export'),
+            data={
+                'node_ids': [str(self.doc_1.id), str(self.folder.id)],
+                **data
+            },
+            format='json'
+        )
+
+    def _run(self, job_id):
+        with patch('papermerge.core.signals.channel_group_notify'):
+            return export_nodes_task(
+                export_job_id=str(job_id),
+                user_id=str(self.user.id)
+            )
+
+    @patch('papermerge.core.views.export_jobs.export_nodes_task')
+    def test_export_is_queued(self, export_nodes_task):
+        response = self._export()
+
+        assert response.status_code == 202
+        job = ExportJob.objects.get(pk=response.data['id'])
+        assert response.data['status'] == 'pending'
+        assert response.data['download_url'] is None
+        export_nodes_task.apply_async.assert_called_once_with(
+            kwargs={
+                'export_job_id': str(job.id),
+                'user_id': str(self.user.id)
+            }
+        )
+
+    @patch('papermerge.core.views.export_jobs.export_nodes_task')
+    def test_identical_export_is_deduplicated(self, export_nodes_task):
+        first = self._export()
+        # same nodes in different order
+        second = self.client.post(
+            reverse('nodes-export'),
+            data={'node_ids': [str(self.folder.id), str(self.doc_1.id)]},
+            format='json'
+        )
+        other = self._export(archive_type='targz')
+
+        assert second.status_code == 200
+        assert second.data['id'] == first.data['id']
+        assert other.status_code == 202
+        assert other.data['id'] != first.data['id']
+        assert export_nodes_task.apply_async.call_count == 2
+
+    @patch('papermerge.core.views.export_jobs.export_nodes_task')
+    def test_finished_export_is_not_reused(self, _):
+        first = self._export()
+        ExportJob.objects.filter(pk=first.data['id']).update(
+            status=EXPORT_STATUS_FAILED
+        )
+
+        second = self._export()
+
+        assert second.status_code == 202
+        assert second.data['id'] != first.data['id']
+
+    @patch('papermerge.core.views.export_jobs.export_nodes_task')
+    def test_export_of_other_users_nodes(self, export_nodes_task):
+        other = User.objects.create_user(username="user2")
+        client = APIClient()
+        client.force_authenticate(user=other)
+
+        response = client.post(
+            reverse('nodes-export'),
+            data={'node_ids': [str(self.doc_1.id)]},
+            format='json'
+        )
+
+        assert response.status_code == 404
+        export_nodes_task.apply_async.assert_not_called()
+
+    @patch('papermerge.core.views.export_jobs.export_nodes_task')
+    def test_export_task_and_download(self, _):
+        job_id = self._export().data['id']
+
+        size = self._run(job_id)
+
+        job = ExportJob.objects.get(pk=job_id)
+        assert job.status == EXPORT_STATUS_SUCCEEDED
+        assert job.entries == 2
+        assert job.size == size == os.stat(job.abs_file_path()).st_size
+
+        status_response = self.client.get(reverse('export-job', args=(job_id,)))
+        download_url = status_response.data['download_url']
+        response = self.client.get(download_url)
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/zip'
+        data = response.getvalue()
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            assert len(archive.namelist()) == 2
+
+        # interrupted download is resumed
+        partial = self.client.get(
+            download_url,
+            HTTP_RANGE='bytes=100-',
+            HTTP_IF_RANGE=response['ETag']
+        )
+        assert partial.status_code == 206
+        assert partial.getvalue() == data[100:]
+
+    @patch('papermerge.core.views.export_jobs.export_nodes_task')
+    def test_download_of_running_export(self, _):
+        job_id = self._export().data['id']
+
+        response = self.client.get(
+            reverse('export-job-download', args=(job_id,))
+        )
+
+        assert response.status_code == 409
+
+    @patch('papermerge.core.views.export_jobs.export_nodes_task')
+    def test_download_with_archive_accept_header(self, _):
+        job_id = self._export().data['id']
+        download_url = reverse('export-job-download', args=(job_id,))
+
+        not_ready = self.client.get(
+            download_url,
+            HTTP_ACCEPT='application/zip'
+        )
+        self._run(job_id)
+        response = self.client.get(
+            download_url,
+            HTTP_ACCEPT='application/zip'
+        )
+
+        assert not_ready.status_code == 409
+        assert not_ready['Content-Type'] == 'application/json'
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/zip'
+
+    @patch('papermerge.core.views.export_jobs.export_nodes_task')
+    def test_delete_export_job_deletes_archive(self, _):
+        job_id = self._export().data['id']
+        self._run(job_id)
+        path = ExportJob.objects.get(pk=job_id).abs_file_path()
+
+        response = self.client.delete(reverse('export-job', args=(job_id,)))
+
+        assert response.status_code == 204
+        assert not os.path.exists(path)
+
+    @patch('papermerge.core.views.export_jobs.export_nodes_task')
+    def test_delete_expired_export_jobs(self, _):
+        expired_id = self._export().data['id']
+        self._run(expired_id)
+        recent_id = self._export(archive_type='targz').data['id']
+        self._run(recent_id)
+        # still pending, thus kept however old it is
+        pending_id = self._export(include_version='only_original').data['id']
+        ExportJob.objects.filter(pk__in=[expired_id, pending_id]).update(
+            updated_at=timezone.now() - timedelta(hours=25)
+        )
+        path = ExportJob.objects.get(pk=expired_id).abs_file_path()
+
+        deleted_count = delete_expired_export_jobs_task()
+
+        assert deleted_count == 1
+        assert not os.path.exists(path)
+        assert set(
+            str(pk) for pk in ExportJob.objects.values_list('pk', flat=True)
+        ) == {recent_id, pending_id}
+
+    @override_settings(PAPERMERGE_EXPORT_MAX_AGE=None)
+    @patch('papermerge.core.views.export_jobs.export_nodes_task')
+    def test_export_jobs_never_expire(self, _):
+        job_id = self._export().data['id']
+        self._run(job_id)
+        ExportJob.objects.filter(pk=job_id).update(
+            updated_at=timezone.now() - timedelta(days=365)
+        )
+
+        assert delete_expired_export_jobs_task() == 0
+        assert ExportJob.objects.filter(pk=job_id).exists()
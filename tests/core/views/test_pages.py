@@ -1,4 +1,4 @@
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 import shutil
 import os
 import io
@@ -6,12 +6,21 @@ import json
 from pathlib import Path
 
 import pikepdf
+from PIL import Image
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 
-from papermerge.core.models import User, Document, Folder
+from papermerge.core.lib.path import DocumentPath
+from papermerge.core.exceptions import VersionConflict
+from papermerge.core.models import User, Document, Folder, Page
+from papermerge.core.signal_definitions import page_rotate
 from papermerge.core.storage import abs_path
+from papermerge.core.tasks import (
+    increment_document_version,
+    page_operation_task
+)
+from papermerge.core.views.page_operations import rotate_pages
 
 MODELS_DIR_ABS_PATH = os.path.abspath(os.path.dirname(__file__))
 TEST_DIR_ABS_PATH = os.path.dirname(
@@ -71,7 +80,7 @@ class PageViewTestCase(TestCase):
             'text': 'Hello Page!'
         }
 
-    @patch('papermerge.core.models.document_version.convert_from_path')
+    @patch('papermerge.core.models.document_version.render_previews')
     def test_page_view_in_svg_format(self, _):
         """
         GET /pages/{id}/
@@ -114,6 +123,46 @@ class PageViewTestCase(TestCase):
 
         assert response.status_code == 200
 
+    def test_page_view_in_jpg_format_resized(self):
+        """
+        GET /pages/{id}/?size=150
+        Accept: image/jpeg
+        """
+        self.doc_version.create_pages(page_count=1)
+        page = self.doc_version.pages.first()
+        preview_path = abs_path(page.page_path.preview_url)
+        os.makedirs(os.path.dirname(preview_path), exist_ok=True)
+        Image.new('RGB', (900, 1200), 'white').save(preview_path)
+
+        response = self.client.get(
+            reverse('pages_page', args=(page.pk,)),
+            {'size': 150},
+            HTTP_ACCEPT='image/jpeg'
+        )
+
+        assert response.status_code == 200
+        image = Image.open(io.BytesIO(response.getvalue()))
+        assert image.size == (150, 200)
+        assert os.path.exists(
+            abs_path(page.page_path.sized_preview_url(150))
+        )
+
+    def test_page_view_in_jpg_format_unsupported_size(self):
+        """
+        GET /pages/{id}/?size=123
+        Accept: image/jpeg
+        """
+        self.doc_version.create_pages(page_count=1)
+        page = self.doc_version.pages.first()
+
+        response = self.client.get(
+            reverse('pages_page', args=(page.pk,)),
+            {'size': 123},
+            HTTP_ACCEPT='image/jpeg'
+        )
+
+        assert response.status_code == 400
+
     @patch('papermerge.core.signals.ocr_document_task')
     @patch('papermerge.core.signals.generate_page_previews_task')
     def test_page_view_in_text_format(self, _, _x):
@@ -133,6 +182,54 @@ class PageViewTestCase(TestCase):
         assert response.status_code == 200
         assert response.content.decode('utf-8') == 'Hello Page!'
 
+    def test_page_view_conditional_get(self):
+        """
+        GET /pages/{id}/
+        If-None-Match: <etag of current page text>
+        """
+        self.doc_version.create_pages(page_count=1)
+        page = self.doc_version.pages.first()
+        page.update_text_field(io.StringIO('Hello Page!'))
+        url = reverse('pages_page', args=(page.pk,))
+
+        response = self.client.get(url, HTTP_ACCEPT='text/plain')
+        etag = response['ETag']
+        assert response['Cache-Control'] == 'private, no-cache'
+
+        response = self.client.get(
+            url, HTTP_ACCEPT='text/plain', HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 304
+
+        page.text = 'Hello again!'
+        page.save()
+        response = self.client.get(
+            url, HTTP_ACCEPT='text/plain', HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_archived_page_is_immutable(self, _, _x):
+        """
+        GET /pages/{id}/ of archived page
+        """
+        doc = self._upload(self.doc, 'three-pages.pdf')
+        page = self.doc_version.pages.first()
+        increment_document_version(doc.pk)
+        url = reverse('pages_page', args=(page.pk,))
+
+        response = self.client.get(url, HTTP_ACCEPT='text/plain')
+        assert 'immutable' in response['Cache-Control']
+
+        response = self.client.get(
+            url,
+            HTTP_ACCEPT='text/plain',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        assert response.status_code == 304
+
     @patch('papermerge.core.signals.ocr_document_task')
     @patch('papermerge.core.signals.generate_page_previews_task')
     def test_page_delete(self, _x, _y):
@@ -648,6 +745,291 @@ class PageViewTestCase(TestCase):
         # document's version text field was updated as well
         assert last_version.text == 'fish cat'
 
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_pages_rotate_expected_version(self, _x, _y):
+        self._upload(self.doc, 'three-pages.pdf')
+        pages = self.doc_version.pages.all()
+        pages_data = [{'id': pages[0].id, 'angle': 90}]
+
+        response = self.client.post(
+            reverse('pages_rotate'),
+            data={"pages": pages_data, "expected_version": 2},
+            format='json'
+        )
+        # current document version is 1
+        assert response.status_code == 409
+        assert self.doc.versions.count() == 1
+
+        response = self.client.post(
+            reverse('pages_rotate'),
+            data={"pages": pages_data, "expected_version": 1},
+            format='json'
+        )
+        assert response.status_code == 204
+        assert self.doc.versions.count() == 2
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_pages_rotate_outdated_pages(self, _x, _y):
+        """
+        Pages of the document version which was meanwhile superseded by
+        another operation cannot be modified
+        """
+        self._upload(self.doc, 'three-pages.pdf')
+        pages = self.doc_version.pages.all()
+        pages_data = [{'id': pages[0].id, 'angle': 90}]
+        # concurrent operation
+        self.doc.version_bump()
+
+        response = self.client.post(
+            reverse('pages_rotate'),
+            data={"pages": pages_data},
+            format='json'
+        )
+
+        assert response.status_code == 409
+        assert self.doc.versions.count() == 2
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_page_signal_is_sent_on_commit(self, _x, _y):
+        self._upload(self.doc, 'three-pages.pdf')
+        pages = self.doc_version.pages.all()
+        receiver = Mock()
+        page_rotate.connect(receiver)
+        self.addCleanup(page_rotate.disconnect, receiver)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            rotate_pages(self.user, {
+                'pages': [{'id': pages[0].id, 'angle': 90}]
+            })
+
+        receiver.assert_not_called()
+        for callback in callbacks:
+            callback()
+        receiver.assert_called_once()
+        assert receiver.call_args.kwargs['document_version'].number == 2
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_rolled_back_page_operation_removes_files(self, _x, _y):
+        self._upload(self.doc, 'three-pages.pdf')
+        pages = self.doc_version.pages.all()
+        new_version_dir = abs_path(
+            DocumentPath.copy_from(
+                self.doc_version.document_path,
+                version=2
+            ).dirname()
+        )
+
+        with patch(
+            'papermerge.core.views.page_operations.reuse_text_field',
+            side_effect=ValueError
+        ):
+            with self.assertRaises(ValueError):
+                rotate_pages(self.user, {
+                    'pages': [{'id': pages[0].id, 'angle': 90}]
+                })
+
+        assert self.doc.versions.count() == 1
+        # PDF file of rolled back document version was written
+        # and removed
+        assert not os.path.exists(new_version_dir)
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_pages_are_read_under_lock(self, _x, _y):
+        """
+        Operation which completes while the lock is awaited supersedes
+        the pages; they are read (and checked) once the lock is held
+        """
+        self._upload(self.doc, 'three-pages.pdf')
+        pages = self.doc_version.pages.all()
+        reads = []
+
+        def lock_document(document, expected_version=None):
+            # concurrent operation completes meanwhile
+            document.version_bump()
+            reads.append(pages_filter.call_count)
+            return document.versions.last()
+
+        with patch(
+            'papermerge.core.views.page_operations.lock_document',
+            side_effect=lock_document
+        ), patch(
+            'papermerge.core.views.page_operations.Page.objects.filter',
+            wraps=Page.objects.filter
+        ) as pages_filter:
+            with self.assertRaises(VersionConflict):
+                rotate_pages(self.user, {
+                    'pages': [{'id': pages[0].id, 'angle': 90}]
+                })
+
+        # no page was read before the lock
+        assert reads == [0]
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_page_delete_expected_version(self, _x, _y):
+        self._upload(self.doc, 'three-pages.pdf')
+        page = self.doc_version.pages.first()
+
+        response = self.client.delete(
+            reverse('pages_page', args=(page.pk,)) + '?expected_version=3'
+        )
+
+        assert response.status_code == 409
+        assert self.doc.versions.count() == 1
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    @patch('papermerge.core.views.pages.page_operation_task')
+    def test_pages_rotate_async(self, page_operation_task, _x, _y):
+        """
+        With ``async=true`` query parameter rotation is queued
+        and operation id is returned right away
+        """
+        self._upload(self.doc, 'three-pages.pdf')
+        pages = self.doc_version.pages.all()
+        pages_data = [
+            {
+                'id': str(pages[0].id),
+                'angle': 90
+            }
+        ]
+
+        response = self.client.post(
+            reverse('pages_rotate') + '?async=true',
+            data={
+                "pages": pages_data  # rotate pages
+            },
+            format='json'
+        )
+
+        assert response.status_code == 202
+        operation_id = response.data['operation_id']
+        page_operation_task.apply_async.assert_called_once_with(
+            kwargs={
+                'operation_id': operation_id,
+                'operation': 'rotate',
+                'user_id': str(self.user.id),
+                'data': {'pages': pages_data}
+            },
+            task_id=operation_id
+        )
+        # nothing was done inside HTTP request
+        assert self.doc.versions.count() == 1
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    @patch('papermerge.core.signals.channel_group_notify')
+    def test_page_operation_task(self, channel_group_notify, _x, _y):
+        self._upload(self.doc, 'three-pages.pdf')
+        pages = self._update_text_field(self.doc, ['one', 'two', 'three'])
+
+        result = page_operation_task(
+            operation_id='op-1',
+            operation='delete',
+            user_id=str(self.user.id),
+            data={'pages': [str(pages[0].id)]}
+        )
+
+        last_version = self.doc.versions.last()
+        assert result == [str(last_version.id)]
+        assert [page.text for page in last_version.pages.all()] == [
+            'two', 'three'
+        ]
+        stages = [
+            call.kwargs['task_kwargs']['stage']
+            for call in channel_group_notify.call_args_list
+        ]
+        assert stages == ['version_bump', 'pdf', 'ocr_data', 'text']
+        for call in channel_group_notify.call_args_list:
+            assert call.kwargs['type'] == 'taskprogress'
+            assert call.kwargs['task_kwargs']['operation_id'] == 'op-1'
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_pages_edit(self, _x, _y):
+        """
+        Delete first page, rotate third page and then move it to the
+        front - all in one request i.e. one new document version
+        """
+        self._upload(self.doc, 'three-pages.pdf')
+        pages = self._update_text_field(self.doc, ['one', 'two', 'three'])
+
+        response = self.client.post(
+            reverse('pages_edit'),
+            data={
+                "operations": [
+                    {"op": "delete", "pages": [pages[0].id]},
+                    {"op": "rotate", "pages": [pages[2].id], "angle": 90},
+                    {"op": "reorder", "pages": [pages[2].id, pages[1].id]},
+                ]
+            },
+            format='json'
+        )
+
+        assert response.status_code == 204
+        # only one document version was created
+        assert self.doc.versions.count() == 2
+        last_version = self.doc.versions.last()
+        assert [page.text for page in last_version.pages.all()] == [
+            'three', 'two'
+        ]
+        assert last_version.text == 'three two'
+
+        pdf_file = pikepdf.Pdf.open(abs_path(last_version.document_path))
+        assert len(pdf_file.pages) == 2
+        assert pdf_file.pages[0].Rotate == 90
+        pdf_file.close()
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_pages_edit_invalid_operations(self, _x, _y):
+        self._upload(self.doc, 'three-pages.pdf')
+        pages = self.doc_version.pages.all()
+
+        # reorder references deleted page
+        response = self.client.post(
+            reverse('pages_edit'),
+            data={
+                "operations": [
+                    {"op": "delete", "pages": [pages[0].id]},
+                    {
+                        "op": "reorder",
+                        "pages": [pages[0].id, pages[1].id, pages[2].id]
+                    },
+                ]
+            },
+            format='json'
+        )
+        assert response.status_code == 400
+
+        # rotate without angle
+        response = self.client.post(
+            reverse('pages_edit'),
+            data={
+                "operations": [{"op": "rotate", "pages": [pages[0].id]}]
+            },
+            format='json'
+        )
+        assert response.status_code == 400
+
+        # all pages deleted
+        response = self.client.post(
+            reverse('pages_edit'),
+            data={
+                "operations": [
+                    {"op": "delete", "pages": [page.id for page in pages]}
+                ]
+            },
+            format='json'
+        )
+        assert response.status_code == 400
+        assert self.doc.versions.count() == 1
+
     @patch('papermerge.core.signals.ocr_document_task')
     @patch('papermerge.core.signals.generate_page_previews_task')
     def test_move_to_document_1(self, _x, _y):
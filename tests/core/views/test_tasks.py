@@ -1,7 +1,7 @@
 import json
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework.test import APIClient
@@ -35,3 +35,19 @@ class TasksViewTest(TestCase):
         )
 
         assert response.status_code == 200, response.data
+
+    @override_settings(PAPERMERGE_OCR_QUEUES=[
+        ('ocr_small', 5),
+        ('ocr_bulk', None)
+    ])
+    @patch('papermerge.core.views.tasks.queue_depths')
+    def test_ocr_queues(self, queue_depths):
+        queue_depths.return_value = {'ocr_small': 3, 'ocr_bulk': None}
+
+        response = self.client.get(reverse('tasks-ocr-queues'))
+
+        assert response.status_code == 200, response.data
+        assert response.json() == [
+            {'name': 'ocr_small', 'max_page_count': 5, 'depth': 3},
+            {'name': 'ocr_bulk', 'max_page_count': None, 'depth': None}
+        ]
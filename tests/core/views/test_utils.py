@@ -1,6 +1,11 @@
+import os
 from unittest.mock import patch
 import itertools
 import pytest
+from pikepdf import Pdf
+from PIL import Image
+
+from django.test import override_settings
 
 from model_bakery import baker
 
@@ -13,12 +18,15 @@ from papermerge.core.views.utils import (
     partial_merge,
     insert_pdf_pages,
     remove_pdf_pages,
+    rotate_pdf_pages,
     collect_text_streams,
     reuse_text_field,
     reuse_text_field_multi,
     reuse_ocr_data,
     reuse_ocr_data_multi,
-    PageRecycleMap
+    reuse_ocr_data_after_rotate,
+    PageRecycleMap,
+    PageEditMap
 )
 from papermerge.core.models import Document, Page
 from papermerge.core.storage import abs_path
@@ -92,6 +100,40 @@ class TestPageRecycleMap(TestCase):
         assert list_1 == list_2
 
 
+class TestPageEditMap(TestCase):
+
+    def test_page_edit_map_composes_operations(self):
+        page_edit_map = PageEditMap(total=4)
+        page_edit_map.delete([1])
+        page_edit_map.rotate([4], 90)
+        page_edit_map.reorder([4, 2, 3])
+        page_edit_map.rotate([4], 180)
+
+        result = [tuple(item) for item in page_edit_map]
+
+        assert result == [(1, 4, 270), (2, 2, 0), (3, 3, 0)]
+        assert page_edit_map.page_map == [(1, 4), (2, 2), (3, 3)]
+        assert page_edit_map.rotated == [{'number': 1, 'angle': 270}]
+
+    def test_page_edit_map_multiple_deletes(self):
+        page_edit_map = PageEditMap(total=5)
+        page_edit_map.delete([2])
+        page_edit_map.delete([4, 5])
+
+        assert page_edit_map.page_map == [(1, 1), (2, 3)]
+
+    def test_page_edit_map_invalid_input(self):
+        page_edit_map = PageEditMap(total=3)
+        page_edit_map.delete([2])
+
+        with pytest.raises(ValueError):
+            page_edit_map.rotate([2], 90)
+
+        with pytest.raises(ValueError):
+            # page 3 is missing
+            page_edit_map.reorder([1])
+
+
 class TestCollectTextStreams(TestCase):
     """Tests collect_text_streams"""
 
@@ -190,6 +232,45 @@ class TestReuseOCRdata(TestCase):
         src = source.pages.all()[2]
         _assert_same_ocr_data(src=src, dst=dst)
 
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_reuse_ocr_data_after_rotate(self, _, _x):
+        """
+        Only images of the rotated page are rotated, all other
+        pages reuse OCR data/previews of the old version
+        """
+        src_document = maker.document(
+            "s3.pdf",
+            user=self.user,
+            include_ocr_data=True
+        )
+        source = src_document.versions.last()
+        src_page_2 = source.pages.all()[1]
+        preview = abs_path(src_page_2.page_path.preview_url)
+        Image.new('RGB', (40, 20), 'white').save(preview, format='JPEG')
+        destination = src_document.version_bump()
+
+        reuse_ocr_data_after_rotate(
+            old_version=source,
+            new_version=destination,
+            pages_data=[{'number': 2, 'angle': 90}]
+        )
+
+        for index in (0, 2):
+            dst = destination.pages.all()[index]
+            src = source.pages.all()[index]
+            _assert_same_ocr_data(src=src, dst=dst)
+
+        dst_page_2 = destination.pages.all()[1]
+        with Image.open(abs_path(dst_page_2.page_path.preview_url)) as img:
+            assert img.size == (20, 40)
+        with Image.open(preview) as img:
+            assert img.size == (40, 20)
+        # text is not affected by rotation
+        assert _get_content(dst_page_2.page_path.txt_url) == _get_content(
+            src_page_2.page_path.txt_url
+        )
+
 
 class TestReuseOCRDataMulti(TestCase):
     """Tests for reuse_ocr_data_multi"""
@@ -658,6 +739,46 @@ class TestReuseTextFieldMulti(TestCase):
 
         assert expected == actual
 
+    def test_reuse_text_field_multi_query_count_does_not_depend_on_pages(
+        self
+    ):
+        """
+        Texts are copied by database; number of queries is the same
+        for 3 and for 30 pages document versions.
+        """
+        for page_count in (3, 30):
+            src_version = maker.document_version(
+                page_count=page_count,
+                pages_text=[f"src {n}" for n in range(1, page_count + 1)]
+            )
+            dst_old_version = maker.document_version(
+                page_count=page_count,
+                pages_text=[f"dst {n}" for n in range(1, page_count + 1)]
+            )
+            dst_new_version = maker.document_version(
+                page_count=2 * page_count
+            )
+            page_numbers = list(range(page_count, 0, -1))
+
+            # destination's page count, source pages (one join), pages
+            # before and after inserted ones, all pages' text and
+            # document version's text
+            with self.assertNumQueries(6):
+                reuse_text_field_multi(
+                    src_old_version=src_version,
+                    dst_old_version=dst_old_version,
+                    dst_new_version=dst_new_version,
+                    page_numbers=page_numbers,
+                    position=1
+                )
+
+            actual = [page.text for page in dst_new_version.pages.all()]
+            expected = ["dst 1"] + [
+                f"src {n}" for n in page_numbers
+            ] + [f"dst {n}" for n in range(2, page_count + 1)]
+            assert expected == actual
+            assert dst_new_version.text == ' '.join(expected)
+
 
 class TestReuseTextField(TestCase):
     """Tests for reuse_text_field"""
@@ -696,7 +817,11 @@ class TestReuseTextField(TestCase):
         )
         # User deletes one page, which means
         # new document version will have 2 pages
-        pages_new = baker.prepare("core.Page", _quantity=2)
+        pages_new = baker.prepare(
+            "core.Page",
+            _quantity=2,
+            number=itertools.cycle([1, 2])
+        )
         doc_version_new = baker.make("core.DocumentVersion", pages=pages_new)
 
         #  this is what is tested
@@ -714,6 +839,87 @@ class TestReuseTextField(TestCase):
         ]
 
         assert expected == actual
+        assert doc_version_new.text == (
+            "I am content from Page 2 And I am content from Page 3"
+        )
+
+    def test_reuse_text_field_query_count_does_not_depend_on_pages(self):
+        """
+        Number of queries performed by ``reuse_text_field`` is the same
+        for a 3 pages and for a 30 pages document version.
+        """
+        for page_count in (3, 30):
+            doc_version_old = maker.document_version(
+                page_count=page_count,
+                pages_text=[f"Page {n}" for n in range(1, page_count + 1)]
+            )
+            doc_version_new = maker.document_version(page_count=page_count)
+            # new version gets old pages in reverse order
+            page_map = [
+                (number, page_count - number + 1)
+                for number in range(1, page_count + 1)
+            ]
+            with self.assertNumQueries(3):
+                reuse_text_field(
+                    old_version=doc_version_old,
+                    new_version=doc_version_new,
+                    page_map=page_map
+                )
+
+            actual = [page.text for page in doc_version_new.pages.all()]
+            expected = [
+                f"Page {n}" for n in range(page_count, 0, -1)
+            ]
+            assert expected == actual
+
+    def test_reuse_text_field_with_offset_page_map(self):
+        """
+        Pages shifted by the same offset (e.g. first page deleted) are
+        copied with one statement, whatever the number of pages.
+        """
+        doc_version_old = maker.document_version(
+            page_count=31,
+            pages_text=[f"Page {n}" for n in range(1, 32)]
+        )
+        doc_version_new = maker.document_version(page_count=30)
+        page_map = [(number, number + 1) for number in range(1, 31)]
+
+        with self.assertNumQueries(3):
+            reuse_text_field(
+                old_version=doc_version_old,
+                new_version=doc_version_new,
+                page_map=page_map
+            )
+
+        actual = [page.text for page in doc_version_new.pages.all()]
+        assert actual == [f"Page {n}" for n in range(2, 32)]
+
+    @patch('papermerge.core.models.document_version.COPY_TEXT_BATCH_SIZE', 4)
+    @patch(
+        'papermerge.core.models.document_version.supports_update_from',
+        return_value=False
+    )
+    def test_reuse_text_field_in_batches(self, _):
+        """
+        Databases without ``UPDATE ... FROM`` copy pages in batches
+        """
+        doc_version_old = maker.document_version(
+            page_count=10,
+            pages_text=[f"Page {n}" for n in range(1, 11)]
+        )
+        doc_version_new = maker.document_version(page_count=10)
+        page_map = [(number, 11 - number) for number in range(1, 11)]
+
+        # 3 batches + text of all pages + document version's text
+        with self.assertNumQueries(5):
+            reuse_text_field(
+                old_version=doc_version_old,
+                new_version=doc_version_new,
+                page_map=page_map
+            )
+
+        actual = [page.text for page in doc_version_new.pages.all()]
+        assert actual == [f"Page {n}" for n in range(10, 0, -1)]
 
 
 class TestRemovePdfPages(TestCase):
@@ -785,6 +991,74 @@ class TestRemovePdfPages(TestCase):
             )
 
 
+@override_settings(PAPERMERGE_LAZY_PDF_VERSIONS=True)
+class TestLazyPdfPages(TestCase):
+    """Tests for page operations on lazy document versions"""
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_remove_pdf_pages_does_not_write_file(self, _, _x):
+        src_document = maker.document(
+            "s3.pdf",
+            user=self.user
+        )
+        src_old_version = src_document.versions.last()
+        src_new_version = src_document.version_bump(page_count=2)
+
+        remove_pdf_pages(
+            old_version=src_old_version,
+            new_version=src_new_version,
+            page_numbers=[1]
+        )
+
+        assert src_new_version.is_lazy
+        assert not os.path.exists(
+            abs_path(src_new_version.document_path.url)
+        )
+        # file is built on first access
+        content = pdf_content(src_new_version, clean=True)
+        assert content == "S2 S3"
+        src_new_version.refresh_from_db()
+        assert not src_new_version.is_lazy
+        assert src_new_version.size > 0
+
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_chained_operations_point_to_original_file(self, _, _x):
+        src_document = maker.document(
+            "s3.pdf",
+            user=self.user
+        )
+        version_1 = src_document.versions.last()
+        version_2 = src_document.version_bump()
+        rotate_pdf_pages(
+            old_version=version_1,
+            new_version=version_2,
+            pages_data=[{'number': 3, 'angle': 90}]
+        )
+        version_3 = src_document.version_bump(page_count=2)
+        remove_pdf_pages(
+            old_version=version_2,
+            new_version=version_3,
+            page_numbers=[2]
+        )
+
+        assert version_2.is_lazy
+        assert [
+            (item['version'], item['number'], item['angle'])
+            for item in version_3.manifest
+        ] == [(str(version_1.pk), 1, 0), (str(version_1.pk), 3, 90)]
+
+        content = pdf_content(version_3, clean=True)
+        # text of the rotated page is extracted in pieces
+        assert content.replace(" ", "") == "S1S3"
+        with Pdf.open(version_3.abs_file_path()) as pdf:
+            assert len(pdf.pages) == 2
+            assert pdf.pages[1].Rotate == 90
+        # intermediate version was never needed
+        assert version_2.is_lazy
+
+
 class TestInserPdfPagesUtilityFunction(TestCase):
     """Tests for insert_pdf_pages"""
 
@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from papermerge.core.models import User
+from papermerge.core.signals import get_channel_data
+from papermerge.notifications.consumers.export import ExportConsumer
+from papermerge.notifications.consumers.page_operation import (
+    PageOperationConsumer
+)
+
+
+class TestPageOperationConsumer(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1")
+        self.consumer = PageOperationConsumer()
+        self.consumer.user = self.user
+
+    def test_page_operation_channel_data(self):
+        assert get_channel_data(
+            'papermerge.core.tasks.page_operation_task',
+            'taskprogress'
+        ) == {'type': 'pageoperationtask.taskprogress'}
+
+    @patch.object(PageOperationConsumer, 'send_json')
+    def test_event_is_sent_to_initiating_user(self, send_json):
+        self.consumer.pageoperationtask_taskprogress({
+            'type': 'pageoperationtask.taskprogress',
+            'operation_id': 'op-1',
+            'operation': 'rotate',
+            'user_id': str(self.user.id),
+            'stage': 'pdf',
+            'data': {'pages': []}
+        })
+
+        send_json.assert_called_once_with({
+            'type': 'pageoperationtask.taskprogress',
+            'operation_id': 'op-1',
+            'operation': 'rotate',
+            'user_id': str(self.user.id),
+            'stage': 'pdf'
+        })
+
+    @patch.object(PageOperationConsumer, 'send_json')
+    def test_event_is_not_sent_to_other_users(self, send_json):
+        other = User.objects.create_user(username="user2")
+        self.consumer.pageoperationtask_tasksucceeded({
+            'type': 'pageoperationtask.tasksucceeded',
+            'operation_id': 'op-1',
+            'operation': 'rotate',
+            'user_id': str(other.id)
+        })
+
+        send_json.assert_not_called()
+
+
+class TestExportConsumer(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1")
+        self.consumer = ExportConsumer()
+        self.consumer.user = self.user
+
+    def test_export_channel_data(self):
+        assert get_channel_data(
+            'papermerge.core.tasks.export_nodes_task',
+            'taskprogress'
+        ) == {'type': 'exportnodestask.taskprogress'}
+
+    @patch.object(ExportConsumer, 'send_json')
+    def test_event_is_sent_only_to_requesting_user(self, send_json):
+        other = User.objects.create_user(username="user2")
+        event = {
+            'type': 'exportnodestask.taskprogress',
+            'export_job_id': 'job-1',
+            'user_id': str(self.user.id),
+            'entries': 10
+        }
+
+        self.consumer.exportnodestask_taskprogress(event)
+        self.consumer.exportnodestask_taskprogress({
+            **event, 'user_id': str(other.id)
+        })
+
+        send_json.assert_called_once_with(event)
@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from papermerge.test import maker
+from papermerge.core.models import Folder, User
+from papermerge.core.views.page_operations import move_to_folder
+
+
+class TestInboxRefresh(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1")
+
+    @patch('papermerge.notifications.signals.inbox_refresh')
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_pages_extracted_to_inbox(self, _, _x, inbox_refresh):
+        source = maker.document("three-pages.pdf", user=self.user)
+        pages = source.versions.last().pages.all()[:2]
+
+        # signal is sent once page operation is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            move_to_folder(self.user, {
+                'pages': [page.id for page in pages],
+                'dst': self.user.inbox_folder.id,
+                'single_page': True
+            })
+
+        # once per batch of extracted pages
+        inbox_refresh.assert_called_once_with(self.user.id)
+
+    @patch('papermerge.notifications.signals.inbox_refresh')
+    @patch('papermerge.core.signals.ocr_document_task')
+    @patch('papermerge.core.signals.generate_page_previews_task')
+    def test_pages_extracted_to_other_folder(self, _, _x, inbox_refresh):
+        source = maker.document("three-pages.pdf", user=self.user)
+        pages = source.versions.last().pages.all()[:2]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            move_to_folder(self.user, {
+                'pages': [page.id for page in pages],
+                'dst': self.user.home_folder.id,
+                'single_page': True
+            })
+
+        inbox_refresh.assert_not_called()
+
+    @patch('papermerge.notifications.signals.inbox_refresh')
+    def test_saving_node_in_inbox_does_not_refresh(self, inbox_refresh):
+        Folder.objects.create(
+            title="Scans",
+            user=self.user,
+            parent=self.user.inbox_folder
+        )
+
+        inbox_refresh.assert_not_called()